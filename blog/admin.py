@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, Post, Tag
+from . import related_tags
+from .models import ArchivedComment, AuthorStats, Comment, CommenterStats, Post, Tag
 
 
 class CommentInline(admin.TabularInline):
@@ -80,13 +81,52 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.body[:40] + ('…' if len(obj.body) > 40 else '')
 
 
+@admin.register(ArchivedComment)
+class ArchivedCommentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'email', 'post', 'created', 'active', 'archived')
+    list_filter = ('active',)
+    search_fields = ('email',)
+    raw_id_fields = ('post',)
+    readonly_fields = (
+        'id', 'post', 'name', 'email', 'body', 'created', 'updated', 'active', 'archived'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'post_count')
     list_display_links = ('name',)
     search_fields = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ('related_summary',)
 
     @admin.display(description='Количество постов')
     def post_count(self, obj):
         return obj.posts.count()
+
+    @admin.display(description='Похожие теги')
+    def related_summary(self, obj):
+        names = [tag.name for tag in related_tags.related_for(obj)] if obj.pk else []
+        return ', '.join(names) if names else '—'
+
+
+@admin.register(CommenterStats)
+class CommenterStatsAdmin(admin.ModelAdmin):
+    list_display = ('name', 'email', 'comments_total', 'recent_comment')
+    search_fields = ('name', 'email')
+    readonly_fields = ('name', 'email', 'comments_total', 'recent_comment')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('author', 'published_posts', 'active_comments', 'latest_publish')
+    readonly_fields = ('author', 'published_posts', 'active_comments', 'latest_publish')
+
+    def has_add_permission(self, request):
+        return False
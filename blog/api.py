@@ -0,0 +1,287 @@
+"""JSON API только для чтения: посты, их комментарии и теги.
+
+Ответы собираются прямо из строк ``values()``, без создания моделей.
+Параметр ``fields`` (через запятую) задаёт поля ответа, и читаются только
+нужные для них столбцы. Списки постов и комментариев листаются курсором
+``before`` (поле ``next`` ответа). Некорректные ``fields``, ``before`` и
+``limit`` дают ``400``.
+
+Ответы отдают ``ETag`` и ``304`` на ``If-None-Match``. ETag строится по
+``updated`` постов и комментариев и по маркеру ``caching.related_version()``: у
+тегов и пользователей нет ``updated``, поэтому сигналы меняют маркер при
+изменении тегов, имён пользователей и привязки тегов к постам.
+"""
+
+import hashlib
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from . import comment_archive
+from .caching import published_state, related_version
+from .models import ArchivedComment, Comment, Post, Tag
+from .pagination import decode_cursor, keyset_page
+
+# Поле ответа → столбцы ``values()``, нужные для него.
+POST_FIELDS = {
+    'id': ('id',),
+    'title': ('title',),
+    'slug': ('slug',),
+    'author': ('author__username',),
+    'publish': ('publish',),
+    'updated': ('updated',),
+    'body': ('body',),
+    'url': ('publish', 'slug'),
+    'tags': ('id',),
+}
+# В списке по умолчанию нет ``body``: это самый тяжёлый столбец.
+POST_LIST_FIELDS = ('id', 'title', 'slug', 'author', 'publish', 'url', 'tags')
+
+# Email комментаторов в API не отдаётся.
+COMMENT_FIELDS = {
+    'id': ('id',),
+    'name': ('name',),
+    'body': ('body',),
+    'created': ('created',),
+}
+
+TAG_FIELDS = {
+    'id': ('id',),
+    'name': ('name',),
+    'slug': ('slug',),
+    'posts': ('published_posts',),
+}
+
+
+def respond(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def error(status, message):
+    return respond({'error': message}, status)
+
+
+def requested_fields(request, available, default):
+    """Поля из ``?fields=`` в порядке запроса; ``ValueError`` для неизвестных."""
+
+    value = request.GET.get('fields')
+    if not value:
+        return list(default)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if not fields or unknown:
+        raise ValueError(
+            f'Неизвестные поля: {", ".join(unknown) or value}. '
+            f'Доступны: {", ".join(available)}'
+        )
+    return fields
+
+
+def columns(fields, available, required=()):
+    return list(dict.fromkeys([*required, *(c for name in fields for c in available[name])]))
+
+
+def page_size(request):
+    config = settings.BLOG_API
+    value = request.GET.get('limit')
+    if value is None:
+        return config['PER_PAGE']
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= config['MAX_PER_PAGE']:
+        raise ValueError(f'limit: целое число от 1 до {config["MAX_PER_PAGE"]}')
+    return limit
+
+
+def page_cursor(request):
+    value = request.GET.get('before')
+    if value and decode_cursor(value) is None:
+        raise ValueError(f'Некорректный курсор before: {value}')
+    return value or None
+
+
+def endpoint(available, default, etag_func=None, paginated=False):
+    """Декоратор представления API.
+
+    Проверяет ``fields`` (и ``limit``/``before`` при ``paginated``) до ETag,
+    чтобы ответ ``400`` не получил ETag. Разобранные параметры лежат в
+    ``request._blog_api``.
+    """
+
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view) if etag_func else view
+
+        @require_safe
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                params = {'fields': requested_fields(request, available, default)}
+                if paginated:
+                    params['per_page'] = page_size(request)
+                    params['before'] = page_cursor(request)
+            except ValueError as exc:
+                return error(400, str(exc))
+            request._blog_api = params
+            return conditional(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+def tags_by_post(post_ids):
+    tags = defaultdict(list)
+    rows = (
+        Post.tags.through.objects.filter(post_id__in=post_ids)
+        .order_by('tag__slug')
+        .values_list('post_id', 'tag__slug')
+    )
+    for post_id, slug in rows:
+        tags[post_id].append(slug)
+    return tags
+
+
+def post_url(row):
+    publish = row['publish']
+    return reverse(
+        'blog:post_detail', args=[publish.year, publish.month, publish.day, row['slug']]
+    )
+
+
+def serialize_posts(rows, fields):
+    tags = tags_by_post([row['id'] for row in rows]) if 'tags' in fields else {}
+    items = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            if name == 'url':
+                item[name] = post_url(row)
+            elif name == 'tags':
+                item[name] = tags.get(row['id'], [])
+            else:
+                item[name] = row[POST_FIELDS[name][0]]
+        items.append(item)
+    return items
+
+
+def etag(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+
+
+def posts_etag(request):
+    latest, total = published_state(request.GET.get('tag'))
+    return etag(
+        request.get_full_path(),
+        latest.isoformat() if latest else '',
+        total,
+        related_version(),
+    )
+
+
+def post_etag(request, pk):
+    updated = Post.published.filter(pk=pk).values_list('updated', flat=True).first()
+    if updated is None:
+        return None
+    return etag(request.get_full_path(), updated.isoformat(), related_version())
+
+
+def comments_etag(request, pk):
+    if not Post.published.filter(pk=pk).exists():
+        return None
+    # Все комментарии поста, включая скрытые: скрытие меняет ``updated``.
+    states = [
+        model.objects.filter(post_id=pk).aggregate(latest=Max('updated'), total=Count('id'))
+        for model in (Comment, ArchivedComment)
+    ]
+    return etag(
+        request.get_full_path(),
+        *(state['latest'].isoformat() if state['latest'] else '' for state in states),
+        *(state['total'] for state in states),
+    )
+
+
+def tags_etag(request):
+    # Число постов тега меняется при публикации, снятии и удалении постов
+    # (их ловит published_state) и при смене тегов поста (related_version).
+    latest, total = published_state()
+    return etag(
+        request.get_full_path(),
+        latest.isoformat() if latest else '',
+        total,
+        related_version(),
+    )
+
+
+@endpoint(POST_FIELDS, POST_LIST_FIELDS, etag_func=posts_etag, paginated=True)
+def posts(request):
+    """Опубликованные посты, новые первыми; фильтры ``tag`` и ``author``."""
+
+    params = request._blog_api
+    queryset = Post.published.all()
+    if request.GET.get('tag'):
+        queryset = queryset.filter(tags__slug=request.GET['tag'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    rows, next_cursor = keyset_page(
+        queryset.values(*columns(params['fields'], POST_FIELDS, ('id', 'publish'))),
+        params['before'],
+        params['per_page'],
+    )
+    return respond({'results': serialize_posts(rows, params['fields']), 'next': next_cursor})
+
+
+@endpoint(POST_FIELDS, POST_FIELDS, etag_func=post_etag)
+def post(request, pk):
+    fields = request._blog_api['fields']
+    rows = list(
+        Post.published.filter(pk=pk).values(*columns(fields, POST_FIELDS, ('id',)))
+    )
+    if not rows:
+        return error(404, 'Пост не найден')
+    return respond(serialize_posts(rows, fields)[0])
+
+
+@endpoint(COMMENT_FIELDS, COMMENT_FIELDS, etag_func=comments_etag, paginated=True)
+def post_comments(request, pk):
+    """Активные комментарии поста (горячие, затем архивные), новые первыми."""
+
+    params = request._blog_api
+    if not Post.published.filter(pk=pk).exists():
+        return error(404, 'Пост не найден')
+    rows, next_cursor = comment_archive.comments_page(
+        pk,
+        params['before'],
+        params['per_page'],
+        fields=columns(params['fields'], COMMENT_FIELDS, ('id', 'created')),
+    )
+    return respond(
+        {
+            'results': [{name: row[name] for name in params['fields']} for row in rows],
+            'next': next_cursor,
+        }
+    )
+
+
+@endpoint(TAG_FIELDS, TAG_FIELDS, etag_func=tags_etag)
+def tags(request):
+    """Все теги по алфавиту; ``posts`` — число опубликованных постов."""
+
+    fields = request._blog_api['fields']
+    queryset = Tag.objects.order_by('name')
+    if 'posts' in fields:
+        queryset = queryset.with_post_counts()
+    rows = queryset.values(*columns(fields, TAG_FIELDS))
+    return respond(
+        {
+            'results': [
+                {name: row[TAG_FIELDS[name][0]] for name in fields} for row in rows
+            ]
+        }
+    )
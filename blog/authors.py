@@ -0,0 +1,156 @@
+"""Инкрементальное ведение таблицы ``AuthorStats``.
+
+Счётчики меняются на ±1 при публикации, снятии с публикации и удалении
+постов и при появлении, скрытии и удалении комментариев (горячих и
+архивных). Дата последней публикации пересчитывается одним чтением по
+индексу ``(author, status, -publish)``, когда уходит самый свежий пост.
+Строка, у которой оба счётчика обнулились, удаляется.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+
+from .models import ArchivedComment, AuthorStats, Comment, Post
+
+COUNTERS = ('published_posts', 'active_comments')
+
+
+def _plus(field, delta):
+    # Не уходим ниже нуля, даже если таблица разошлась с данными.
+    if delta >= 0:
+        return F(field) + delta
+    return Case(When(**{f'{field}__gte': -delta}, then=F(field) + delta), default=Value(0))
+
+
+def adjust(author_id, posts=0, comments=0, publish=None):
+    """Меняет счётчики автора; ``publish`` продвигает дату последней публикации."""
+
+    changes = {
+        field: _plus(field, delta)
+        for field, delta in zip(COUNTERS, (posts, comments))
+        if delta
+    }
+    if publish is not None:
+        changes['latest_publish'] = Case(
+            When(
+                Q(latest_publish__isnull=True) | Q(latest_publish__lt=publish),
+                then=Value(publish),
+            ),
+            default=F('latest_publish'),
+        )
+    if not changes:
+        return
+    updated = AuthorStats.objects.filter(author_id=author_id).update(**changes)
+    if updated and (posts < 0 or comments < 0):
+        # Как и rebuild(), не держим строк авторов без постов и комментариев.
+        AuthorStats.objects.filter(
+            author_id=author_id, published_posts=0, active_comments=0
+        ).delete()
+    if updated or (posts <= 0 and comments <= 0):
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(
+                author_id=author_id,
+                published_posts=max(posts, 0),
+                active_comments=max(comments, 0),
+                latest_publish=publish,
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        adjust(author_id, posts, comments, publish)
+
+
+def refresh_latest(author_id):
+    latest = (
+        Post.published.filter(author_id=author_id)
+        .order_by('-publish')
+        .values_list('publish', flat=True)
+        .first()
+    )
+    AuthorStats.objects.filter(author_id=author_id).update(latest_publish=latest)
+
+
+def post_published(author_id, publish):
+    adjust(author_id, posts=1, publish=publish)
+
+
+def post_unpublished(author_id):
+    adjust(author_id, posts=-1)
+    refresh_latest(author_id)
+
+
+def comments_changed(post_id, delta):
+    author_id = Post.objects.filter(pk=post_id).values_list('author_id', flat=True).first()
+    if author_id is not None:
+        adjust(author_id, comments=delta)
+
+
+def _comment_totals(filters):
+    return [
+        dict(
+            model.objects.filter(active=True, **filters)
+            .order_by()
+            .values('post__author')
+            .annotate(total=Count('id'))
+            .values_list('post__author', 'total')
+        )
+        for model in (Comment, ArchivedComment)
+    ]
+
+
+@transaction.atomic
+def refresh(author_ids):
+    """Пересчитывает строки указанных авторов целиком."""
+
+    author_ids = set(author_ids)
+    posts = {
+        row['author']: row
+        for row in Post.published.filter(author__in=author_ids)
+        .order_by()
+        .values('author')
+        .annotate(total=Count('id'), latest=Max('publish'))
+    }
+    hot, archived = _comment_totals({'post__author__in': author_ids})
+    for author_id in author_ids:
+        row = posts.get(author_id, {})
+        comments = hot.get(author_id, 0) + archived.get(author_id, 0)
+        if not row and not comments:
+            AuthorStats.objects.filter(author_id=author_id).delete()
+            continue
+        AuthorStats.objects.update_or_create(
+            author_id=author_id,
+            defaults={
+                'published_posts': row.get('total', 0),
+                'active_comments': comments,
+                'latest_publish': row.get('latest'),
+            },
+        )
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитывает таблицу целиком; возвращает число авторов."""
+
+    AuthorStats.objects.all().delete()
+    posts = {
+        row['author']: row
+        for row in Post.published.order_by()
+        .values('author')
+        .annotate(total=Count('id'), latest=Max('publish'))
+    }
+    hot, archived = _comment_totals({})
+    author_ids = set(posts) | set(hot) | set(archived)
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(
+                author_id=author_id,
+                published_posts=posts.get(author_id, {}).get('total', 0),
+                active_comments=hot.get(author_id, 0) + archived.get(author_id, 0),
+                latest_publish=posts.get(author_id, {}).get('latest'),
+            )
+            for author_id in author_ids
+        ],
+        batch_size=batch_size,
+    )
+    return len(author_ids)
@@ -0,0 +1,105 @@
+"""Кеширование XML-ответов (ленты, sitemap) по дате последнего изменения постов."""
+
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from . import metrics
+from .models import Post
+
+RELATED_KEY = 'blog:related:version'
+
+
+def published_state(tag_slug=None):
+    """Возвращает (max(updated), число постов) для опубликованных постов.
+
+    Число постов нужно, чтобы заметить снятие с публикации и удаление:
+    они не увеличивают ``max(updated)`` среди опубликованных.
+    """
+
+    posts = Post.published.order_by()
+    if tag_slug:
+        posts = posts.filter(tags__slug=tag_slug)
+    state = posts.aggregate(latest=Max('updated'), total=Count('id'))
+    return state['latest'], state['total']
+
+
+def related_version():
+    """Маркер имён тегов и авторов и привязки тегов к постам.
+
+    Эти данные попадают в ленты, sitemap и API, но не меняют
+    ``Post.updated``, поэтому сигналы заменяют маркер при их изменении.
+    Пропавший из кеша маркер заменяется новым случайным, а не начальным:
+    иначе после вытеснения мог бы повториться уже выданный ключ или ETag.
+    """
+
+    version = cache.get(RELATED_KEY)
+    if version is None:
+        cache.add(RELATED_KEY, uuid.uuid4().hex, None)
+        version = cache.get(RELATED_KEY)
+    return version
+
+
+def related_changed():
+    cache.set(RELATED_KEY, uuid.uuid4().hex, None)
+
+
+def _state(request, kwargs):
+    if not hasattr(request, '_blog_published_state'):
+        request._blog_published_state = published_state(kwargs.get('tag_slug'))
+    return request._blog_published_state
+
+
+def cached_xml(view):
+    """Отдаёт ``Last-Modified``/304 и кеширует готовый XML представления.
+
+    Ключ кеша включает состояние опубликованных постов и
+    ``related_version()``, поэтому после публикации или правки поста, тегов
+    или имён авторов XML перегенерируется при следующем запросе. Из строки
+    запроса в ключ попадает только номер страницы sitemap ``p``: прочие
+    параметры не меняют ответ и не должны плодить записи кеша.
+    """
+
+    def last_modified(request, *args, **kwargs):
+        return _state(request, kwargs)[0]
+
+    @condition(last_modified_func=last_modified)
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        latest, total = _state(request, kwargs)
+        page = request.GET.get('p', '1')
+        fingerprint = '|'.join(
+            [
+                f'{request.scheme}://{request.get_host()}{request.path}',
+                str(int(page)) if page.isdigit() else page,
+                latest.isoformat() if latest else '',
+                str(total),
+                related_version(),
+            ]
+        )
+        key = 'blog:xml:' + hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc('blog_cache_requests_total', cache='xml', result='hit')
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        metrics.inc('blog_cache_requests_total', cache='xml', result='miss')
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code == 200 and not response.streaming:
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                settings.BLOG_SYNDICATION['CACHE_TTL'],
+            )
+        return response
+
+    return wrapped
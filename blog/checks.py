@@ -0,0 +1,31 @@
+"""Проверки конфигурации блога (``manage.py check``)."""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Кеши, содержимое которых видит только один процесс.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Сброс поисковой выдачи, её статистика и версия индекса тегов хранятся
+    в кеше ``default`` и должны быть видны всем воркерам и командам."""
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f'Кеш default ({backend}) не общий для процессов.',
+            hint=(
+                'Укажите FileBasedCache, DatabaseCache, Memcached или Redis: иначе '
+                'изменения постов не сбрасывают кеш поиска в других воркерах, '
+                'а команда search_cache не видит их статистику.'
+            ),
+            id='blog.E001',
+        )
+    ]
@@ -0,0 +1,127 @@
+"""Перенос старых и скрытых комментариев в ``ArchivedComment``.
+
+В архив уходят комментарии старше ``COMMENT_AGE_DAYS`` к постам старше
+``POST_AGE_DAYS`` и скрытые комментарии, не менявшиеся дольше
+``INACTIVE_RETENTION_DAYS`` (см. ``BLOG_COMMENT_ARCHIVE``). Перенос идёт
+пачками по возрастанию ``id``, каждая — в своей транзакции; позиция хранится
+в ``JobCheckpoint``, поэтому прерванный проход продолжается с места остановки.
+
+Строки удаляются из ``Comment`` без сигналов: перенос не меняет ни
+статистику комментаторов, ни рейтинг обсуждаемости.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedComment, Comment, JobCheckpoint
+from .pagination import decode_cursor, encode_cursor
+
+CHECKPOINT = 'comment_archive'
+COPIED_FIELDS = ('id', 'post_id', 'name', 'email', 'body', 'created', 'updated', 'active')
+
+
+def candidates(now=None):
+    config = settings.BLOG_COMMENT_ARCHIVE
+    now = now or timezone.now()
+    return Comment.objects.filter(
+        Q(
+            created__lt=now - timedelta(days=config['COMMENT_AGE_DAYS']),
+            post__publish__lt=now - timedelta(days=config['POST_AGE_DAYS']),
+        )
+        | Q(
+            active=False,
+            updated__lt=now - timedelta(days=config['INACTIVE_RETENTION_DAYS']),
+        )
+    )
+
+
+def archive_batch(checkpoint, now, batch_size):
+    """Переносит одну пачку; возвращает число перенесённых комментариев."""
+
+    with transaction.atomic():
+        checkpoint = JobCheckpoint.objects.select_for_update().get(pk=checkpoint.pk)
+        rows = list(
+            candidates(now)
+            .filter(pk__gt=checkpoint.position)
+            .order_by('pk')
+            .values(*COPIED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            # Проход завершён: следующий запуск снова начнёт с начала таблицы.
+            checkpoint.position = 0
+            checkpoint.save(update_fields=['position', 'updated'])
+            return 0
+        ids = [row['id'] for row in rows]
+        ArchivedComment.objects.bulk_create(
+            [ArchivedComment(**row) for row in rows], ignore_conflicts=True
+        )
+        Comment.objects.filter(pk__in=ids)._raw_delete(Comment.objects.db)
+        checkpoint.position = ids[-1]
+        checkpoint.save(update_fields=['position', 'updated'])
+        return len(rows)
+
+
+def archive(batch_size=1000, max_batches=None, now=None):
+    """Переносит подходящие комментарии пачками.
+
+    Возвращает (число перенесённых, завершён ли проход). При ``max_batches``
+    останавливается раньше; следующий вызов продолжит с той же позиции.
+    """
+
+    now = now or timezone.now()
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(checkpoint, now, batch_size)
+        if not count:
+            return moved, True
+        moved += count
+        batches += 1
+    return moved, False
+
+
+def _page_filter(created, pk):
+    return Q(created__lt=created) | Q(created=created, pk__lt=pk)
+
+
+def comments_page(post, cursor, per_page, fields=None):
+    """Страница активных комментариев поста, новые первыми.
+
+    Сначала читается горячая таблица; архив запрашивается, только когда
+    горячих комментариев на страницу не хватает. Все архивные активные
+    комментарии поста старше горячих, поэтому курсор ``(created, id)``
+    общий для обеих таблиц. ``post`` — пост или его id; с ``fields`` записи
+    читаются словарями ``values(*fields)`` (поля ``created`` и ``id``
+    обязательны). Возвращает (комментарии, курсор или ``None``).
+    """
+
+    position = decode_cursor(cursor) if cursor else None
+    items = []
+    for model in (Comment, ArchivedComment):
+        queryset = model.objects.filter(post=post, active=True)
+        if position:
+            queryset = queryset.filter(_page_filter(*position))
+        queryset = queryset.order_by('-created', '-pk')
+        if fields:
+            queryset = queryset.values(*fields)
+        items += queryset[: per_page + 1 - len(items)]
+        if len(items) > per_page:
+            break
+    if len(items) <= per_page:
+        return items, None
+    items = items[:per_page]
+    last = items[-1]
+    if fields:
+        return items, encode_cursor(last['created'], last['id'])
+    return items, encode_cursor(last.created, last.pk)
+
+
+def active_total(post):
+    return (
+        Comment.objects.filter(post=post, active=True).count()
+        + ArchivedComment.objects.filter(post=post, active=True).count()
+    )
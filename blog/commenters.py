@@ -0,0 +1,155 @@
+"""Инкрементальное ведение таблицы ``CommenterStats``."""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Lower
+
+from .models import ArchivedComment, Comment, CommenterStats
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def _comments_by(key, model=Comment):
+    return model.objects.annotate(email_key=Lower('email')).filter(
+        email_key=key, active=True
+    )
+
+
+def comment_added(email, name, created):
+    """Учитывает появление активного комментария."""
+
+    key = normalize_email(email)
+    updated = CommenterStats.objects.filter(email=key).update(
+        comments_total=F('comments_total') + 1,
+        name=Case(When(recent_comment__lte=created, then=Value(name)), default=F('name')),
+        recent_comment=Case(
+            When(recent_comment__lt=created, then=Value(created)),
+            default=F('recent_comment'),
+        ),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            CommenterStats.objects.create(
+                email=key, name=name, comments_total=1, recent_comment=created
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        comment_added(email, name, created)
+
+
+def comment_removed(email, created):
+    """Учитывает удаление, скрытие или смену email активного комментария."""
+
+    key = normalize_email(email)
+    CommenterStats.objects.filter(email=key).update(comments_total=F('comments_total') - 1)
+    stats = CommenterStats.objects.filter(email=key).first()
+    if stats is None:
+        return
+    if stats.comments_total <= 0:
+        stats.delete()
+    elif stats.recent_comment <= created:
+        # Убран самый свежий комментарий: берём следующий по индексу lower(email).
+        latest = (
+            _comments_by(key).order_by('-created').values('name', 'created').first()
+            or _comments_by(key, ArchivedComment)
+            .order_by('-created')
+            .values('name', 'created')
+            .first()
+        )
+        if latest:
+            CommenterStats.objects.filter(pk=stats.pk).update(
+                name=latest['name'], recent_comment=latest['created']
+            )
+
+
+def _totals(model, batch_size):
+    return (
+        model.objects.filter(active=True)
+        .annotate(email_key=Lower('email'))
+        .order_by()
+        .values('email_key')
+        .annotate(total=Count('id'), recent=Max('created'))
+        .iterator(chunk_size=batch_size)
+    )
+
+
+def _latest_name(model):
+    return (
+        model.objects.annotate(email_key=Lower('email'))
+        .filter(email_key=OuterRef('email'), active=True)
+        .order_by('-created')
+        .values('name')[:1]
+    )
+
+
+@transaction.atomic
+def refresh(keys):
+    """Пересчитывает строки для указанных email (в нижнем регистре)."""
+
+    for key in keys:
+        totals = [
+            _comments_by(key, model).aggregate(total=Count('id'), recent=Max('created'))
+            for model in (Comment, ArchivedComment)
+        ]
+        total = sum(row['total'] for row in totals)
+        if not total:
+            CommenterStats.objects.filter(email=key).delete()
+            continue
+        recent = max(row['recent'] for row in totals if row['recent'])
+        name = (
+            _comments_by(key).order_by('-created').values_list('name', flat=True).first()
+            or _comments_by(key, ArchivedComment)
+            .order_by('-created')
+            .values_list('name', flat=True)
+            .first()
+        )
+        CommenterStats.objects.update_or_create(
+            email=key,
+            defaults={'name': name, 'comments_total': total, 'recent_comment': recent},
+        )
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитывает таблицу целиком с учётом архива; возвращает число комментаторов."""
+
+    CommenterStats.objects.all().delete()
+    archived = {row['email_key']: row for row in _totals(ArchivedComment, batch_size)}
+    batch = []
+    created = 0
+
+    def rows():
+        for row in _totals(Comment, batch_size):
+            old = archived.pop(row['email_key'], None)
+            if old:
+                row['total'] += old['total']
+                row['recent'] = max(row['recent'], old['recent'])
+            yield row
+        yield from archived.values()
+
+    for row in rows():
+        batch.append(
+            CommenterStats(
+                email=row['email_key'],
+                name='',
+                comments_total=row['total'],
+                recent_comment=row['recent'],
+            )
+        )
+        if len(batch) >= batch_size:
+            CommenterStats.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    CommenterStats.objects.bulk_create(batch)
+    created += len(batch)
+
+    CommenterStats.objects.update(
+        name=Coalesce(
+            Subquery(_latest_name(Comment)), Subquery(_latest_name(ArchivedComment)), Value('')
+        )
+    )
+    return created
@@ -0,0 +1,109 @@
+"""Архив по датам: счётчики постов по месяцам и границы периодов."""
+
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from . import metrics
+from .models import ArchiveMonth, Post
+
+SIDEBAR_KEY = 'blog:archive:months'
+# Кеш сбрасывается при каждом изменении счётчиков; срок жизни страхует от
+# пропущенного сброса (например, после правки таблицы без сигналов).
+SIDEBAR_TTL = 3600
+
+
+def month_of(moment):
+    local = timezone.localtime(moment)
+    return local.year, local.month
+
+
+def period_bounds(year, month=None):
+    """Начало и конец года или месяца в текущем часовом поясе.
+
+    Фильтр по диапазону ``publish`` использует индекс, в отличие от
+    ``publish__year``, который SQLite вычисляет для каждой строки.
+    """
+
+    if month is None:
+        start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    elif month == 12:
+        start, end = datetime(year, 12, 1), datetime(year + 1, 1, 1)
+    else:
+        start, end = datetime(year, month, 1), datetime(year, month + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def adjust(moment, delta):
+    """Изменяет счётчик месяца, в который попадает ``moment``, на ``delta``."""
+
+    year, month = month_of(moment)
+    updated = ArchiveMonth.objects.filter(year=year, month=month).update(
+        posts_total=F('posts_total') + delta
+    )
+    if not updated and delta > 0:
+        try:
+            with transaction.atomic():
+                ArchiveMonth.objects.create(year=year, month=month, posts_total=delta)
+        except IntegrityError:
+            adjust(moment, delta)
+            return
+    if delta < 0:
+        ArchiveMonth.objects.filter(year=year, month=month, posts_total__lte=0).delete()
+    transaction.on_commit(lambda: cache.delete(SIDEBAR_KEY))
+
+
+def _months(queryset):
+    return [
+        {'date': date(year, month, 1), 'year': year, 'month': month, 'count': count}
+        for year, month, count in queryset.filter(posts_total__gt=0)
+        .order_by('-year', '-month')
+        .values_list('year', 'month', 'posts_total')
+    ]
+
+
+def sidebar():
+    """Все месяцы с публикациями одним закешированным запросом."""
+
+    months = cache.get(SIDEBAR_KEY)
+    metrics.inc(
+        'blog_cache_requests_total',
+        cache='archive_sidebar',
+        result='miss' if months is None else 'hit',
+    )
+    if months is None:
+        months = _months(ArchiveMonth.objects.all())
+        cache.set(SIDEBAR_KEY, months, SIDEBAR_TTL)
+    return months
+
+
+def year_months(year):
+    """Месяцы года с публикациями, прямо из таблицы (без кеша)."""
+
+    return _months(ArchiveMonth.objects.filter(year=year))
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитывает счётчики по всем опубликованным постам."""
+
+    ArchiveMonth.objects.all().delete()
+    rows = (
+        Post.published.order_by()
+        .annotate(year=ExtractYear('publish'), month=ExtractMonth('publish'))
+        .values('year', 'month')
+        .annotate(total=Count('id'))
+    )
+    ArchiveMonth.objects.bulk_create(
+        [
+            ArchiveMonth(year=row['year'], month=row['month'], posts_total=row['total'])
+            for row in rows
+        ],
+        batch_size=batch_size,
+    )
+    transaction.on_commit(lambda: cache.delete(SIDEBAR_KEY))
+    return ArchiveMonth.objects.count()
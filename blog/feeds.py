@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import truncatewords
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Post, Tag
+
+FEED_FIELDS = (
+    'title',
+    'slug',
+    'body',
+    'publish',
+    'updated',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+)
+
+
+class LatestPostsFeed(Feed):
+    """RSS-лента последних публикаций."""
+
+    title = 'Digital Stories'
+    link = reverse_lazy('blog:post_list')
+    description = 'Свежие публикации блога Digital Stories.'
+
+    def get_posts(self):
+        return Post.published.select_related('author').only(*FEED_FIELDS)
+
+    def items(self):
+        return self.get_posts().order_by('-publish')[: settings.BLOG_SYNDICATION['FEED_ITEMS']]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return truncatewords(item.body, 40)
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.publish
+
+    def item_updateddate(self, item):
+        return item.updated
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+    """RSS-лента публикаций с заданным тегом."""
+
+    def get_object(self, request, tag_slug):
+        return get_object_or_404(Tag.objects.only('name', 'slug'), slug=tag_slug)
+
+    def title(self, tag):
+        return f'Digital Stories — #{tag.name}'
+
+    def link(self, tag):
+        return f"{reverse('blog:post_list')}?tag={tag.slug}"
+
+    def description(self, tag):
+        return f'Публикации с тегом «{tag.name}».'
+
+    def items(self, tag):
+        return (
+            self.get_posts()
+            .filter(tags=tag)
+            .order_by('-publish')[: settings.BLOG_SYNDICATION['FEED_ITEMS']]
+        )
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, tag):
+        return self.description(tag)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from blog import comment_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые и скрытые комментарии в архивную таблицу '
+        '(условия — BLOG_COMMENT_ARCHIVE). Прерванный запуск продолжается '
+        'с сохранённой позиции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Комментариев в одной транзакции.',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Остановиться после стольких пачек (ограничение времени работы).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать комментарии, подходящие для переноса.',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            total = comment_archive.candidates().count()
+            self.stdout.write(f'Подходят для переноса: {total}')
+            return
+        moved, finished = comment_archive.archive(
+            batch_size=options['batch_size'], max_batches=options['max_batches']
+        )
+        status = 'проход завершён' if finished else 'проход будет продолжен при следующем запуске'
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {moved} ({status}).'))
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from blog.models import Post
+
+
+def call(request):
+    match = resolve(request.path)
+    response = match.func(request, *match.args, **match.kwargs)
+    if response.streaming:
+        return response.status_code, b''.join(response.streaming_content)
+    return response.status_code, response.content
+
+
+def measure(factory, url, repeat, headers=None):
+    """Возвращает (код, байт, SQL-запросов, запросов в секунду)."""
+
+    # Прогрев: загрузка шаблонов и кеши.
+    call(factory.get(url, **(headers or {})))
+    with CaptureQueriesContext(connection) as queries:
+        status, content = call(factory.get(url, **(headers or {})))
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call(factory.get(url, **(headers or {})))
+    elapsed = time.perf_counter() - started
+    return status, len(content), len(queries), repeat / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность JSON API и HTML-страниц '
+        'списка постов и страницы поста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        post = Post.published.order_by('-publish').first()
+        if post is None:
+            raise CommandError('Нет опубликованных постов: запустите seed_blog.')
+        factory = RequestFactory()
+        api_post = reverse('blog:api_post', args=[post.pk])
+        cases = [
+            ('HTML список', reverse('blog:post_list'), None),
+            ('API список', reverse('blog:api_posts'), None),
+            ('API список, fields=id,title', reverse('blog:api_posts') + '?fields=id,title', None),
+            ('HTML пост', post.get_absolute_url(), None),
+            ('API пост', api_post, None),
+            ('API комментарии', reverse('blog:api_post_comments', args=[post.pk]), None),
+        ]
+        etag = resolve(api_post).func(factory.get(api_post), pk=post.pk)['ETag']
+        cases.append(('API пост, 304', api_post, {'HTTP_IF_NONE_MATCH': etag}))
+
+        self.stdout.write(
+            f"{'запрос':30} {'код':>4} {'байт':>8} {'SQL':>4} {'запросов/с':>11}"
+        )
+        for label, url, headers in cases:
+            status, size, queries, rate = measure(factory, url, options['repeat'], headers)
+            self.stdout.write(f'{label:30} {status:4} {size:8} {queries:4} {rate:11.0f}')
@@ -0,0 +1,78 @@
+import statistics
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from blog import views
+
+# Разметка первого виджета: после её получения браузер может отрисовать
+# шапку, вступление и первую колонку (прокси для first contentful paint).
+FIRST_WIDGET = b'id="widget-latest"'
+
+
+def query_delay(seconds):
+    """``execute_wrapper``, имитирующий сетевую задержку до сервера БД."""
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    return wrapper
+
+
+def measure(request):
+    """Возвращает (TTFB, первый виджет, полный ответ) в миллисекундах."""
+
+    started = time.perf_counter()
+    response = views.home(request)
+    chunks = response.streaming_content if response.streaming else [response.content]
+    ttfb = first_widget = None
+    received = b''
+    for chunk in chunks:
+        now = time.perf_counter()
+        if ttfb is None:
+            ttfb = now
+        received += chunk
+        if first_widget is None and FIRST_WIDGET in received:
+            first_widget = now
+    total = time.perf_counter()
+    return tuple((moment - started) * 1000 for moment in (ttfb, first_widget, total))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает TTFB и время до первого виджета главной страницы '
+        'при потоковой отдаче и при обычном render().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--query-delay',
+            type=float,
+            default=0.0,
+            help='Искусственная задержка каждого SQL-запроса, мс (имитация сетевой БД).',
+        )
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        delay = options['query_delay'] / 1000
+        wrapper = connection.execute_wrapper(query_delay(delay)) if delay else nullcontext()
+        self.stdout.write(
+            f"{'режим':10} {'метрика':14} {'медиана, мс':>12} {'p95, мс':>10}"
+        )
+        with wrapper:
+            for label, streaming in (('render', False), ('stream', True)):
+                with override_settings(BLOG_STREAM_HOME=streaming):
+                    # Прогрев: загрузка шаблонов и кеши.
+                    measure(factory.get('/'))
+                    samples = [measure(factory.get('/')) for _ in range(options['repeat'])]
+                for position, metric in enumerate(('TTFB', 'первый виджет', 'весь ответ')):
+                    values = sorted(sample[position] for sample in samples)
+                    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+                    self.stdout.write(
+                        f'{label:10} {metric:14} {statistics.median(values):12.2f} {p95:10.2f}'
+                    )
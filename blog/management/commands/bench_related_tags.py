@@ -0,0 +1,59 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import related_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет расчёт похожих тегов на синтетических данных '
+        '(по умолчанию 1 000 000 постов × 10 000 тегов). База не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--tags', type=int, default=10_000)
+        parser.add_argument(
+            '--tags-per-post',
+            type=int,
+            default=3,
+            help='Тегов у каждого поста; популярность тегов распределена по Ципфу.',
+        )
+        parser.add_argument(
+            '--stale',
+            type=int,
+            default=100,
+            help='Сколько случайных тегов пересчитать в инкрементальном режиме.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not related_tags.available():
+            raise CommandError('Для расчёта похожих тегов установите numpy и scipy.')
+        np = related_tags.np
+        rng = np.random.default_rng(options['seed'])
+        posts, tags, per_post = options['posts'], options['tags'], options['tags_per_post']
+
+        weights = 1 / np.arange(1, tags + 1)
+        post_ids = np.repeat(np.arange(1, posts + 1), per_post)
+        tag_ids = rng.choice(np.arange(1, tags + 1), size=len(post_ids), p=weights / weights.sum())
+        pairs = np.unique(np.column_stack([post_ids, tag_ids]), axis=0)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{posts} постов × {tags} тегов, {len(pairs)} связей'))
+
+        started = time.perf_counter()
+        matrix, ids, posts_total = related_tags.incidence_from_pairs(pairs)
+        self.report('Матрица инцидентности', started)
+
+        started = time.perf_counter()
+        rows, _, _, _ = related_tags.compute(matrix, posts_total)
+        self.report(f'Полный расчёт ({len(rows)} связей)', started)
+
+        stale = np.array(sorted(random.Random(options['seed']).sample(range(len(ids)), options['stale'])))
+        started = time.perf_counter()
+        rows, _, _, _ = related_tags.compute(matrix, posts_total, stale)
+        self.report(f'Инкрементальный расчёт {len(stale)} тегов ({len(rows)} связей)', started)
+
+    def report(self, label, started):
+        self.stdout.write(f'{label}: {time.perf_counter() - started:.2f} с')
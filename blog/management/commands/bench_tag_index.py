@@ -0,0 +1,104 @@
+import random
+import statistics
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.tag_index import TagIndex
+
+
+def index_size(index):
+    """Примерный объём индекса в байтах (без словарей-контейнеров)."""
+
+    total = sys.getsizeof(index.post_ids) + sys.getsizeof(index.slot_of)
+    total += sys.getsizeof(index.tag_offsets) + sys.getsizeof(index.tag_data)
+    total += sum(sys.getsizeof(bitmap) for bitmap in index.dense.values())
+    total += sum(sys.getsizeof(slots) for slots in index.sparse.values())
+    total += sys.getsizeof(index.dense) + sys.getsizeof(index.sparse)
+    return total
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет память и задержки индекса тегов на синтетических данных '
+        '(по умолчанию 1 000 000 постов × 5 000 тегов). База не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--tags', type=int, default=5000)
+        parser.add_argument(
+            '--tags-per-post',
+            type=int,
+            default=3,
+            help='Тегов у каждого поста; популярность тегов распределена по Ципфу.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        posts, tags, per_post = options['posts'], options['tags'], options['tags_per_post']
+        weights = [1 / rank for rank in range(1, tags + 1)]
+        cumulative = []
+        running = 0.0
+        for weight in weights:
+            running += weight
+            cumulative.append(running)
+
+        def pairs():
+            for post_id in range(1, posts + 1):
+                for tag_id in set(rng.choices(range(1, tags + 1), cum_weights=cumulative, k=per_post)):
+                    yield post_id, tag_id
+
+        started = time.perf_counter()
+        index = TagIndex(range(1, posts + 1), pairs())
+        build = time.perf_counter() - started
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{posts} постов × {tags} тегов'))
+        self.stdout.write(f'Построение (вместе с генерацией данных): {build:.2f} с')
+        self.stdout.write(
+            f'Память индекса: {index_size(index) / 2**20:.1f} МБ '
+            f'(битовых карт: {len(index.dense)}, массивов: {len(index.sparse)})'
+        )
+
+        popular, second, mid, rare = 1, 2, tags // 10, tags
+        scenarios = {
+            'AND популярный+популярный': lambda: index.filter({popular, second}),
+            'AND популярный+редкий': lambda: index.filter({popular, rare}),
+            'AND средний+средний': lambda: index.filter({mid, mid + 1}),
+            'OR три тега': lambda: index.filter({popular, mid, rare}, 'any'),
+        }
+        for label, run in scenarios.items():
+            timings, result = self.measure(run, options['repeat'])
+            self.stdout.write(f'{label}: {timings:.2f} мс, найдено {bin(result).count("1")}')
+
+        result = index.filter({popular})
+        timings, _ = self.measure(lambda: index.page(result, 0, 20), options['repeat'])
+        self.stdout.write(f'Первая страница (20 id): {timings:.2f} мс')
+        deep = bin(result).count('1') // 2
+        timings, _ = self.measure(lambda: index.page(result, deep, 20), options['repeat'])
+        self.stdout.write(f'Страница со смещением {deep}: {timings:.2f} мс')
+
+        for label, bitmap in (
+            ('популярного тега', result),
+            ('редкого тега', index.filter({mid})),
+        ):
+            timings, counts = self.measure(
+                lambda bitmap=bitmap: index.facets(bitmap), options['repeat']
+            )
+            self.stdout.write(
+                f'Фасеты для выборки {label}: {timings:.2f} мс, тегов с ненулевым счётчиком {len(counts)}'
+            )
+        index.selection_facets({popular})
+        timings, _ = self.measure(lambda: index.selection_facets({popular}), options['repeat'])
+        self.stdout.write(f'Повторные фасеты из кеша: {timings:.3f} мс')
+
+    def measure(self, run, repeat):
+        timings = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,89 @@
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import profiling
+
+SORT_KEYS = {
+    'total': lambda meta: meta['total_ms'],
+    'sql': lambda meta: meta['sql']['total_ms'],
+    'queries': lambda meta: meta['sql']['count'],
+    'template': lambda meta: meta['template_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Работа с сохранёнными профилями запросов: list — самые медленные, '
+        'show <id> — горячие функции и SQL, diff <id> <id> — сравнение двух профилей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('list', 'show', 'diff'))
+        parser.add_argument('ids', nargs='*', help='Идентификаторы профилей.')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='total',
+            help='Поле сортировки для list.',
+        )
+        parser.add_argument('--view', help='Только профили указанного представления (blog:home).')
+
+    def handle(self, *args, **options):
+        action, ids = options['action'], options['ids']
+        expected = {'list': 0, 'show': 1, 'diff': 2}[action]
+        if len(ids) != expected:
+            raise CommandError(f'{action}: ожидается идентификаторов профилей: {expected}')
+        try:
+            getattr(self, f'handle_{action}')(*ids, **options)
+        except FileNotFoundError as exc:
+            raise CommandError(f'Профиль не найден: {exc.filename}')
+
+    def handle_list(self, limit, sort, view, **options):
+        profiles = [
+            meta for meta in profiling.load_profiles() if not view or meta['view'] == view
+        ]
+        profiles.sort(key=SORT_KEYS[sort], reverse=True)
+        if not profiles:
+            self.stdout.write('Профилей пока нет.')
+        for meta in profiles[:limit]:
+            self.stdout.write(
+                f"{meta['id']}  {meta['total_ms']:9.1f} мс  "
+                f"SQL {meta['sql']['count']:4d} / {meta['sql']['total_ms']:8.1f} мс  "
+                f"шаблоны {meta['template_ms']:8.1f} мс  "
+                f"{meta['status']} {meta['method']} {meta['path']} [{meta['view']}, {meta['trigger']}]"
+            )
+
+    def handle_show(self, profile_id, limit, **options):
+        meta = profiling.load_meta(profile_id)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{meta['method']} {meta['path']} ({meta['view']})"))
+        self.stdout.write(
+            f"Всего {meta['total_ms']:.1f} мс, SQL {meta['sql']['count']} запросов "
+            f"за {meta['sql']['total_ms']:.1f} мс, шаблоны {meta['template_ms']:.1f} мс"
+        )
+        self.stdout.write(self.style.MIGRATE_LABEL('Хронология SQL:'))
+        for query in meta['sql']['queries'][:limit]:
+            self.stdout.write(
+                f"  +{query['start_ms']:8.1f} мс  {query['duration_ms']:7.2f} мс  {query['sql'][:160]}"
+            )
+        self.stdout.write(self.style.MIGRATE_LABEL('Функции по суммарному времени:'))
+        buffer = io.StringIO()
+        stats = profiling.load_stats(profile_id)
+        stats.stream = buffer
+        stats.sort_stats('cumulative').print_stats(limit)
+        self.stdout.write(buffer.getvalue())
+
+    def handle_diff(self, before_id, after_id, limit, **options):
+        before, after = profiling.load_meta(before_id), profiling.load_meta(after_id)
+        for label, getter in (
+            ('Всего, мс', lambda meta: meta['total_ms']),
+            ('SQL, мс', lambda meta: meta['sql']['total_ms']),
+            ('SQL, запросов', lambda meta: meta['sql']['count']),
+            ('Шаблоны, мс', lambda meta: meta['template_ms']),
+        ):
+            old, new = getter(before), getter(after)
+            self.stdout.write(f'{label:15} {old:10.1f} → {new:10.1f}  ({new - old:+.1f})')
+        self.stdout.write(self.style.MIGRATE_LABEL('Наибольшие изменения cumtime, мс:'))
+        for name, old, new in profiling.diff_functions(before_id, after_id)[:limit]:
+            self.stdout.write(f'  {new - old:+10.2f}  {old:10.2f} → {new:10.2f}  {name}')
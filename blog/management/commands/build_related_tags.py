@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import related_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает похожие теги по совместной встречаемости в опубликованных '
+        'постах (нужны numpy и scipy).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Пересчитать только теги, помеченные сигналами как устаревшие.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при записи связей.',
+        )
+
+    def handle(self, *args, **options):
+        if not related_tags.available():
+            raise CommandError('Для расчёта похожих тегов установите numpy и scipy.')
+        started = time.perf_counter()
+        if options['incremental']:
+            tags, links = related_tags.refresh_stale(batch_size=options['batch_size'])
+        else:
+            tags = None
+            links = related_tags.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        scope = 'все теги' if tags is None else f'устаревших тегов: {tags}'
+        self.stdout.write(
+            self.style.SUCCESS(f'Похожие теги ({scope}): {links} связей за {elapsed:.2f} с.')
+        )
@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from blog import prerender
+
+
+class Command(BaseCommand):
+    help = (
+        'Рендерит публичные страницы блога (главная, страницы каталога, подборки '
+        'по тегам и парам тегов, архив, авторы, страницы постов) в каталог '
+        'статических HTML-файлов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(Path(settings.BASE_DIR) / 'var' / 'static_site'),
+            help='Каталог для HTML-файлов (по умолчанию var/static_site).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число процессов для рендера; 1 — рендер в текущем процессе.',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Игнорирует манифест и пересобирает все страницы.',
+        )
+
+    def handle(self, *args, **options):
+        root = Path(options['output'])
+        started = timezone.now()
+        state = prerender.site_state()
+        authors = prerender.author_state()
+        facets = prerender.tag_facets()
+        manifest = None if options['full'] else prerender.load_manifest(root)
+        if manifest and not {'pages', 'authors'} <= set(manifest):
+            # Манифест старого формата не знает, какие страницы уже собраны.
+            manifest = None
+        urls, stale, pages = prerender.plan_pages(state, authors, facets, manifest)
+
+        if manifest is None:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Полная сборка: {len(urls)} страниц'))
+        else:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"Инкрементальная сборка от {manifest['built_at']}: "
+                    f'{len(urls)} страниц, удалить {len(stale)}'
+                )
+            )
+
+        for url in stale:
+            # Каталог страницы может содержать вложенные страницы
+            # (``posts/tag/ai/page/2/``), поэтому удаляется только файл,
+            # а затем опустевшие каталоги.
+            target = root / prerender.url_to_file(url)
+            target.unlink(missing_ok=True)
+            for directory in target.parents:
+                if directory == root or any(directory.iterdir()):
+                    break
+                directory.rmdir()
+
+        results = self.render(root, urls, options['workers'])
+        failed = [(url, status) for url, status, _ in results if status != 200]
+        for url, status in failed:
+            self.stderr.write(self.style.ERROR(f'{url}: HTTP {status}'))
+
+        if failed:
+            # Манифест не обновляется: следующая инкрементальная сборка
+            # снова сравнит состояние со старым и повторит эти страницы.
+            raise CommandError(
+                f'Не отрендерено страниц: {len(failed)}; манифест не обновлён.'
+            )
+        prerender.save_manifest(root, state, authors, pages, started)
+        total = sum(size for _, status, size in results if status == 200)
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Готово: {len(results)} страниц, {total / 1024:.1f} КБ '
+                f'за {elapsed:.2f} с → {root}'
+            )
+        )
+
+    def render(self, root, urls, workers):
+        job = partial(prerender.render_to_file, str(root))
+        if workers <= 1 or len(urls) < 2:
+            return [job(url) for url in urls]
+        # Соединения с БД не должны наследоваться дочерними процессами.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=prerender.init_worker
+        ) as pool:
+            return list(pool.map(job, urls, chunksize=max(1, len(urls) // (workers * 4))))
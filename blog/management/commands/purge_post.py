@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import purge
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пост вместе со всеми комментариями (включая архивные), '
+        'не загружая комментарии в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('post_ids', nargs='+', type=int, help='id удаляемых постов.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Комментариев, удаляемых одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.in_bulk(options['post_ids'])
+        missing = sorted(set(options['post_ids']) - set(posts))
+        if missing:
+            raise CommandError(f'Посты не найдены: {", ".join(map(str, missing))}')
+        for post in posts.values():
+            title = post.title
+            comments = purge.purge_post(post, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Удалён пост «{title}» и {comments} комментариев.')
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from blog import authors, commenters, date_archive
+
+TARGETS = {
+    'commenters': ('Статистика комментаторов', commenters.rebuild),
+    'archive': ('Счётчики архива по месяцам', date_archive.rebuild),
+    'authors': ('Статистика авторов', authors.rebuild),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает с нуля таблицы статистики, которые в обычном режиме '
+        'обновляются сигналами. Нужна после массовых правок в обход ORM.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            action='append',
+            choices=sorted(TARGETS),
+            help='Пересчитать только указанную таблицу (можно повторять).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при записи строк.',
+        )
+
+    def handle(self, *args, **options):
+        for name in options['only'] or TARGETS:
+            label, rebuild = TARGETS[name]
+            rows = rebuild(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{label}: {rows} строк.'))
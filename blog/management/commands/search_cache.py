@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику кеша поисковой выдачи и при необходимости очищает его.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удаляет все закешированные результаты поиска.',
+        )
+
+    def handle(self, *args, **options):
+        data = search.stats()
+        self.stdout.write(
+            f"Попаданий: {data['hits']}, промахов: {data['misses']}, "
+            f"доля попаданий: {data['hit_rate']:.1%}, запросов в кеше: {data['cached_terms']}"
+        )
+        if options['clear']:
+            search.clear()
+            self.stdout.write(self.style.SUCCESS('Кеш поиска очищен.'))
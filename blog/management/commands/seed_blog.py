@@ -1,10 +1,12 @@
 from datetime import timedelta
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
+from blog import purge
 from blog.models import Comment, Post, PostStatus, Tag
 
 
@@ -17,15 +19,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Предварительно очищает таблицы блога перед заполнением.',
         )
+        parser.add_argument(
+            '--truncate',
+            action='store_true',
+            help='С --reset: очищать таблицы одним TRUNCATE/DELETE вместо удаления пачками.',
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         if options['reset']:
             self.stdout.write(self.style.WARNING('Очищаю таблицы блога...'))
-            Comment.objects.all().delete()
-            Post.objects.all().delete()
-            Tag.objects.all().delete()
+            # Очистка идёт своими транзакциями, до заполнения.
+            deleted = purge.purge_all(truncate=options['truncate'])
+            if not options['truncate']:
+                self.stdout.write(f'Удалено строк: {sum(deleted.values())}')
+        self.populate()
 
+    @transaction.atomic
+    def populate(self):
         self.stdout.write(self.style.MIGRATE_HEADING('Создаю авторов...'))
         authors_data = [
             {
@@ -280,4 +290,6 @@ class Command(BaseCommand):
         total_comments = Comment.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Комментариев всего: {total_comments} (новых {created_comments})'))
 
+        call_command('update_trending', rebuild=True, stdout=self.stdout)
+
         self.stdout.write(self.style.SUCCESS('Данные успешно подготовлены.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from blog import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет рейтинг обсуждаемости постов по новым комментариям. '
+        'Предназначена для периодического запуска (cron, systemd timer).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Пересчитывает рейтинг по всем активным комментариям.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пакета при чтении комментариев и записи рейтинга.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            posts = trending.rebuild(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Рейтинг пересчитан для {posts} постов.'))
+            return
+        comments, posts = trending.update_incremental(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Учтено новых комментариев: {comments}, обновлено постов: {posts}.')
+        )
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import warmup
+
+# Импорт точки входа в чистом интерпретаторе: то же, что делает воркер
+# gunicorn/uvicorn до первого запроса.
+STARTUP_CODE = 'from django.core.wsgi import get_wsgi_application; get_wsgi_application()'
+
+
+def profile_imports():
+    """Запускает ``python -X importtime``; возвращает (мс на старт, [(мс, модуль)])."""
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1000, name[1:].rstrip()))
+    return elapsed, modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает процесс (шаблоны, URL, соединения, кеши, синтетические '
+        'запросы) и показывает время каждого шага.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--imports',
+            action='store_true',
+            help='Замерить старт точки входа WSGI и показать самые дорогие импорты.',
+        )
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой, если превышены бюджеты BLOG_WARMUP.',
+        )
+
+    def handle(self, *args, **options):
+        config = settings.BLOG_WARMUP
+        failures = []
+
+        if options['imports'] or options['check']:
+            elapsed, modules = profile_imports()
+            self.stdout.write(f'Старт точки входа WSGI: {elapsed:.0f} мс')
+            if options['imports']:
+                # Модули верхнего уровня: их время уже включает вложенные импорты.
+                top = [(ms, name) for ms, name in modules if not name.startswith(' ')]
+                for ms, name in sorted(top, reverse=True)[: options['top']]:
+                    self.stdout.write(f'  {ms:8.1f} мс  {name}')
+            if elapsed > config['STARTUP_BUDGET_MS']:
+                failures.append(
+                    f'старт {elapsed:.0f} мс > {config["STARTUP_BUDGET_MS"]} мс'
+                )
+
+        total = 0
+        for key, label, result, ms in warmup.warm_up():
+            total += ms
+            if key == 'requests':
+                self.stdout.write(f'{label}: {ms:.1f} мс')
+                for url, status, url_ms in result:
+                    self.stdout.write(f'  {status} {url_ms:7.1f} мс  {url}')
+            else:
+                self.stdout.write(f'{label}: {ms:.1f} мс ({result})')
+        self.stdout.write(f'Прогрев: {total:.0f} мс')
+        if total > config['WARMUP_BUDGET_MS']:
+            failures.append(f'прогрев {total:.0f} мс > {config["WARMUP_BUDGET_MS"]} мс')
+
+        if options['check'] and failures:
+            raise CommandError('Бюджет превышен: ' + '; '.join(failures))
@@ -0,0 +1,253 @@
+"""Метрики в формате Prometheus: задержки представлений, SQL, кеши, шаблоны.
+
+Значения копятся в памяти процесса под одной блокировкой (операция —
+несколько сложений). Если задан ``BLOG_METRICS['DIR']``, каждый воркер не
+чаще раза в ``FLUSH_INTERVAL`` секунд сбрасывает снимок в свой файл
+``metrics-<pid>.json``, а ``/metrics`` суммирует файлы всех воркеров.
+Каталог нужно очищать при перезапуске сервиса, как и multiprocess-каталог
+``prometheus_client``.
+"""
+
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNTS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'blog_request_duration_seconds': (
+        'histogram', SECONDS, 'Время обработки запроса по имени URL.'),
+    'blog_db_queries_per_request': (
+        'histogram', QUERY_COUNTS, 'Число SQL-запросов на HTTP-запрос.'),
+    'blog_db_query_duration_seconds': (
+        'histogram', SECONDS, 'Время выполнения отдельного SQL-запроса.'),
+    'blog_template_render_seconds': (
+        'histogram', SECONDS, 'Время рендера шаблона верхнего уровня.'),
+    'blog_cache_requests_total': (
+        'counter', None, 'Обращения к кешам блога по результату (hit/miss).'),
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][1]
+        position = len(buckets)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                position = index
+                break
+        key = (name, labels)
+        with self.lock:
+            state = self.histograms.get(key)
+            if state is None:
+                # Счётчики корзин (последняя — +Inf), сумма и количество.
+                state = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(state)] for (name, labels), state in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+def enabled():
+    return settings.BLOG_METRICS['ENABLED']
+
+
+def labels(**values):
+    return tuple(sorted(values.items()))
+
+
+def inc(name, amount=1, **label_values):
+    if enabled():
+        registry.inc(name, labels(**label_values), amount)
+
+
+def observe(name, value, **label_values):
+    if enabled():
+        registry.observe(name, labels(**label_values), value)
+
+
+def flush(force=False):
+    """Сохраняет снимок процесса в общий каталог (если он настроен)."""
+
+    directory = settings.BLOG_METRICS['DIR']
+    now = time.monotonic()
+    if not directory or (
+        not force and now - registry.last_flush < settings.BLOG_METRICS['FLUSH_INTERVAL']
+    ):
+        return
+    registry.last_flush = now
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+        json.dump(registry.snapshot(), fh)
+    os.replace(tmp, directory / f'metrics-{os.getpid()}.json')
+
+
+def collect():
+    """Складывает снимки всех процессов; без каталога — только текущий."""
+
+    directory = settings.BLOG_METRICS['DIR']
+    if not directory:
+        snapshots = [registry.snapshot()]
+    else:
+        flush(force=True)
+        snapshots = []
+        for path in Path(directory).glob('metrics-*.json'):
+            try:
+                with open(path, encoding='utf-8') as fh:
+                    snapshots.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, label_pairs, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, label_pairs)))
+            counters[key] = counters.get(key, 0) + value
+        for name, label_pairs, state in snapshot['histograms']:
+            key = (name, tuple(map(tuple, label_pairs)))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], state)]
+            else:
+                histograms[key] = list(state)
+    return counters, histograms
+
+
+def _format_labels(label_pairs, extra=()):
+    pairs = list(label_pairs) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render_text():
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, buckets, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, label_pairs), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(label_pairs)} {value}')
+            continue
+        for (metric, label_pairs), state in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], state[:-2]):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_format_labels(label_pairs, [("le", bound)])} {cumulative}'
+                )
+            lines.append(f'{name}_sum{_format_labels(label_pairs)} {state[-2]}')
+            lines.append(f'{name}_count{_format_labels(label_pairs)} {state[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def authorized(request):
+    """Доступ по ``Authorization: Bearer <TOKEN>`` или с адресов ``ALLOWED_IPS``.
+
+    За обратным прокси на той же машине ``REMOTE_ADDR`` у всех запросов —
+    адрес прокси, поэтому список адресов по умолчанию пуст.
+    """
+
+    config = settings.BLOG_METRICS
+    token = config['TOKEN']
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(
+            credentials.encode(), token.encode()
+        ):
+            return True
+    return request.META.get('REMOTE_ADDR') in config['ALLOWED_IPS']
+
+
+def metrics_view(request):
+    """Текстовый формат Prometheus; доступ проверяет ``authorized``."""
+
+    if not authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class QueryRecorder:
+    """Обёртка ``execute_wrapper``: считает запросы и их время.
+
+    Метка ``view`` уточняется после разрешения URL (см. ``MetricsMiddleware``).
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            observe('blog_db_query_duration_seconds', time.perf_counter() - started, view=self.view)
+
+
+class InstrumentedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            observe(
+                'blog_template_render_seconds',
+                time.perf_counter() - started,
+                template=self.template.origin.template_name,
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, замеряющий время рендера каждого шаблона."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
@@ -0,0 +1,103 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics, profiling
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос по требованию сотрудника или выборочно.
+
+    Сотрудник (``is_staff``) включает профилирование заголовком
+    ``X-Blog-Profile`` или параметром ``?_profile=1``; кроме того, доля
+    ``SAMPLE_RATE`` всех запросов профилируется случайно. Для остальных
+    запросов стоимость — пара проверок строк без разбора параметров.
+    Должен стоять после ``AuthenticationMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        config = settings.BLOG_PROFILING
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = config['HEADER']
+        self.param = config['QUERY_PARAM']
+        self.sample_rate = config['SAMPLE_RATE']
+
+    def __call__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        response, profile_id = profiling.profile_request(self.get_response, request, trigger)
+        if trigger != 'sample' and profile_id:
+            response['X-Blog-Profile-Id'] = profile_id
+        return response
+
+    def trigger(self, request):
+        requested = None
+        if self.header in request.META:
+            requested = 'header'
+        elif self.param in request.META.get('QUERY_STRING', '') and self.param in request.GET:
+            requested = 'param'
+        if requested:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_active and user.is_staff:
+                return requested
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+
+class MetricsMiddleware:
+    """Снимает задержку и SQL-запросы каждого представления для ``/metrics``.
+
+    Должен стоять первым, чтобы учитывать время остальных middleware. У
+    потоковых ответов запросы и рендер идут во время отдачи тела, поэтому
+    они учитываются, когда тело отдано целиком или ответ закрыт.
+    """
+
+    def __init__(self, get_response):
+        if not settings.BLOG_METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        recorder = metrics.QueryRecorder('unresolved')
+        request._blog_query_recorder = recorder
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        recorder.view = match.view_name if match else 'unresolved'
+        status = f'{response.status_code // 100}xx'
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, started, recorder, status
+            )
+        else:
+            self.record(started, recorder, status)
+        return response
+
+    def stream(self, content, started, recorder, status):
+        try:
+            with connection.execute_wrapper(recorder):
+                yield from content
+        finally:
+            self.record(started, recorder, status)
+
+    @staticmethod
+    def record(started, recorder, status):
+        metrics.observe(
+            'blog_request_duration_seconds',
+            time.perf_counter() - started,
+            view=recorder.view,
+            status=status,
+        )
+        metrics.observe('blog_db_queries_per_request', recorder.count, view=recorder.view)
+        metrics.flush()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._blog_query_recorder.view = request.resolver_match.view_name
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:04
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Как blog.trending.EPOCH: хранимые рейтинги отсчитываются от этой даты.
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def populate_trending_scores(apps, schema_editor):
+    # Как trending.rebuild() на момент этой миграции: без рейтинга виджет
+    # «Обсуждаемое» пуст до первого запуска update_trending.
+    Comment = apps.get_model('blog', 'Comment')
+    Post = apps.get_model('blog', 'Post')
+    JobCheckpoint = apps.get_model('blog', 'JobCheckpoint')
+    rate = math.log(2) / (settings.BLOG_TRENDING['HALF_LIFE_HOURS'] * 3600)
+    last_pk = Comment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    scores = defaultdict(lambda: None)
+    rows = (
+        Comment.objects.filter(active=True, pk__lte=last_pk)
+        .order_by()
+        .values_list('post_id', 'created')
+        .iterator(chunk_size=1000)
+    )
+    for post_id, created in rows:
+        weight = rate * (created - EPOCH).total_seconds()
+        score = scores[post_id]
+        if score is None:
+            scores[post_id] = weight
+        else:
+            high, low = max(score, weight), min(score, weight)
+            scores[post_id] = high + math.log1p(math.exp(low - high))
+    Post.objects.bulk_update(
+        [Post(pk=pk, trending_score=score) for pk, score in scores.items()],
+        ['trending_score'],
+        batch_size=1000,
+    )
+    JobCheckpoint.objects.update_or_create(name='trending', defaults={'position': last_pk})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_status_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Задача')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Позиция')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка задачи',
+                'verbose_name_plural': 'Контрольные точки задач',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Рейтинг обсуждаемости'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-trending_score'], name='blog_post_trending_idx'),
+        ),
+        migrations.RunPython(populate_trending_scores, migrations.RunPython.noop),
+    ]
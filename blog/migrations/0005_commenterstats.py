@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
+import django.db.models.functions.text
+
+
+def populate_commenter_stats(apps, schema_editor):
+    # Как commenters.rebuild() на момент этой миграции (архива ещё нет).
+    Comment = apps.get_model('blog', 'Comment')
+    CommenterStats = apps.get_model('blog', 'CommenterStats')
+    active = Comment.objects.filter(active=True).annotate(email_key=Lower('email'))
+    CommenterStats.objects.bulk_create(
+        [
+            CommenterStats(
+                email=row['email_key'],
+                comments_total=row['total'],
+                recent_comment=row['recent'],
+            )
+            for row in active.order_by()
+            .values('email_key')
+            .annotate(total=Count('id'), recent=Max('created'))
+        ],
+        batch_size=1000,
+    )
+    latest_name = (
+        active.filter(email_key=OuterRef('email')).order_by('-created').values('name')[:1]
+    )
+    CommenterStats.objects.update(name=Coalesce(Subquery(latest_name), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_trending_score_jobcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommenterStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='Email')),
+                ('name', models.CharField(max_length=80, verbose_name='Имя')),
+                ('comments_total', models.PositiveIntegerField(default=0, verbose_name='Активных комментариев')),
+                ('recent_comment', models.DateTimeField(verbose_name='Последний комментарий')),
+            ],
+            options={
+                'verbose_name': 'Статистика комментатора',
+                'verbose_name_plural': 'Статистика комментаторов',
+                'ordering': ('-comments_total', '-recent_comment'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='blog_comment_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commenterstats',
+            index=models.Index(fields=['-comments_total', '-recent_comment'], name='blog_commenter_top_idx'),
+        ),
+        migrations.RunPython(populate_commenter_stats, migrations.RunPython.noop),
+    ]
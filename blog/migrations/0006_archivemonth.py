@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:09
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def populate_archive_months(apps, schema_editor):
+    # Как date_archive.rebuild().
+    Post = apps.get_model('blog', 'Post')
+    ArchiveMonth = apps.get_model('blog', 'ArchiveMonth')
+    ArchiveMonth.objects.bulk_create(
+        [
+            ArchiveMonth(year=row['year'], month=row['month'], posts_total=row['total'])
+            for row in Post.objects.filter(status='PB')
+            .order_by()
+            .annotate(year=ExtractYear('publish'), month=ExtractMonth('publish'))
+            .values('year', 'month')
+            .annotate(total=Count('id'))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_commenterstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('posts_total', models.PositiveIntegerField(default=0, verbose_name='Опубликовано постов')),
+            ],
+            options={
+                'verbose_name': 'Месяц архива',
+                'verbose_name_plural': 'Месяцы архива',
+                'ordering': ('-year', '-month'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivemonth',
+            constraint=models.UniqueConstraint(fields=('year', 'month'), name='blog_archive_month_unique'),
+        ),
+        migrations.RunPython(populate_archive_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_archivemonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=80, verbose_name='Имя')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('body', models.TextField(verbose_name='Комментарий')),
+                ('created', models.DateTimeField(verbose_name='Создано')),
+                ('updated', models.DateTimeField(verbose_name='Обновлено')),
+                ('active', models.BooleanField(verbose_name='Активен')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to='blog.post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Архивный комментарий',
+                'verbose_name_plural': 'Архивные комментарии',
+                'ordering': ('-created',),
+                'indexes': [models.Index(fields=['post', 'active', '-created'], name='blog_archcomment_post_idx')],
+            },
+        ),
+    ]
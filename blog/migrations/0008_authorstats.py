@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def populate_author_stats(apps, schema_editor):
+    # Как authors.rebuild().
+    Post = apps.get_model('blog', 'Post')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    posts = {
+        row['author']: row
+        for row in Post.objects.filter(status='PB')
+        .order_by()
+        .values('author')
+        .annotate(total=Count('id'), latest=Max('publish'))
+    }
+    comments = {}
+    for name in ('Comment', 'ArchivedComment'):
+        rows = (
+            apps.get_model('blog', name)
+            .objects.filter(active=True)
+            .order_by()
+            .values('post__author')
+            .annotate(total=Count('id'))
+            .values_list('post__author', 'total')
+        )
+        for author_id, total in rows:
+            comments[author_id] = comments.get(author_id, 0) + total
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(
+                author_id=author_id,
+                published_posts=posts.get(author_id, {}).get('total', 0),
+                active_comments=comments.get(author_id, 0),
+                latest_publish=posts.get(author_id, {}).get('latest'),
+            )
+            for author_id in set(posts) | set(comments)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0007_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='blog_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('published_posts', models.PositiveIntegerField(default=0, verbose_name='Опубликовано постов')),
+                ('active_comments', models.PositiveIntegerField(default=0, verbose_name='Активных комментариев к постам')),
+                ('latest_publish', models.DateTimeField(blank=True, null=True, verbose_name='Последняя публикация')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+                'ordering': ('-latest_publish',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'status', '-publish'], name='blog_post_author_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authorstats',
+            index=models.Index(fields=['-latest_publish'], name='blog_author_latest_idx'),
+        ),
+        migrations.RunPython(populate_author_stats, migrations.RunPython.noop),
+    ]
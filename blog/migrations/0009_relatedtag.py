@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='related_stale',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Похожие теги устарели'),
+        ),
+        migrations.CreateModel(
+            name='RelatedTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Близость')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.tag', verbose_name='Похожий тег')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Похожий тег',
+                'verbose_name_plural': 'Похожие теги',
+                'ordering': ('tag', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedtag',
+            constraint=models.UniqueConstraint(fields=('tag', 'rank'), name='blog_related_tag_rank_uniq'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_relatedtag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_stale',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Рейтинг обсуждаемости устарел'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('trending_stale', True)), fields=['trending_stale'], name='blog_post_trending_stale_idx'),
+        ),
+    ]
@@ -2,11 +2,82 @@ from datetime import timedelta
 
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models import Count, Max, Q
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Lower
 from django.urls import reverse
 from django.utils import timezone
 
 
+class Casefold(models.Transform):
+    """``field__casefold``: сравнение без учёта регистра и для не-ASCII букв.
+
+    В SQLite ``LOWER`` и ``LIKE`` знают регистр только латиницы, поэтому там
+    вызывается функция ``blog_casefold`` (``str.casefold``), которую
+    ``blog.signals`` регистрирует для каждого соединения.
+    """
+
+    lookup_name = 'casefold'
+    function = 'LOWER'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='blog_casefold', **extra_context)
+
+
+models.CharField.register_lookup(Casefold)
+models.TextField.register_lookup(Casefold)
+
+
+class TrackedFieldsMixin:
+    """Запоминает значения полей на момент загрузки из БД.
+
+    Обработчики сигналов сравнивают их с текущими, чтобы понять, что именно
+    изменилось при сохранении, без дополнительного запроса к базе.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracking()
+        return instance
+
+    def reset_tracking(self, fields=None):
+        """Запоминает текущие значения всех отслеживаемых полей или ``fields``."""
+
+        loaded = {} if fields is None else getattr(self, '_loaded_values', {})
+        # Отложенные поля не читаем, чтобы не порождать лишние запросы.
+        self._loaded_values = {
+            **loaded,
+            **{
+                name: self.__dict__[name]
+                for name in self.tracked_fields
+                if name in self.__dict__ and (fields is None or name in fields)
+            },
+        }
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self.reset_tracking()
+        else:
+            self.reset_tracking({self._meta.get_field(name).attname for name in fields})
+
+    def loaded_value(self, name, default=None):
+        return getattr(self, '_loaded_values', {}).get(name, default)
+
+    def field_changed(self, *names):
+        loaded = getattr(self, '_loaded_values', {})
+        return any(
+            name not in loaded or loaded[name] != self.__dict__.get(name)
+            for name in names
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.reset_tracking()
+
+
 class PostStatus(models.TextChoices):
     DRAFT = 'DF', 'Черновик'
     PUBLISHED = 'PB', 'Опубликован'
@@ -31,9 +102,16 @@ class TagQuerySet(models.QuerySet):
         )
 
 
-class Tag(models.Model):
+class Tag(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('name',)
+
     name = models.CharField('Название', max_length=50, unique=True)
     slug = models.SlugField('URL-метка', max_length=50, unique=True)
+    related_stale = models.BooleanField(
+        'Похожие теги устарели',
+        default=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('name',)
@@ -49,6 +127,17 @@ class Tag(models.Model):
         return self.name
 
 
+def _active_comments(model):
+    totals = (
+        model.objects.filter(post=OuterRef('pk'), active=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(totals), 0)
+
+
 class PostQuerySet(models.QuerySet):
     """Набор запросов с бизнес-логикой для работы с постами блога."""
 
@@ -56,28 +145,36 @@ class PostQuerySet(models.QuerySet):
         return self.filter(status=Post.Status.PUBLISHED)
 
     def with_comment_counts(self):
+        """Число активных комментариев поста, включая перенесённые в архив.
+
+        Считается коррелированными подзапросами к обеим таблицам: без GROUP BY
+        по всей выборке, и подзапросы выполняются только для строк, попавших
+        в LIMIT.
+        """
+
         return self.annotate(
-            comment_count=Count(
-                'comments',
-                filter=Q(comments__active=True),
-                distinct=True,
-            )
+            comment_count=_active_comments(Comment) + _active_comments(ArchivedComment)
         )
 
-    def trending(self, days=30, min_comments=1):
+    def trending(self, days=30):
+        """Посты за последние ``days`` дней, упорядоченные по ``trending_score``.
+
+        Рейтинг поддерживает команда ``update_trending`` (см. ``blog.trending``).
+        """
+
         threshold_date = timezone.now() - timedelta(days=days)
         return (
             self.published()
-            .filter(publish__gte=threshold_date)
-            .with_comment_counts()
-            .filter(comment_count__gte=min_comments)
+            .filter(publish__gte=threshold_date, trending_score__isnull=False)
+            .order_by('-trending_score')
         )
 
     def for_search_term(self, term):
+        term = term.casefold()
         return self.published().filter(
-            Q(title__icontains=term)
-            | Q(body__icontains=term)
-            | Q(tags__name__icontains=term)
+            Q(title__casefold__contains=term)
+            | Q(body__casefold__contains=term)
+            | Q(tags__name__casefold__contains=term)
         ).distinct()
 
     def editors_choice(self):
@@ -105,8 +202,9 @@ class PublishedManager(PostManager):
         return super().get_queryset().published()
 
 
-class Post(models.Model):
+class Post(TrackedFieldsMixin, models.Model):
     Status = PostStatus
+    tracked_fields = ('title', 'body', 'status', 'publish', 'author_id')
 
     title = models.CharField('Заголовок', max_length=250)
     slug = models.SlugField('URL-метка', max_length=250, unique_for_date='publish')
@@ -132,6 +230,17 @@ class Post(models.Model):
         related_name='posts',
         blank=True,
     )
+    trending_score = models.FloatField(
+        'Рейтинг обсуждаемости',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    trending_stale = models.BooleanField(
+        'Рейтинг обсуждаемости устарел',
+        default=False,
+        editable=False,
+    )
 
     objects = PostManager()
     published = PublishedManager()
@@ -142,6 +251,20 @@ class Post(models.Model):
         verbose_name_plural = 'Посты'
         indexes = [
             models.Index(fields=['-publish'], name='blog_post_publish_idx'),
+            models.Index(fields=['status', 'updated'], name='blog_post_status_updated_idx'),
+            models.Index(
+                fields=['status', '-trending_score'],
+                name='blog_post_trending_idx',
+            ),
+            models.Index(
+                fields=['author', 'status', '-publish'],
+                name='blog_post_author_status_idx',
+            ),
+            models.Index(
+                fields=['trending_stale'],
+                condition=Q(trending_stale=True),
+                name='blog_post_trending_stale_idx',
+            ),
         ]
 
     def __str__(self) -> str:
@@ -154,7 +277,9 @@ class Post(models.Model):
         )
 
 
-class Comment(models.Model):
+class Comment(TrackedFieldsMixin, models.Model):
+    tracked_fields = ('email', 'active', 'post_id')
+
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -175,7 +300,182 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=('created',), name='blog_comment_created_idx'),
             models.Index(fields=('active',), name='blog_comment_active_idx'),
+            models.Index(Lower('email'), name='blog_comment_email_lower_idx'),
         ]
 
     def __str__(self) -> str:
         return f"Комментарий от {self.name} к посту '{self.post}'"
+
+
+class ArchivedComment(models.Model):
+    """Комментарий, перенесённый из ``Comment`` в холодное хранилище.
+
+    Сохраняет исходный ``id`` и даты; переносом занимается
+    ``blog.comment_archive``. Страница поста подгружает архив, когда
+    читатель пролистывает горячие комментарии до конца.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Пост',
+    )
+    name = models.CharField('Имя', max_length=80)
+    email = models.EmailField('Email')
+    body = models.TextField('Комментарий')
+    created = models.DateTimeField('Создано')
+    updated = models.DateTimeField('Обновлено')
+    active = models.BooleanField('Активен')
+    archived = models.DateTimeField('Перенесено в архив', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'active', '-created'),
+                name='blog_archcomment_post_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Архивный комментарий от {self.name} к посту '{self.post}'"
+
+
+class CommenterStatsQuerySet(models.QuerySet):
+    def leaderboard(self):
+        return self.order_by('-comments_total', '-recent_comment')
+
+
+class CommenterStats(models.Model):
+    """Сводка по автору комментариев, ключ — email в нижнем регистре.
+
+    Поддерживается сигналами (см. ``blog.commenters``) и заменяет GROUP BY
+    по всей таблице комментариев в виджете «Активные читатели».
+    """
+
+    email = models.EmailField('Email', unique=True)
+    name = models.CharField('Имя', max_length=80)
+    comments_total = models.PositiveIntegerField('Активных комментариев', default=0)
+    recent_comment = models.DateTimeField('Последний комментарий')
+
+    objects = CommenterStatsQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-comments_total', '-recent_comment')
+        verbose_name = 'Статистика комментатора'
+        verbose_name_plural = 'Статистика комментаторов'
+        indexes = [
+            models.Index(
+                fields=('-comments_total', '-recent_comment'),
+                name='blog_commenter_top_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} <{self.email}>'
+
+
+class AuthorStats(models.Model):
+    """Сводка по автору постов для страниц авторов.
+
+    Поддерживается сигналами (см. ``blog.authors``): страницы авторов не
+    считают COUNT и MAX по постам и комментариям на каждый запрос.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='blog_stats',
+        verbose_name='Автор',
+    )
+    published_posts = models.PositiveIntegerField('Опубликовано постов', default=0)
+    active_comments = models.PositiveIntegerField('Активных комментариев к постам', default=0)
+    latest_publish = models.DateTimeField('Последняя публикация', null=True, blank=True)
+
+    class Meta:
+        ordering = ('-latest_publish',)
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+        indexes = [
+            models.Index(fields=('-latest_publish',), name='blog_author_latest_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.published_posts} постов'
+
+
+class RelatedTag(models.Model):
+    """Сосед тега по совместной встречаемости в опубликованных постах.
+
+    Хранится ``BLOG_RELATED_TAGS['TOP_K']`` лучших соседей на тег; таблицу
+    заполняет команда ``build_related_tags`` (см. ``blog.related_tags``).
+    """
+
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Тег',
+    )
+    related = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий тег',
+    )
+    score = models.FloatField('Близость')
+    rank = models.PositiveSmallIntegerField('Место')
+
+    class Meta:
+        ordering = ('tag', 'rank')
+        verbose_name = 'Похожий тег'
+        verbose_name_plural = 'Похожие теги'
+        constraints = [
+            models.UniqueConstraint(fields=('tag', 'rank'), name='blog_related_tag_rank_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.tag} → {self.related}'
+
+
+class JobCheckpoint(models.Model):
+    """Позиция, до которой фоновая задача уже обработала данные."""
+
+    name = models.CharField('Задача', max_length=100, unique=True)
+    position = models.BigIntegerField('Позиция', default=0)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Контрольная точка задачи'
+        verbose_name_plural = 'Контрольные точки задач'
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.position}'
+
+
+class ArchiveMonth(models.Model):
+    """Число опубликованных постов за месяц (по текущему часовому поясу).
+
+    Поддерживается сигналами (см. ``blog.date_archive``), чтобы архив и его
+    боковая панель не сканировали все посты.
+    """
+
+    year = models.PositiveSmallIntegerField('Год')
+    month = models.PositiveSmallIntegerField('Месяц')
+    posts_total = models.PositiveIntegerField('Опубликовано постов', default=0)
+
+    class Meta:
+        ordering = ('-year', '-month')
+        verbose_name = 'Месяц архива'
+        verbose_name_plural = 'Месяцы архива'
+        constraints = [
+            models.UniqueConstraint(fields=('year', 'month'), name='blog_archive_month_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.month:02d}.{self.year}: {self.posts_total}'
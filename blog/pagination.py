@@ -0,0 +1,47 @@
+"""Keyset-пагинация по ``(-publish, -id)``.
+
+Курсор содержит ``publish`` и ``id`` последней показанной записи, поэтому
+следующая страница читается по индексу без OFFSET, с какой бы глубины
+архива её ни запросили.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(publish, pk):
+    micros = (publish - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{pk}'
+
+
+def decode_cursor(value):
+    """Возвращает (publish, id) или ``None`` для пустого или испорченного курсора."""
+
+    try:
+        micros, pk = value.split('.')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_page(queryset, cursor, per_page):
+    """Возвращает (записи страницы, курсор следующей страницы или ``None``).
+
+    ``queryset`` может быть и выборкой ``values()`` с полями ``publish`` и ``id``.
+    """
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        publish, pk = position
+        queryset = queryset.filter(Q(publish__lt=publish) | Q(publish=publish, pk__lt=pk))
+    items = list(queryset.order_by('-publish', '-pk')[: per_page + 1])
+    if len(items) <= per_page:
+        return items, None
+    items = items[:per_page]
+    last = items[-1]
+    if isinstance(last, dict):
+        return items, encode_cursor(last['publish'], last['id'])
+    return items, encode_cursor(last.publish, last.pk)
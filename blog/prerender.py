@@ -0,0 +1,346 @@
+"""Рендеринг публичных страниц блога в статические HTML-файлы.
+
+Страница описывается парой (URL, путь файла относительно каталога сборки).
+Представления вызываются напрямую, без middleware, поэтому рендер не
+создаёт сессий. Хост запроса берётся из ``ALLOWED_HOSTS``: представления,
+которые строят абсолютные URL (ленты и их кеш), проверяют его.
+"""
+
+import json
+import math
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Q
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .date_archive import month_of
+from .models import AuthorStats, Post, Tag
+from .tag_index import get_tag_index
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def render_host():
+    """Первый хост из ``ALLOWED_HOSTS``, который можно подставить в запрос.
+
+    ``.example.com`` разрешает и сам ``example.com``; при пустом списке или
+    одном ``*`` подходит ``localhost`` (с ``DEBUG = True`` Django разрешает
+    его и при пустом списке).
+    """
+
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def render_path(url):
+    """Возвращает (код ответа, тело) для GET-запроса к ``url``."""
+
+    path, _, query = url.partition('?')
+    request = RequestFactory().get(
+        path, data=None, QUERY_STRING=query, SERVER_NAME=render_host()
+    )
+    match = resolve(path)
+    request.resolver_match = match
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        # Без обработчика исключений Django 404 приходит исключением.
+        return 404, b''
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    return response.status_code, content
+
+
+def url_to_file(url):
+    """Отображает URL на путь файла.
+
+    Параметры каталога переходят в путь: ``/posts/?tag=ai&tag=ml&page=2``
+    сохраняется как ``posts/tag/ai+ml/page/2/index.html``, первая страница —
+    без ``page``. Веб-сервер должен переписывать такие запросы на эти пути,
+    а запросы без готового файла (три тега и больше, ``match=any``,
+    глубокие страницы по курсору) передавать Django.
+    """
+
+    path, _, query = url.partition('?')
+    parts = [part for part in path.split('/') if part]
+    params = parse_qsl(query)
+    tags = [value for name, value in params if name == 'tag']
+    page = next((value for name, value in params if name == 'page'), '1')
+    if tags:
+        parts += ['tag', '+'.join(tags)]
+    if page != '1':
+        parts += ['page', page]
+    return str(Path(*parts, 'index.html')) if parts else 'index.html'
+
+
+def site_state():
+    """Снимок состояния опубликованных постов для инкрементальной сборки.
+
+    Для каждого поста фиксируются ``updated``, автор, теги, URL и отпечаток
+    активных комментариев (они выводятся на странице поста, но ``updated`` не
+    меняют).
+    """
+
+    posts = {
+        str(row['id']): {
+            'updated': row['updated'].isoformat(),
+            'publish': row['publish'].isoformat(),
+            'author': row['author__username'],
+            'url': Post(slug=row['slug'], publish=row['publish']).get_absolute_url(),
+            'month': list(month_of(row['publish'])),
+            'tags': [],
+            'comments': [
+                row['active_comments'],
+                row['last_comment'].isoformat() if row['last_comment'] else None,
+            ],
+        }
+        for row in Post.published.order_by()
+        .values('id', 'slug', 'publish', 'updated', 'author__username')
+        .annotate(
+            active_comments=Count('comments', filter=Q(comments__active=True)),
+            last_comment=Max('comments__updated'),
+        )
+    }
+    through = Post.tags.through.objects.filter(post_id__in=Post.published.values('id'))
+    for post_id, slug in through.values_list('post_id', 'tag__slug').order_by('tag__slug'):
+        posts[str(post_id)]['tags'].append(slug)
+    return posts
+
+
+def author_state():
+    """Снимок строк ``AuthorStats`` авторов с публикациями: username → значения.
+
+    Счётчики меняются и без правки опубликованных постов (комментарий к
+    черновику, смена имени), поэтому сравниваются отдельно от постов.
+    """
+
+    return {
+        stats.author.username: [
+            stats.author.get_full_name(),
+            stats.published_posts,
+            stats.active_comments,
+            stats.latest_publish.isoformat() if stats.latest_publish else None,
+        ]
+        for stats in AuthorStats.objects.filter(published_posts__gt=0).select_related('author')
+        # Имя «..» превратилось бы в путь вне каталога сборки.
+        if stats.author.username not in ('.', '..')
+    }
+
+
+def author_urls(usernames):
+    """Список авторов и первые страницы авторов ``usernames``."""
+
+    return [reverse('blog:author_list')] + [
+        reverse('blog:author_detail', args=[username]) for username in sorted(usernames)
+    ]
+
+
+def tag_facets():
+    """Теги-фасеты, на которые ссылается страница каждого тега: slug → [slug]."""
+
+    index = get_tag_index()
+    slugs = dict(Tag.objects.values_list('id', 'slug'))
+    limit = settings.BLOG_TAG_FACETS
+    return {
+        slugs[tag_id]: [
+            slugs[facet_id]
+            for facet_id, _ in index.selection_facets({tag_id})[:limit]
+            if facet_id in slugs
+        ]
+        for tag_id in sorted(slugs)
+        if index.tag_size(tag_id)
+    }
+
+
+def listing_url(slugs=(), page=1):
+    """URL страницы каталога; параметры в том же порядке, что в шаблоне."""
+
+    params = [f'tag={slug}' for slug in slugs]
+    if page > 1:
+        params.append(f'page={page}')
+    return reverse('blog:post_list') + (f"?{'&'.join(params)}" if params else '')
+
+
+def tag_url(slug):
+    return listing_url([slug])
+
+
+def listings(state):
+    """Порядок постов каталога и каждого тега: ключ — slug тега или ``None``."""
+
+    order = sorted(state, key=lambda pk: (state[pk]['publish'], int(pk)), reverse=True)
+    result = {None: order}
+    for pk in order:
+        for slug in state[pk]['tags']:
+            result.setdefault(slug, []).append(pk)
+    return result
+
+
+def page_count(total):
+    return max(1, math.ceil(total / settings.BLOG_POSTS_PER_PAGE))
+
+
+def changed_listing_pages(old, new, changed):
+    """Номера страниц списка ``new``, которые отличаются от списка ``old``.
+
+    Со сдвига порядка (новый, снятый или передатированный пост) меняются
+    все последующие страницы; иначе — только страницы изменённых постов.
+    """
+
+    per_page = settings.BLOG_POSTS_PER_PAGE
+    pages = {position // per_page + 1 for position, pk in enumerate(new) if pk in changed}
+    shift = next(
+        (position for position, (a, b) in enumerate(zip(old, new)) if a != b),
+        min(len(old), len(new)),
+    )
+    if old != new:
+        pages.update(range(shift // per_page + 1, page_count(len(new)) + 1))
+    return sorted(pages)
+
+
+def archive_urls(months):
+    """URL страниц архива (первые страницы) для набора пар (год, месяц)."""
+
+    years = sorted({year for year, _ in months})
+    urls = [reverse('blog:archive_year', args=[year]) for year in years]
+    urls += [reverse('blog:archive_month', args=[year, month]) for year, month in sorted(months)]
+    return urls
+
+
+def site_pages(state, authors, facets):
+    """Все страницы снимка для состояний ``site_state()``, ``author_state()``
+    и фасетов ``tag_facets()``."""
+
+    urls = [reverse('blog:home')]
+    for key, ids in listings(state).items():
+        slugs = [] if key is None else [key]
+        urls += [listing_url(slugs, page) for page in range(1, page_count(len(ids)) + 1)]
+    urls += [listing_url([slug, other]) for slug, others in facets.items() for other in others]
+    urls += archive_urls({tuple(post['month']) for post in state.values()})
+    urls += author_urls(authors)
+    urls += [post['url'] for post in state.values()]
+    return list(dict.fromkeys(urls))
+
+
+def plan_pages(state, authors, facets, manifest=None):
+    """Возвращает (URL для рендера, URL, чьи файлы нужно удалить, все URL снимка).
+
+    Без ``manifest`` планируется полная сборка. Иначе рендерятся новые
+    страницы и страницы, на которые влияют изменённые посты, а удаляются
+    страницы прошлого снимка, которых больше нет.
+    """
+
+    pages = site_pages(state, authors, facets)
+    if manifest is None:
+        return pages, [], pages
+
+    previous = manifest['posts']
+    previous_pages = set(manifest['pages'])
+    stale = sorted(previous_pages - set(pages))
+    urls = [url for url in pages if url not in previous_pages]
+
+    changed = [pk for pk, post in state.items() if previous.get(pk) != post]
+    removed = [pk for pk in previous if pk not in state]
+    if changed or removed:
+        touched_tags = set()
+        touched_months = set()
+        for pk in changed + removed:
+            for snapshot in (state.get(pk), previous.get(pk)):
+                if snapshot:
+                    touched_tags.update(snapshot['tags'])
+                    touched_months.add(tuple(snapshot['month']))
+        old_lists = listings(previous)
+        new_lists = listings(state)
+        urls.append(reverse('blog:home'))
+        for key in [None, *sorted(touched_tags)]:
+            if key in new_lists:
+                slugs = [] if key is None else [key]
+                urls += [
+                    listing_url(slugs, page)
+                    for page in changed_listing_pages(
+                        old_lists.get(key, []), new_lists[key], set(changed)
+                    )
+                ]
+        urls += [
+            listing_url([slug, other])
+            for slug, others in facets.items()
+            for other in others
+            if slug in touched_tags or other in touched_tags
+        ]
+        live_months = {tuple(post['month']) for post in state.values()}
+        urls += archive_urls(touched_months & live_months)
+        urls += [state[pk]['url'] for pk in changed]
+
+    previous_authors = manifest['authors']
+    touched_authors = {
+        username for username, row in authors.items() if previous_authors.get(username) != row
+    }
+    for pk in changed + removed:
+        for snapshot in (state.get(pk), previous.get(pk)):
+            if snapshot:
+                touched_authors.add(snapshot['author'])
+    touched_authors &= set(authors)
+    if touched_authors or set(previous_authors) != set(authors):
+        urls += author_urls(touched_authors)
+    return list(dict.fromkeys(urls)), stale, pages
+
+
+def write_file(root, relpath, content):
+    target = Path(root) / relpath
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(content)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, target)
+
+
+def render_to_file(root, url):
+    """Рендерит ``url`` в файл внутри ``root``; возвращает (URL, код, размер)."""
+
+    status, content = render_path(url)
+    if status == 200:
+        write_file(root, url_to_file(url), content)
+    return url, status, len(content)
+
+
+def init_worker():
+    # Дочерний процесс не должен пользоваться соединениями родителя.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    django.setup()
+    connections.close_all()
+
+
+def load_manifest(root):
+    try:
+        with open(Path(root) / MANIFEST_NAME, encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def save_manifest(root, state, authors, pages, built_at):
+    manifest = {
+        'built_at': built_at.isoformat(),
+        'posts': state,
+        'authors': authors,
+        'pages': pages,
+    }
+    write_file(
+        root,
+        MANIFEST_NAME,
+        json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'),
+    )
+
@@ -0,0 +1,178 @@
+"""Профилирование отдельных запросов: cProfile, SQL и время рендера шаблонов.
+
+Каждый профиль сохраняется парой файлов в ``BLOG_PROFILING['DIR']``:
+``<id>.prof`` (формат pstats) и ``<id>.json`` с метаданными запроса.
+Хранится не больше ``BLOG_PROFILING['KEEP']`` последних профилей.
+"""
+
+import cProfile
+import json
+import pstats
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+
+TEMPLATE_RENDER_KEY = (
+    Template.render.__code__.co_filename,
+    Template.render.__code__.co_firstlineno,
+    Template.render.__code__.co_name,
+)
+
+
+# С Python 3.12 cProfile работает через sys.monitoring, и в процессе может
+# быть включён только один профилировщик: второй enable() падает с ValueError.
+_active = threading.Lock()
+
+
+def profile_dir():
+    return Path(settings.BLOG_PROFILING['DIR'])
+
+
+class SQLTimeline:
+    """Обёртка ``execute_wrapper``: собирает запросы с отметками времени."""
+
+    def __init__(self, started, alias):
+        self.started = started
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        begin = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append(
+                {
+                    'db': self.alias,
+                    'start_ms': round((begin - self.started) * 1000, 3),
+                    'duration_ms': round((end - begin) * 1000, 3),
+                    'sql': sql[:1000],
+                    'many': many,
+                }
+            )
+
+
+def profile_request(get_response, request, trigger):
+    """Выполняет запрос под профилировщиком и сохраняет результат.
+
+    Возвращает (ответ, id профиля). Если в процессе уже идёт профилирование
+    (другой поток или сторонний инструмент), запрос выполняется без него и
+    id профиля — ``None``.
+    """
+
+    if _active.acquire(blocking=False):
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                pass
+            else:
+                return _profile(get_response, request, trigger, profiler)
+        finally:
+            _active.release()
+    return get_response(request), None
+
+
+def _profile(get_response, request, trigger, profiler):
+    started = time.perf_counter()
+    timelines = [SQLTimeline(started, conn.alias) for conn in connections.all()]
+    with ExitStack() as stack:
+        for conn, timeline in zip(connections.all(), timelines):
+            stack.enter_context(conn.execute_wrapper(timeline))
+        try:
+            response = get_response(request)
+            if response.streaming:
+                # Потоковый ответ рендерится при отдаче; профилируем его целиком.
+                response.streaming_content = list(response.streaming_content)
+        finally:
+            profiler.disable()
+    total_ms = (time.perf_counter() - started) * 1000
+
+    stats = pstats.Stats(profiler)
+    template_entry = stats.stats.get(TEMPLATE_RENDER_KEY)
+    queries = sorted(
+        (query for timeline in timelines for query in timeline.queries),
+        key=lambda query: query['start_ms'],
+    )
+    match = getattr(request, 'resolver_match', None)
+    profile_id = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    meta = {
+        'id': profile_id,
+        'created': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'trigger': trigger,
+        'total_ms': round(total_ms, 3),
+        'template_ms': round(template_entry[3] * 1000, 3) if template_entry else 0.0,
+        'sql': {
+            'count': len(queries),
+            'total_ms': round(sum(query['duration_ms'] for query in queries), 3),
+            'queries': queries,
+        },
+    }
+    save_profile(profile_id, profiler, meta)
+    return response, profile_id
+
+
+def save_profile(profile_id, profiler, meta):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    with open(directory / f'{profile_id}.json', 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh, ensure_ascii=False, indent=1)
+    enforce_retention(directory, settings.BLOG_PROFILING['KEEP'])
+
+
+def enforce_retention(directory, keep):
+    # Имена начинаются с метки времени, поэтому сортировка по имени хронологическая.
+    metas = sorted(directory.glob('*.json'))
+    for path in metas[: max(0, len(metas) - keep)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load_profiles():
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json')):
+        with open(path, encoding='utf-8') as fh:
+            profiles.append(json.load(fh))
+    return profiles
+
+
+def load_meta(profile_id):
+    with open(profile_dir() / f'{profile_id}.json', encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def load_stats(profile_id):
+    return pstats.Stats(str(profile_dir() / f'{profile_id}.prof'))
+
+
+def function_label(key):
+    filename, line, name = key
+    return f'{name} ({Path(filename).name}:{line})' if line else name
+
+
+def diff_functions(before_id, after_id):
+    """Список (функция, cumtime до, cumtime после) по убыванию модуля разницы, в мс."""
+
+    before = load_stats(before_id).stats
+    after = load_stats(after_id).stats
+    rows = []
+    for key in set(before) | set(after):
+        old = before[key][3] * 1000 if key in before else 0.0
+        new = after[key][3] * 1000 if key in after else 0.0
+        rows.append((function_label(key), old, new))
+    rows.sort(key=lambda row: abs(row[2] - row[1]), reverse=True)
+    return rows
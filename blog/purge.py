@@ -0,0 +1,111 @@
+"""Быстрая очистка таблиц блога без коллектора удаления Django.
+
+``Model.objects.all().delete()`` загружает каждую строку ради каскадов и
+сигналов. Здесь строки удаляются SQL-запросами: пачками по диапазонам
+первичного ключа (каждая пачка — своя короткая транзакция) или одним
+``TRUNCATE``/``DELETE`` на таблицу через ``sql_flush``. Сигналы при этом не
+отправляются, поэтому производные таблицы и кеши очищаются здесь же.
+"""
+
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from . import authors, commenters, date_archive, search, tag_index
+from .models import (
+    ArchiveMonth,
+    ArchivedComment,
+    AuthorStats,
+    Comment,
+    CommenterStats,
+    JobCheckpoint,
+    Post,
+    RelatedTag,
+    Tag,
+)
+
+
+def blog_models():
+    """Модели блога в порядке удаления: сначала ссылающиеся таблицы."""
+
+    return [
+        ArchivedComment,
+        Comment,
+        Post.tags.through,
+        Post,
+        RelatedTag,
+        Tag,
+        CommenterStats,
+        AuthorStats,
+        ArchiveMonth,
+        JobCheckpoint,
+    ]
+
+
+def delete_in_chunks(queryset, batch_size=10000):
+    """Удаляет строки выборки диапазонами ``pk``; возвращает их число."""
+
+    queryset = queryset.order_by('pk')
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            bounds = list(queryset.values_list('pk', flat=True)[: batch_size])
+            if not bounds:
+                return deleted
+            chunk = queryset.filter(pk__gte=bounds[0], pk__lte=bounds[-1])
+            deleted += chunk._raw_delete(chunk.db)
+
+
+def reset_caches():
+    search.clear()
+    tag_index.invalidate()
+    cache.delete(date_archive.SIDEBAR_KEY)
+
+
+def purge_all(truncate=False, batch_size=10000):
+    """Очищает все таблицы блога; возвращает {таблица: удалено строк или None}.
+
+    При ``truncate`` число строк неизвестно — для каждой таблицы ``None``.
+    """
+
+    models = blog_models()
+    if truncate:
+        tables = [model._meta.db_table for model in models]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables))
+        result = dict.fromkeys(tables)
+    else:
+        result = {
+            model._meta.db_table: delete_in_chunks(model._base_manager.all(), batch_size)
+            for model in models
+        }
+    reset_caches()
+    return result
+
+
+def purge_post(post, batch_size=10000):
+    """Удаляет пост вместе с комментариями, не загружая их в память.
+
+    Комментарии (горячие и архивные) удаляются пачками без сигналов, сам
+    пост — обычным ``delete()``, чтобы сработали сигналы индексов и архива.
+    Затем статистика автора и затронутых комментаторов пересчитывается.
+    Возвращает число удалённых комментариев.
+    """
+
+    author_id = post.author_id
+    emails = set()
+    deleted = 0
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.filter(post=post)
+        emails.update(
+            commenters.normalize_email(email)
+            for email in comments.filter(active=True)
+            .order_by()
+            .values_list('email', flat=True)
+            .distinct()
+            .iterator()
+        )
+        deleted += delete_in_chunks(comments, batch_size)
+    post.delete()
+    commenters.refresh(emails)
+    authors.refresh([author_id])
+    return deleted
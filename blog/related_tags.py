@@ -0,0 +1,179 @@
+"""Похожие теги по совместной встречаемости в опубликованных постах.
+
+Связи «пост — тег» загружаются в разреженную матрицу ``X`` (посты × теги),
+совместная встречаемость считается произведением ``Xᵀ·X`` блоками столбцов,
+нормируется (косинус или PMI, ``BLOG_RELATED_TAGS['METRIC']``), и для каждого
+тега сохраняются ``TOP_K`` лучших соседей в ``RelatedTag``.
+
+Сигналы помечают теги изменённых постов флагом ``Tag.related_stale``;
+инкрементальный запуск пересчитывает только их строки. Оценки остальных
+тегов в паре с изменёнными при этом не обновляются до полного пересчёта.
+
+Нужны NumPy и SciPy. Они импортируются при первом вызове ``available()``, а
+не при загрузке модуля: views и сигналам нужны только запросы к ORM, а импорт
+SciPy удлинял старт воркера примерно на 0,2 с.
+"""
+
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Post, PostStatus, RelatedTag, Tag
+
+np = sparse = None
+
+# Столько тегов обрабатывается за одно умножение матриц.
+BLOCK = 1024
+
+
+def available():
+    """Загружает NumPy и SciPy; расчётные функции вызывать только после неё."""
+
+    global np, sparse
+    if np is None:
+        try:
+            import numpy
+            from scipy import sparse as scipy_sparse
+        except ImportError:  # pragma: no cover - numpy/scipy необязательны
+            return False
+        np, sparse = numpy, scipy_sparse
+    return True
+
+
+def incidence_from_pairs(pairs):
+    """Строит матрицу по массиву пар ``(post_id, tag_id)``.
+
+    Возвращает (матрица CSC посты × теги, id тегов по столбцам, число постов).
+    """
+
+    post_ids, post_index = np.unique(pairs[:, 0], return_inverse=True)
+    tag_ids, tag_index = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csc_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (post_index, tag_index)),
+        shape=(len(post_ids), len(tag_ids)),
+    )
+    return matrix, tag_ids, len(post_ids)
+
+
+def load_incidence(batch_size=10000):
+    rows = (
+        Post.tags.through.objects.filter(post__status=PostStatus.PUBLISHED)
+        .order_by()
+        .values_list('post_id', 'tag_id')
+        .iterator(chunk_size=batch_size)
+    )
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    return incidence_from_pairs(pairs)
+
+
+def neighbours(matrix, columns, posts_total, metric='cosine', top_k=10, min_count=2):
+    """Лучшие соседи для столбцов ``columns``.
+
+    Возвращает массивы (столбец тега, столбец соседа, оценка, место).
+    """
+
+    counts = np.asarray(matrix.sum(axis=0)).ravel().astype(np.float64)
+    cooc = (matrix[:, columns].T @ matrix).tocoo()
+    rows, cols, shared = columns[cooc.row], cooc.col, cooc.data
+    keep = (rows != cols) & (shared >= min_count)
+    rows, cols, shared = rows[keep], cols[keep], shared[keep].astype(np.float64)
+    if metric == 'pmi':
+        scores = np.log(shared * posts_total / (counts[rows] * counts[cols]))
+    else:
+        scores = shared / np.sqrt(counts[rows] * counts[cols])
+
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    _, starts, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    rank = np.arange(len(rows)) - starts[inverse]
+    keep = rank < top_k
+    return rows[keep], cols[keep], scores[keep], rank[keep]
+
+
+def compute(matrix, posts_total, columns=None):
+    """Соседи для указанных столбцов (по умолчанию всех), блоками по ``BLOCK``."""
+
+    config = settings.BLOG_RELATED_TAGS
+    if columns is None:
+        columns = np.arange(matrix.shape[1])
+    parts = [
+        neighbours(
+            matrix,
+            columns[start:start + BLOCK],
+            posts_total,
+            metric=config['METRIC'],
+            top_k=config['TOP_K'],
+            min_count=config['MIN_COOCCURRENCE'],
+        )
+        for start in range(0, len(columns), BLOCK)
+    ]
+    if not parts:
+        return tuple(np.empty(0, dtype=dtype) for dtype in (np.int64, np.int64, float, np.int64))
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def _store(tag_ids, result, computed, batch_size):
+    rows, cols, scores, ranks = result
+    for start in range(0, len(computed), batch_size):
+        RelatedTag.objects.filter(tag_id__in=computed[start:start + batch_size]).delete()
+    RelatedTag.objects.bulk_create(
+        (
+            RelatedTag(tag_id=tag, related_id=related, score=score, rank=rank)
+            for tag, related, score, rank in zip(
+                tag_ids[rows].tolist(), tag_ids[cols].tolist(), scores.tolist(), ranks.tolist()
+            )
+        ),
+        batch_size=batch_size,
+    )
+    for start in range(0, len(computed), batch_size):
+        Tag.objects.filter(pk__in=computed[start:start + batch_size]).update(
+            related_stale=False
+        )
+    return len(rows)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитывает соседей всех тегов; возвращает число сохранённых связей."""
+
+    computed = list(Tag.objects.values_list('pk', flat=True))
+    matrix, tag_ids, posts_total = load_incidence()
+    return _store(tag_ids, compute(matrix, posts_total), computed, batch_size)
+
+
+@transaction.atomic
+def refresh_stale(batch_size=1000):
+    """Пересчитывает соседей тегов с ``related_stale``; возвращает (теги, связи).
+
+    Флаг снимается с тегов, отобранных в начале расчёта: если такой тег
+    изменится ещё раз во время расчёта, новые связи учтёт только следующий
+    запуск после очередной пометки.
+    """
+
+    computed = list(Tag.objects.filter(related_stale=True).values_list('pk', flat=True))
+    if not computed:
+        return 0, 0
+    matrix, tag_ids, posts_total = load_incidence()
+    stale = np.array(computed, dtype=np.int64)
+    # Теги без опубликованных постов в матрицу не попали: их соседи просто удаляются.
+    columns = np.searchsorted(tag_ids, stale[np.isin(stale, tag_ids)])
+    result = compute(matrix, posts_total, columns)
+    return len(computed), _store(tag_ids, result, computed, batch_size)
+
+
+def mark_stale(tag_ids):
+    Tag.objects.filter(pk__in=list(tag_ids), related_stale=False).update(related_stale=True)
+
+
+def tags_of_posts(post_ids):
+    return set(
+        Post.tags.through.objects.filter(post_id__in=list(post_ids)).values_list(
+            'tag_id', flat=True
+        )
+    )
+
+
+def related_for(tag, limit=None):
+    links = RelatedTag.objects.filter(tag=tag).select_related('related').order_by('rank')
+    return [link.related for link in (links[:limit] if limit else links)]
@@ -0,0 +1,158 @@
+"""Поиск по публикациям с кешированием результатов.
+
+В кеше хранятся только упорядоченные списки id постов, ключом служит
+нормализованный запрос. Реестр закешированных запросов позволяет при
+изменении поста сбрасывать лишь те результаты, которые он затрагивает.
+Реестр и счётчики попаданий лежат в кеше ``default``, поэтому он должен быть
+общим для всех воркеров (проверка ``blog.E001``); на файловом кеше ``incr``
+не атомарен, и счётчики приблизительны.
+"""
+
+import hashlib
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .models import Post
+
+REGISTRY_KEY = 'blog:search:terms'
+HITS_KEY = 'blog:search:hits'
+MISSES_KEY = 'blog:search:misses'
+
+
+def normalize_query(query):
+    """Приводит запрос к каноническому виду.
+
+    NFKC собирает составные символы (например, «й» из «и» и бреве),
+    ``casefold`` убирает регистр, повторяющиеся пробелы схлопываются.
+    """
+
+    query = unicodedata.normalize('NFKC', query)
+    return ' '.join(query.split()).casefold()
+
+
+def _cache_key(normalized):
+    digest = hashlib.md5(normalized.encode('utf-8')).hexdigest()
+    return f'blog:search:{digest}'
+
+
+def _incr(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def _register(normalized):
+    ttl = settings.BLOG_SEARCH['TTL']
+    now = time.time()
+    registry = {
+        term: expires
+        for term, expires in cache.get(REGISTRY_KEY, {}).items()
+        if expires > now
+    }
+    registry[normalized] = now + ttl
+    overflow = len(registry) - settings.BLOG_SEARCH['MAX_TERMS']
+    if overflow > 0:
+        # Вытесненный из реестра запрос нельзя будет сбросить точечно,
+        # поэтому его результаты удаляются сразу.
+        evicted = sorted(registry, key=registry.get)[:overflow]
+        cache.delete_many([_cache_key(term) for term in evicted])
+        for term in evicted:
+            del registry[term]
+    cache.set(REGISTRY_KEY, registry, ttl)
+
+
+def search_post_ids(query):
+    """Возвращает упорядоченный список id найденных постов.
+
+    Результат одинаковых после нормализации запросов берётся из кеша;
+    при промахе выполняется ``Post.objects.for_search_term``.
+    """
+
+    normalized = normalize_query(query)
+    if not normalized:
+        return []
+    key = _cache_key(normalized)
+    ids = cache.get(key)
+    if ids is not None:
+        _incr(HITS_KEY)
+        metrics.inc('blog_cache_requests_total', cache='search', result='hit')
+        return ids
+
+    _incr(MISSES_KEY)
+    metrics.inc('blog_cache_requests_total', cache='search', result='miss')
+    ids = list(
+        Post.objects.for_search_term(normalized)
+        .order_by('-publish')
+        .values_list('id', flat=True)[: settings.BLOG_SEARCH['MAX_RESULTS']]
+    )
+    cache.set(key, ids, settings.BLOG_SEARCH['TTL'])
+    _register(normalized)
+    return ids
+
+
+def hydrate_posts(ids):
+    """Загружает посты одним запросом, сохраняя порядок ``ids``."""
+
+    posts = (
+        Post.objects.select_related('author')
+        .prefetch_related('tags')
+        .in_bulk(ids)
+    )
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def invalidate(predicate):
+    """Сбрасывает закешированные запросы, для которых ``predicate(term, ids)`` истинно."""
+
+    registry = cache.get(REGISTRY_KEY, {})
+    if not registry:
+        return 0
+    cached = cache.get_many([_cache_key(term) for term in registry])
+    stale = [
+        term
+        for term in registry
+        if _cache_key(term) not in cached
+        or predicate(term, cached[_cache_key(term)])
+    ]
+    if stale:
+        cache.delete_many([_cache_key(term) for term in stale])
+        for term in stale:
+            del registry[term]
+        cache.set(REGISTRY_KEY, registry, settings.BLOG_SEARCH['TTL'])
+    return len(stale)
+
+
+def invalidate_for_post(post, texts=None):
+    """Сбрасывает запросы, в выдаче которых пост был или может появиться.
+
+    ``texts`` — строки, по которым пост ищется (заголовок, текст, теги);
+    по умолчанию берутся текущие значения поста.
+    """
+
+    if texts is None:
+        texts = [post.title, post.body, *post.tags.values_list('name', flat=True)]
+    haystack = '\n'.join(normalize_query(text) for text in texts)
+    return invalidate(lambda term, ids: post.pk in ids or term in haystack)
+
+
+def clear():
+    registry = cache.get(REGISTRY_KEY, {})
+    cache.delete_many([_cache_key(term) for term in registry] + [REGISTRY_KEY])
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+        'cached_terms': len(cache.get(REGISTRY_KEY, {})),
+    }
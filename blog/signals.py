@@ -0,0 +1,314 @@
+"""Обработчики сигналов, поддерживающие кеши и производные данные блога."""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import (
+    authors,
+    caching,
+    commenters,
+    date_archive,
+    related_tags,
+    search,
+    tag_index,
+    trending,
+)
+from .models import ArchivedComment, Comment, Post, PostStatus, RelatedTag, Tag
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+@receiver(connection_created, dispatch_uid='blog_sqlite_casefold')
+def register_sqlite_casefold(sender, connection, **kwargs):
+    # Для lookup ``__casefold`` (см. ``blog.models.Casefold``).
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('blog_casefold', 1, _casefold, deterministic=True)
+
+
+@receiver(post_save, sender=Post, dispatch_uid='blog_search_post_saved')
+def invalidate_search_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_published = instance.loaded_value('status') == PostStatus.PUBLISHED
+    is_published = instance.status == PostStatus.PUBLISHED
+    if not (was_published or is_published):
+        return
+    if created or instance.field_changed('title', 'body', 'status', 'publish'):
+        search.invalidate_for_post(instance)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='blog_search_post_deleted')
+def invalidate_search_on_post_delete(sender, instance, **kwargs):
+    search.invalidate(lambda term, ids: instance.pk in ids)
+
+
+@receiver(m2m_changed, sender=Post.tags.through, dispatch_uid='blog_search_tags_changed')
+def invalidate_search_on_tags_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # tag.posts.add(...): pk_set содержит id постов; при clear он пуст.
+        if pk_set is None:
+            search.clear()
+            return
+        posts = Post.published.filter(pk__in=pk_set)
+    else:
+        posts = [instance] if instance.status == PostStatus.PUBLISHED else []
+    for post in posts:
+        search.invalidate_for_post(post)
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='blog_search_tag_saved')
+def invalidate_search_on_tag_rename(sender, instance, created, raw=False, **kwargs):
+    if raw or created or not instance.field_changed('name'):
+        return
+    names = [
+        search.normalize_query(name)
+        for name in (instance.loaded_value('name', ''), instance.name)
+    ]
+    search.invalidate(lambda term, ids: any(term in name for name in names))
+
+
+@receiver(post_delete, sender=Tag, dispatch_uid='blog_search_tag_deleted')
+def invalidate_search_on_tag_delete(sender, instance, **kwargs):
+    name = search.normalize_query(instance.name)
+    search.invalidate(lambda term, ids: term in name)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='blog_commenters_comment_saved')
+def update_commenter_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.active:
+            commenters.comment_added(instance.email, instance.name, instance.created)
+        return
+    was_active = instance.loaded_value('active', False)
+    old_email = instance.loaded_value('email', instance.email)
+    moved = commenters.normalize_email(old_email) != commenters.normalize_email(instance.email)
+    if was_active and (moved or not instance.active):
+        commenters.comment_removed(old_email, instance.created)
+    if instance.active and (moved or not was_active):
+        commenters.comment_added(instance.email, instance.name, instance.created)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid='blog_commenters_comment_deleted')
+def update_commenter_stats_on_delete(sender, instance, **kwargs):
+    if instance.active:
+        commenters.comment_removed(instance.email, instance.created)
+
+
+@receiver(post_delete, sender=ArchivedComment, dispatch_uid='blog_commenters_archived_deleted')
+def update_commenter_stats_on_archived_delete(sender, instance, **kwargs):
+    # Перенос в архив статистику не меняет, а удаление из архива — меняет.
+    if instance.active:
+        commenters.comment_removed(instance.email, instance.created)
+
+
+@receiver(post_save, sender=Post, dispatch_uid='blog_tag_index_post_saved')
+def update_tag_index_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_published = instance.loaded_value('status') == PostStatus.PUBLISHED
+    is_published = instance.status == PostStatus.PUBLISHED
+    redated = was_published and is_published and instance.field_changed('publish')
+    if was_published and (redated or not is_published):
+        transaction.on_commit(lambda: tag_index.post_unpublished(instance.pk))
+    if is_published and (redated or not was_published):
+        tag_ids = [] if created else list(instance.tags.values_list('id', flat=True))
+        transaction.on_commit(lambda: tag_index.post_published(instance, tag_ids))
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='blog_tag_index_post_deleted')
+def update_tag_index_on_post_delete(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: tag_index.post_unpublished(post_id))
+
+
+@receiver(m2m_changed, sender=Post.tags.through, dispatch_uid='blog_tag_index_tags_changed')
+def update_tag_index_on_tags_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        transaction.on_commit(tag_index.invalidate)
+        return
+    change = tag_index.tags_added if action == 'post_add' else tag_index.tags_removed
+    if reverse:
+        # tag.posts.add(...): неопубликованных постов в индексе нет, их
+        # изменения индекс пропустит.
+        tag_ids = {instance.pk}
+        post_ids = sorted(pk_set)
+
+        def apply():
+            for post_id in post_ids:
+                change(post_id, tag_ids)
+
+        transaction.on_commit(apply)
+        return
+    if instance.status != PostStatus.PUBLISHED:
+        return
+    tag_ids = set(pk_set)
+    transaction.on_commit(lambda: change(instance.pk, tag_ids))
+
+
+@receiver(post_delete, sender=Tag, dispatch_uid='blog_tag_index_tag_deleted')
+def update_tag_index_on_tag_delete(sender, instance, **kwargs):
+    tag_id = instance.pk
+    transaction.on_commit(lambda: tag_index.tag_deleted(tag_id))
+
+
+@receiver(post_save, sender=Post, dispatch_uid='blog_archive_post_saved')
+def update_archive_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_published = instance.loaded_value('status') == PostStatus.PUBLISHED
+    is_published = instance.status == PostStatus.PUBLISHED
+    old_publish = instance.loaded_value('publish')
+    moved = (
+        was_published
+        and is_published
+        and date_archive.month_of(old_publish) != date_archive.month_of(instance.publish)
+    )
+    if was_published and (moved or not is_published):
+        date_archive.adjust(old_publish, -1)
+    if is_published and (moved or not was_published):
+        date_archive.adjust(instance.publish, 1)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='blog_archive_post_deleted')
+def update_archive_on_post_delete(sender, instance, **kwargs):
+    if instance.status == PostStatus.PUBLISHED:
+        date_archive.adjust(instance.publish, -1)
+
+
+@receiver(post_save, sender=Post, dispatch_uid='blog_authors_post_saved')
+def update_author_stats_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_author = instance.loaded_value('author_id', instance.author_id)
+    if old_author != instance.author_id:
+        # Смена автора редка: пересчитываем обоих целиком.
+        authors.refresh([old_author, instance.author_id])
+        return
+    was_published = instance.loaded_value('status') == PostStatus.PUBLISHED
+    is_published = instance.status == PostStatus.PUBLISHED
+    if was_published and not is_published:
+        authors.post_unpublished(instance.author_id)
+    elif is_published and not was_published:
+        authors.post_published(instance.author_id, instance.publish)
+    elif is_published and instance.field_changed('publish'):
+        authors.refresh_latest(instance.author_id)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='blog_authors_post_deleted')
+def update_author_stats_on_post_delete(sender, instance, **kwargs):
+    if instance.status == PostStatus.PUBLISHED:
+        authors.post_unpublished(instance.author_id)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='blog_authors_comment_saved')
+def update_author_stats_on_comment_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.active:
+            authors.comments_changed(instance.post_id, 1)
+        return
+    was_active = instance.loaded_value('active', False)
+    old_post = instance.loaded_value('post_id', instance.post_id)
+    moved = old_post != instance.post_id
+    if was_active and (moved or not instance.active):
+        authors.comments_changed(old_post, -1)
+    if instance.active and (moved or not was_active):
+        authors.comments_changed(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid='blog_authors_comment_deleted')
+@receiver(post_delete, sender=ArchivedComment, dispatch_uid='blog_authors_archived_deleted')
+def update_author_stats_on_comment_delete(sender, instance, **kwargs):
+    if instance.active:
+        authors.comments_changed(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment, dispatch_uid='blog_trending_comment_saved')
+def mark_trending_on_comment_save(sender, instance, created, raw=False, **kwargs):
+    # Новые комментарии учитываются по контрольной точке update_trending.
+    if raw or created:
+        return
+    was_active = instance.loaded_value('active', False)
+    old_post = instance.loaded_value('post_id', instance.post_id)
+    moved = old_post != instance.post_id
+    if was_active != instance.active or (moved and instance.active):
+        trending.mark_stale({old_post, instance.post_id})
+
+
+@receiver(post_delete, sender=Comment, dispatch_uid='blog_trending_comment_deleted')
+def mark_trending_on_comment_delete(sender, instance, **kwargs):
+    if instance.active:
+        trending.mark_stale([instance.post_id])
+
+
+@receiver(post_save, sender=Post, dispatch_uid='blog_related_tags_post_saved')
+def mark_related_tags_on_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    was_published = instance.loaded_value('status') == PostStatus.PUBLISHED
+    if was_published != (instance.status == PostStatus.PUBLISHED):
+        related_tags.mark_stale(related_tags.tags_of_posts([instance.pk]))
+
+
+@receiver(pre_delete, sender=Post, dispatch_uid='blog_related_tags_post_deleting')
+def mark_related_tags_on_post_delete(sender, instance, **kwargs):
+    # После удаления связей с тегами уже не будет, поэтому — pre_delete.
+    if instance.status == PostStatus.PUBLISHED:
+        related_tags.mark_stale(related_tags.tags_of_posts([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Post.tags.through, dispatch_uid='blog_related_tags_tags_changed')
+def mark_related_tags_on_tags_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # tag.posts.add(...): меняется окружение самого тега и тегов этих постов.
+        post_ids = pk_set if pk_set is not None else instance.posts.values_list('pk', flat=True)
+        tag_ids = related_tags.tags_of_posts(
+            Post.published.filter(pk__in=list(post_ids)).values_list('pk', flat=True)
+        )
+        related_tags.mark_stale(tag_ids | {instance.pk})
+    elif instance.status == PostStatus.PUBLISHED:
+        related_tags.mark_stale(related_tags.tags_of_posts([instance.pk]) | set(pk_set or ()))
+
+
+@receiver(pre_delete, sender=Tag, dispatch_uid='blog_related_tags_tag_deleting')
+def mark_related_tags_on_tag_delete(sender, instance, **kwargs):
+    related_tags.mark_stale(
+        RelatedTag.objects.filter(related=instance).values_list('tag_id', flat=True)
+    )
+
+
+# Кеш XML и ETag API: имена тегов и авторов и теги постов входят в ответы,
+# но не в ``Post.updated``.
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='blog_related_version_tag_saved')
+@receiver(post_delete, sender=Tag, dispatch_uid='blog_related_version_tag_deleted')
+def change_related_on_tag_change(sender, **kwargs):
+    transaction.on_commit(caching.related_changed)
+
+
+@receiver(m2m_changed, sender=Post.tags.through, dispatch_uid='blog_related_version_tags_changed')
+def change_related_on_tags_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(caching.related_changed)
+
+
+@receiver(post_save, sender=User, dispatch_uid='blog_related_version_user_saved')
+def change_related_on_user_save(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login — имя не меняется.
+    if update_fields is None or 'username' in update_fields:
+        transaction.on_commit(caching.related_changed)
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+from .caching import published_state
+from .models import Post, PostStatus, Tag
+from .pagination import encode_cursor, keyset_page
+
+
+def page_cursors(limit):
+    """Курсоры начала страниц sitemap постов: ``None`` для первой, затем
+    ``(publish, id)`` последней записи предыдущей страницы.
+
+    Считаются одним проходом ``iterator()`` по ``(publish, id)`` и кешируются
+    до изменения опубликованных постов, поэтому глубокая страница не
+    пролистывает архив через OFFSET.
+    """
+
+    latest, total = published_state()
+    key = f'blog:sitemap:cursors:{limit}:{latest.isoformat() if latest else ""}:{total}'
+    cursors = cache.get(key)
+    if cursors is None:
+        cursors = [None]
+        rows = (
+            Post.published.order_by('-publish', '-id')
+            .values_list('publish', 'id')
+            .iterator(chunk_size=limit)
+        )
+        for number, row in enumerate(rows, 1):
+            if number % limit == 0 and number < total:
+                cursors.append(encode_cursor(*row))
+        cache.set(key, cursors, settings.BLOG_SYNDICATION['CACHE_TTL'])
+    return cursors
+
+
+class KeysetPaginator(Paginator):
+    """Страницы sitemap по курсорам ``page_cursors`` вместо OFFSET."""
+
+    @cached_property
+    def cursors(self):
+        return page_cursors(self.per_page)
+
+    @cached_property
+    def count(self):
+        return published_state()[1]
+
+    def page(self, number):
+        number = self.validate_number(number)
+        items, _ = keyset_page(self.object_list, self.cursors[number - 1], self.per_page)
+        return self._get_page(items, number, self)
+
+
+class PostSitemap(Sitemap):
+    """Страницы постов.
+
+    Каждый файл sitemap читает ``limit`` строк с минимальным набором колонок
+    по курсору (см. ``KeysetPaginator``), поэтому весь архив в память не
+    грузится, а глубокие страницы не медленнее первой.
+    """
+
+    changefreq = 'weekly'
+    priority = 0.8
+
+    @property
+    def limit(self):
+        return settings.BLOG_SYNDICATION['SITEMAP_LIMIT']
+
+    @property
+    def paginator(self):
+        return KeysetPaginator(self.items(), self.limit)
+
+    def items(self):
+        return Post.published.only('slug', 'publish', 'updated').order_by('-publish', '-id')
+
+    def lastmod(self, item):
+        return item.updated
+
+    def get_latest_lastmod(self):
+        # Базовый класс перебирает для индекса sitemap все посты.
+        return published_state()[0]
+
+
+class TagSitemap(Sitemap):
+    changefreq = 'daily'
+    priority = 0.5
+
+    def items(self):
+        return (
+            Tag.objects.filter(posts__status=PostStatus.PUBLISHED)
+            .only('slug')
+            .order_by('slug')
+            .distinct()
+        )
+
+    def location(self, item):
+        return f"{reverse('blog:post_list')}?tag={item.slug}"
+
+
+class StaticViewSitemap(Sitemap):
+    changefreq = 'daily'
+    priority = 1.0
+
+    def items(self):
+        return ['blog:home', 'blog:post_list']
+
+    def location(self, item):
+        return reverse(item)
+
+
+sitemaps = {
+    'static': StaticViewSitemap,
+    'posts': PostSitemap,
+    'tags': TagSitemap,
+}
@@ -0,0 +1,69 @@
+"""Отдача собранной статики с заранее сжатыми вариантами.
+
+Используется, когда перед приложением нет nginx с ``gzip_static``: файлы
+берутся из ``STATIC_ROOT``, кодировка выбирается по ``Accept-Encoding``,
+а хешированные имена получают кеширование на год.
+"""
+
+import mimetypes
+import os
+import posixpath
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+@lru_cache(maxsize=1)
+def hashed_names():
+    # Манифест меняется только вместе с деплоем, т. е. с перезапуском процесса.
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def _accepts(request, encoding):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(
+        part.split(';')[0].strip() == encoding for part in accepted.split(',')
+    )
+
+
+@require_safe
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    for _, suffix in ENCODINGS:
+        # Сжатые копии отдаются только через Accept-Encoding исходного файла.
+        if fullpath.endswith(suffix) and os.path.isfile(fullpath[: -len(suffix)]):
+            raise Http404
+
+    # Для остальных сжатых файлов (например, .tar.gz) кодировка берётся из имени.
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    for candidate, suffix in ENCODINGS if encoding is None else ():
+        if _accepts(request, candidate) and os.path.isfile(fullpath + suffix):
+            encoding, fullpath = candidate, fullpath + suffix
+            break
+
+    response = FileResponse(
+        open(fullpath, 'rb'), content_type=content_type or 'application/octet-stream'
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if name in hashed_names():
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = f"public, max-age={settings.BLOG_STATIC['MAX_AGE']}"
+    return response
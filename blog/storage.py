@@ -0,0 +1,65 @@
+"""Хранилище статики с хешированными именами и заранее сжатыми копиями.
+
+При ``collectstatic`` рядом с каждым текстовым файлом появляются ``.gz`` и,
+если установлен пакет ``brotli``, ``.br``. Веб-сервер (``gzip_static`` /
+``brotli_static`` в nginx или ``blog.static_views.serve``) отдаёт их без
+сжатия на лету.
+
+В рабочем режиме (``DEBUG = False``) перед запуском нужен
+``manage.py collectstatic``: только он создаёт манифест и сжатые копии. Без
+манифеста ссылки на статику строятся без хеша, и страницы всё равно
+рендерятся (тесты, ``build_static`` и ``warmup`` на свежей копии).
+"""
+
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+
+def compressors():
+    yield 'gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield 'br', lambda data: brotli.compress(data, quality=11)
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Файла нет ни в манифесте, ни в STATIC_ROOT: статика не собрана.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        config = settings.BLOG_STATIC
+        extensions = tuple(config['COMPRESS_EXTENSIONS'])
+        # Сжимаются и исходные, и хешированные имена: шаблоны в DEBUG и
+        # сторонний код могут ссылаться на файл без хеша.
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.endswith(extensions):
+                continue
+            with self.open(name) as fh:
+                data = fh.read()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                continue
+            for suffix, compress in compressors():
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                target = f'{name}.{suffix}'
+                if self.exists(target):
+                    self.delete(target)
+                self._save(target, ContentFile(compressed))
@@ -0,0 +1,535 @@
+"""Индекс тегов в памяти процесса для фильтрации по нескольким тегам.
+
+Каждому опубликованному посту выдаётся слот — порядковый номер в
+сортировке по ``publish``, поэтому обход слотов от старших к младшим
+даёт ленту «сначала новые». Для каждого тега хранится множество слотов:
+у частых тегов — битовая карта (``int``), у редких — отсортированный
+``array``, который на время запроса превращается в битовую карту.
+Пересечения, объединения и счётчики фасетов считаются в памяти, из базы
+загружается только итоговая страница.
+
+Индекс строится лениво и обновляется сигналами после коммита. Изменения
+применяются к копии, которая затем подменяет индекс под блокировкой:
+запросы в других потоках дочитывают прежний, неизменный экземпляр.
+
+Каждое изменение получает номер версии в кеше ``default`` (он общий для
+воркеров, см. проверку ``blog.E001``) и записывается в журнал изменений
+под этим номером. Процесс, заметивший чужие изменения, применяет их из
+журнала — за микросекунды, а не перестраивая индекс. Полная перестройка
+(пропавшая запись журнала, публикация задним числом, много снятых постов)
+идёт в фоновом потоке, а запросы тем временем читают прежний индекс.
+Синхронно индекс строится только при первом обращении в процессе.
+"""
+
+import bisect
+import copy
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import connections
+
+from .models import Post
+
+VERSION_KEY = 'blog:tag_index:version'
+LOG_KEY = 'blog:tag_index:change:{}'
+
+# Сколько секунд хранится запись журнала и сколько записей процесс готов
+# применить разом; при большем отставании дешевле перестроить индекс.
+LOG_TTL = 3600
+MAX_REPLAY = 1000
+
+# Тег хранится битовой картой, если покрывает не меньше 1/32 слотов:
+# тогда карта занимает меньше памяти, чем массив 4-байтных номеров.
+DENSE_RATIO = 32
+
+# Доля «мёртвых» слотов (снятые с публикации посты), после которой
+# индекс перестраивается, чтобы не держать в памяти лишние биты.
+MAX_DEAD_RATIO = 0.1
+
+# Во сколько раз подсчёт тега через прямой индекс дороже проверки одного
+# элемента обратного списка (оценено командой bench_tag_index).
+FORWARD_COST = 10
+
+# Сколько наборов фасетов держать в памяти между изменениями индекса.
+FACET_CACHE_SIZE = 256
+
+_BYTE_BITS = bytes(bin(value).count('1') for value in range(256))
+
+
+# int.bit_count появился в Python 3.10.
+popcount = getattr(int, 'bit_count', None) or (lambda bitmap: bin(bitmap).count('1'))
+
+
+def _slots_to_bitmap(slots, size):
+    data = bytearray((size + 7) // 8)
+    for slot in slots:
+        data[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(data, 'little')
+
+
+class TagIndex:
+    def __init__(self, post_ids, pairs):
+        """``post_ids`` — id опубликованных постов по возрастанию ``publish``,
+        ``pairs`` — пары (post_id, tag_id) из связующей таблицы."""
+
+        self.post_ids = array('q', post_ids)
+        self.slot_of = array('i', [-1]) * ((max(self.post_ids) + 1) if self.post_ids else 0)
+        for slot, post_id in enumerate(self.post_ids):
+            self.slot_of[post_id] = slot
+        self.live = (1 << len(self.post_ids)) - 1
+        self.dead = 0
+        self.dirty = False
+        self.last_publish = None
+
+        postings = defaultdict(lambda: array('i'))
+        pair_slots = array('i')
+        pair_tags = array('i')
+        slot_of = self.slot_of
+        limit = len(slot_of)
+        for post_id, tag_id in pairs:
+            if post_id < limit and slot_of[post_id] >= 0:
+                slot = slot_of[post_id]
+                postings[tag_id].append(slot)
+                pair_slots.append(slot)
+                pair_tags.append(tag_id)
+
+        self.dense = {}
+        self.sparse = {}
+        size = len(self.post_ids)
+        for tag_id, slots in postings.items():
+            slots = array('i', sorted(slots))
+            if len(slots) * DENSE_RATIO >= size:
+                self.dense[tag_id] = _slots_to_bitmap(slots, size)
+            else:
+                self.sparse[tag_id] = slots
+        self.sparse_postings = sum(len(slots) for slots in self.sparse.values())
+
+        # Прямой индекс «слот → теги» в формате CSR: теги слота лежат в
+        # tag_data[tag_offsets[slot]:tag_offsets[slot + 1]]. Изменения после
+        # построения хранятся в tag_overrides.
+        self.tag_offsets = array('q', [0]) * (size + 1)
+        for slot in pair_slots:
+            self.tag_offsets[slot + 1] += 1
+        for slot in range(size):
+            self.tag_offsets[slot + 1] += self.tag_offsets[slot]
+        self.tag_data = array('i', [0]) * len(pair_tags)
+        cursor = self.tag_offsets[:-1]
+        for slot, tag_id in zip(pair_slots, pair_tags):
+            self.tag_data[cursor[slot]] = tag_id
+            cursor[slot] += 1
+        self.tag_overrides = {}
+        self.facet_cache = {}
+
+    @property
+    def size(self):
+        return len(self.post_ids)
+
+    @property
+    def stale(self):
+        return self.dirty or self.dead > self.size * MAX_DEAD_RATIO
+
+    def bitmap(self, tag_id):
+        if tag_id in self.dense:
+            return self.dense[tag_id]
+        if tag_id in self.sparse:
+            return _slots_to_bitmap(self.sparse[tag_id], self.size)
+        return 0
+
+    def tag_size(self, tag_id):
+        if tag_id in self.dense:
+            return popcount(self.dense[tag_id])
+        return len(self.sparse.get(tag_id, ()))
+
+    def filter(self, tag_ids, match='all'):
+        """Битовая карта постов со всеми (``'all'``) или любым (``'any'``) из тегов."""
+
+        if not tag_ids:
+            return self.live
+        if match == 'any':
+            result = 0
+            for tag_id in tag_ids:
+                result |= self.bitmap(tag_id)
+        else:
+            ordered = sorted(tag_ids, key=self.tag_size)
+            result = self.bitmap(ordered[0])
+            for tag_id in ordered[1:]:
+                if not result:
+                    break
+                result &= self.bitmap(tag_id)
+        return result & self.live
+
+    def page(self, bitmap, offset, limit):
+        """id постов с ``offset`` по ``offset + limit`` в порядке «сначала новые»."""
+
+        data = bitmap.to_bytes((self.size + 7) // 8, 'little')
+        ids = []
+        position = len(data) - 1
+        while position >= 0 and len(ids) < limit:
+            byte = data[position]
+            if byte:
+                bits = _BYTE_BITS[byte]
+                if offset >= bits:
+                    offset -= bits
+                else:
+                    for bit in range(7, -1, -1):
+                        if byte >> bit & 1:
+                            if offset:
+                                offset -= 1
+                            else:
+                                ids.append(self.post_ids[position * 8 + bit])
+                                if len(ids) == limit:
+                                    break
+            position -= 1
+        return ids
+
+    def tags_of(self, slot):
+        if slot in self.tag_overrides:
+            return self.tag_overrides[slot]
+        if slot + 1 < len(self.tag_offsets):
+            return self.tag_data[self.tag_offsets[slot]:self.tag_offsets[slot + 1]]
+        return ()
+
+    def slots(self, bitmap):
+        """Номера установленных битов по возрастанию."""
+
+        bits = bin(bitmap)[:1:-1]
+        position = bits.find('1')
+        while position != -1:
+            yield position
+            position = bits.find('1', position + 1)
+
+    def facets(self, bitmap, exclude=()):
+        """Пары (tag_id, число постов выборки с этим тегом), по убыванию числа.
+
+        Для небольшой выборки теги считаются по прямому индексу её постов,
+        для большой — пересечением с каждым тегом: выбирается путь, которому
+        нужно перебрать меньше элементов в Python.
+        """
+
+        matched = popcount(bitmap)
+        average_tags = len(self.tag_data) / self.size if self.size else 0
+        if matched * average_tags * FORWARD_COST < self.sparse_postings:
+            counter = Counter()
+            for slot in self.slots(bitmap):
+                counter.update(self.tags_of(slot))
+            counts = [
+                (tag_id, count)
+                for tag_id, count in counter.items()
+                if tag_id not in exclude and (tag_id in self.dense or tag_id in self.sparse)
+            ]
+        else:
+            counts = []
+            for tag_id, tag_bitmap in self.dense.items():
+                if tag_id not in exclude:
+                    count = popcount(bitmap & tag_bitmap)
+                    if count:
+                        counts.append((tag_id, count))
+            data = bitmap.to_bytes((self.size + 7) // 8, 'little')
+            for tag_id, slots in self.sparse.items():
+                if tag_id in exclude:
+                    continue
+                count = sum(data[slot >> 3] >> (slot & 7) & 1 for slot in slots)
+                if count:
+                    counts.append((tag_id, count))
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts
+
+    def selection_facets(self, tag_ids, match='all'):
+        """Фасеты для ``filter(tag_ids, match)`` с кешем до следующего изменения."""
+
+        key = (frozenset(tag_ids), match)
+        if key not in self.facet_cache:
+            if len(self.facet_cache) >= FACET_CACHE_SIZE:
+                self.facet_cache.clear()
+            self.facet_cache[key] = self.facets(self.filter(tag_ids, match), exclude=key[0])
+        return self.facet_cache[key]
+
+    def copy(self):
+        """Копия для изменения.
+
+        Изменения не трогают массивы редких тегов и прямой индекс на месте,
+        а заменяют их, поэтому достаточно скопировать словари и массивы слотов.
+        """
+
+        clone = copy.copy(self)
+        clone.post_ids = array('q', self.post_ids)
+        clone.slot_of = array('i', self.slot_of)
+        clone.dense = dict(self.dense)
+        clone.sparse = dict(self.sparse)
+        clone.tag_overrides = dict(self.tag_overrides)
+        clone.facet_cache = {}
+        return clone
+
+    # Инкрементальные изменения. Вызываются для копии под блокировкой модуля.
+
+    # Изменения идемпотентны: запись журнала может попасть в индекс, уже
+    # построенный с её учётом.
+
+    def add_post(self, post_id, tag_ids, is_newest):
+        if self._slot(post_id) is not None:
+            return
+        if not is_newest:
+            # Новый слот нарушил бы порядок по publish.
+            self.dirty = True
+            return
+        slot = len(self.post_ids)
+        self.post_ids.append(post_id)
+        if post_id >= len(self.slot_of):
+            self.slot_of.extend([-1] * (post_id + 1 - len(self.slot_of)))
+        self.slot_of[post_id] = slot
+        self.live |= 1 << slot
+        self.tag_overrides[slot] = tuple(tag_ids)
+        for tag_id in tag_ids:
+            self._add_slot(tag_id, slot)
+
+    def remove_post(self, post_id):
+        slot = self._slot(post_id)
+        if slot is None:
+            return
+        # Биты в списках тегов остаются, но маскируются картой live.
+        self.live &= ~(1 << slot)
+        self.slot_of[post_id] = -1
+        self.dead += 1
+
+    def add_tags(self, post_id, tag_ids):
+        slot = self._slot(post_id)
+        if slot is not None:
+            self.tag_overrides[slot] = tuple(set(self.tags_of(slot)) | set(tag_ids))
+            for tag_id in tag_ids:
+                self._add_slot(tag_id, slot)
+
+    def remove_tags(self, post_id, tag_ids):
+        slot = self._slot(post_id)
+        if slot is None:
+            return
+        self.tag_overrides[slot] = tuple(set(self.tags_of(slot)) - set(tag_ids))
+        for tag_id in tag_ids:
+            if tag_id in self.dense:
+                self.dense[tag_id] &= ~(1 << slot)
+            elif tag_id in self.sparse:
+                slots = self.sparse[tag_id]
+                position = bisect.bisect_left(slots, slot)
+                if position < len(slots) and slots[position] == slot:
+                    self.sparse[tag_id] = slots[:position] + slots[position + 1:]
+                    self.sparse_postings -= 1
+
+    def drop_tag(self, tag_id):
+        self.dense.pop(tag_id, None)
+        self.sparse_postings -= len(self.sparse.pop(tag_id, ()))
+
+    def _slot(self, post_id):
+        if post_id < len(self.slot_of) and self.slot_of[post_id] >= 0:
+            return self.slot_of[post_id]
+        return None
+
+    def _add_slot(self, tag_id, slot):
+        if tag_id in self.dense:
+            self.dense[tag_id] |= 1 << slot
+            return
+        slots = self.sparse.get(tag_id, array('i'))
+        position = bisect.bisect_left(slots, slot)
+        if position == len(slots) or slots[position] != slot:
+            self.sparse[tag_id] = slots[:position] + array('i', [slot]) + slots[position:]
+            self.sparse_postings += 1
+
+
+def build_tag_index():
+    posts = Post.published.order_by('publish', 'id').values_list('id', flat=True)
+    pairs = (
+        Post.tags.through.objects.filter(post__status=Post.Status.PUBLISHED)
+        .values_list('post_id', 'tag_id')
+        .iterator(chunk_size=10000)
+    )
+    index = TagIndex(posts.iterator(chunk_size=10000), pairs)
+    index.last_publish = (
+        Post.published.order_by('-publish').values_list('publish', flat=True).first()
+    )
+    return index
+
+
+def _post_published(index, post_id, tag_ids, publish):
+    newest = index.last_publish is None or publish >= index.last_publish
+    index.add_post(post_id, tag_ids, newest)
+    if newest:
+        index.last_publish = publish
+
+
+def _invalidate(index):
+    index.dirty = True
+
+
+# Изменения из журнала: имя → функция(индекс, *аргументы).
+CHANGES = {
+    'post_published': _post_published,
+    'post_unpublished': TagIndex.remove_post,
+    'tags_added': TagIndex.add_tags,
+    'tags_removed': TagIndex.remove_tags,
+    'tag_deleted': TagIndex.drop_tag,
+    'invalidate': _invalidate,
+}
+
+_index = None
+_version = None
+_rebuilding = False
+_lock = threading.RLock()
+
+
+def _spawn(target):
+    threading.Thread(target=target, name='tag-index-rebuild', daemon=True).start()
+
+
+def _rebuild_in_background():
+    try:
+        _rebuild()
+    finally:
+        # Соединения с БД принадлежат потоку и сами не закроются.
+        connections.close_all()
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Отсчёт с текущего времени в микросекундах: если счётчик вытеснят,
+        # новые номера не совпадут с оставшимися в кеше записями журнала.
+        cache.add(VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _replay(index, version, shared):
+    """Применяет к копии ``index`` изменения журнала после ``version`` до
+    ``shared``; возвращает копию или ``None``, если записей не хватает."""
+
+    if shared - version > MAX_REPLAY:
+        return None
+    keys = [LOG_KEY.format(number) for number in range(version + 1, shared + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) != len(keys):
+        return None
+    updated = index.copy()
+    for key in keys:
+        name, args = entries[key]
+        CHANGES[name](updated, *args)
+    return updated
+
+
+def _catch_up():
+    """Догоняет общую версию под блокировкой; ``True``, если индекс актуален."""
+
+    global _index, _version
+    shared = _shared_version()
+    if shared == _version:
+        return True
+    if shared is None or _version is None or shared < _version:
+        return False
+    updated = _replay(_index, _version, shared)
+    if updated is None:
+        return False
+    _index, _version = updated, shared
+    return True
+
+
+def _rebuild():
+    global _index, _version, _rebuilding
+    try:
+        # Версия читается до чтения БД: изменения, сделанные во время
+        # построения, применятся из журнала.
+        version = _shared_version()
+        index = build_tag_index()
+        with _lock:
+            _index, _version = index, version
+            if not _catch_up():
+                _version = None
+    finally:
+        _rebuilding = False
+
+
+def get_tag_index():
+    """Возвращает индекс процесса, применяя чужие изменения из журнала.
+
+    Если индекс не догнать журналом, запускается фоновая перестройка, а
+    до её окончания возвращается прежний индекс.
+    """
+
+    global _rebuilding
+    with _lock:
+        if _index is None:
+            _rebuild()
+            return _index
+        if (not _catch_up() or _index.stale) and not _rebuilding:
+            _rebuilding = True
+            _spawn(_rebuild_in_background)
+        return _index
+
+
+def apply_change(name, *args):
+    """Применяет изменение к копии индекса процесса, подменяет индекс копией
+    и записывает изменение в журнал для остальных процессов."""
+
+    global _index, _version
+    with _lock:
+        if _index is not None and _catch_up():
+            updated = _index.copy()
+            CHANGES[name](updated, *args)
+            _index = updated
+        _shared_version()
+        # ``incr`` атомарен в Redis и Memcached; на файловом кеше два
+        # процесса могут получить один номер — тогда ``add`` второго не
+        # пройдёт, и он возьмёт следующий.
+        while True:
+            try:
+                new_version = cache.incr(VERSION_KEY)
+            except ValueError:
+                return
+            if cache.add(LOG_KEY.format(new_version), (name, args), LOG_TTL):
+                break
+        if _version is not None and new_version == _version + 1:
+            _version = new_version
+
+
+def post_published(post, tag_ids):
+    apply_change('post_published', post.pk, tuple(tag_ids), post.publish)
+
+
+def post_unpublished(post_id):
+    apply_change('post_unpublished', post_id)
+
+
+def tags_added(post_id, tag_ids):
+    apply_change('tags_added', post_id, tuple(tag_ids))
+
+
+def tags_removed(post_id, tag_ids):
+    apply_change('tags_removed', post_id, tuple(tag_ids))
+
+
+def tag_deleted(tag_id):
+    apply_change('tag_deleted', tag_id)
+
+
+def invalidate():
+    apply_change('invalidate')
+
+
+class Selection:
+    """Результат фильтрации как последовательность id для ``Paginator``."""
+
+    def __init__(self, index, bitmap):
+        self.index = index
+        self.bitmap = bitmap
+
+    def count(self):
+        return popcount(self.bitmap)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('Selection supports only slicing')
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        return self.index.page(self.bitmap, start, max(0, stop - start))
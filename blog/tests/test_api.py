@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog import comment_archive
+from blog.models import Comment, PostStatus, Tag
+
+from .utils import LOCAL_CACHE, make_post
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='anna')
+        self.post = make_post(self.author, 'Пост')
+        self.tag = Tag.objects.create(name='Тег', slug='tag')
+        self.post.tags.add(self.tag)
+
+    def test_invalid_parameters(self):
+        for query in ('fields=zzz', 'before=garbage', 'limit=abc', 'limit=0', 'limit=101'):
+            response = self.client.get(f'/api/posts/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.post('/api/posts/').status_code, 405)
+
+    def test_projection_and_paging(self):
+        older = make_post(self.author, 'Старый', days_ago=3)
+        make_post(self.author, 'Черновик', status=PostStatus.DRAFT)
+        data = self.client.get('/api/posts/', {'fields': 'title,url', 'limit': 1}).json()
+        self.assertEqual(data['results'], [{'title': 'Пост', 'url': self.post.get_absolute_url()}])
+        response = self.client.get(
+            '/api/posts/', {'fields': 'id,tags', 'limit': 1, 'before': data['next']}
+        )
+        self.assertEqual(response.json(), {'results': [{'id': older.pk, 'tags': []}], 'next': None})
+
+        response = self.client.get('/api/posts/', {'tag': 'tag', 'fields': 'id'})
+        self.assertEqual(response.json()['results'], [{'id': self.post.pk}])
+        detail = self.client.get(f'/api/posts/{self.post.pk}/').json()
+        self.assertEqual((detail['author'], detail['body'], detail['tags']), ('anna', 'Текст', ['tag']))
+
+    def test_drafts_are_hidden(self):
+        draft = make_post(self.author, 'Черновик', status=PostStatus.DRAFT)
+        self.assertEqual(self.client.get(f'/api/posts/{draft.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/posts/{draft.pk}/comments/').status_code, 404)
+
+    def test_comments_include_archive(self):
+        old = make_post(self.author, 'Старый', days_ago=800)
+        for body in ('первый', 'второй'):
+            Comment.objects.create(post=old, name='Ира', email='ira@example.com', body=body)
+        comment_archive.archive(now=timezone.now() + timedelta(days=800))
+        Comment.objects.create(post=old, name='Олег', email='oleg@example.com', body='новый')
+        hidden = Comment.objects.create(post=old, name='Олег', email='oleg@example.com', body='x')
+        hidden.active = False
+        hidden.save()
+
+        url = f'/api/posts/{old.pk}/comments/'
+        first = self.client.get(url, {'limit': 2}).json()
+        rest = self.client.get(url, {'limit': 2, 'before': first['next']}).json()
+        self.assertEqual(
+            [row['body'] for row in first['results'] + rest['results']],
+            ['новый', 'второй', 'первый'],
+        )
+        self.assertNotIn('email', first['results'][0])
+        self.assertIsNone(rest['next'])
+
+        etag = self.client.get(url)['ETag']
+        hidden.active = True
+        hidden.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tags(self):
+        Tag.objects.create(name='Архив', slug='archive')
+        response = self.client.get('/api/tags/', {'fields': 'slug,posts'})
+        self.assertEqual(
+            response.json()['results'],
+            [{'slug': 'archive', 'posts': 0}, {'slug': 'tag', 'posts': 1}],
+        )
+
+    def test_etag_follows_tag_rename(self):
+        etag = self.client.get('/api/posts/')['ETag']
+        self.assertEqual(self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.slug = 'renamed'
+            self.tag.save()
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['tags'], ['renamed'])
+
+    def test_etag_follows_author_rename(self):
+        url = f'/api/posts/{self.post.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'anna.k'
+            self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['author'], 'anna.k')
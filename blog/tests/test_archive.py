@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import decode_cursor, encode_cursor, keyset_page
+
+from .utils import LOCAL_CACHE, make_post
+
+
+class CursorTests(TestCase):
+    def setUp(self):
+        author = User.objects.create(username='anna')
+        self.moment = timezone.now().replace(microsecond=123456)
+        self.posts = [
+            make_post(author, f'Пост {number}', publish=self.moment) for number in range(7)
+        ]
+
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(self.moment, 42)), (self.moment, 42))
+        for broken in ('', 'abc', '1.2.3', '12.x', None):
+            self.assertIsNone(decode_cursor(broken))
+
+    def collect(self, queryset, key):
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(queryset, cursor, 3)
+            seen += [key(item) for item in items]
+            if cursor is None:
+                return seen
+
+    def test_pages_with_equal_publish(self):
+        expected = sorted((post.pk for post in self.posts), reverse=True)
+        self.assertEqual(self.collect(Post.published.all(), lambda post: post.pk), expected)
+        rows = Post.published.values('id', 'publish')
+        self.assertEqual(self.collect(rows, lambda row: row['id']), expected)
+
+
+@override_settings(CACHES=LOCAL_CACHE, BLOG_POSTS_PER_PAGE=2)
+class ArchiveViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='anna')
+        self.march = [
+            make_post(self.author, f'Март {day}', publish=self.at(2024, 3, day))
+            for day in (1, 2, 3)
+        ]
+
+    def at(self, year, month, day):
+        return timezone.make_aware(datetime(year, month, day, 12))
+
+    def titles(self, response):
+        return [post.title for post in response.context['posts']]
+
+    def test_month_pages(self):
+        response = self.client.get('/2024/3/')
+        self.assertEqual(response.context['period_total'], 3)
+        self.assertEqual(self.titles(response), ['Март 3', 'Март 2'])
+        response = self.client.get('/2024/3/', {'before': response.context['next_cursor']})
+        self.assertEqual(self.titles(response), ['Март 1'])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_missing_periods(self):
+        self.assertEqual(self.client.get('/2024/4/').status_code, 404)
+        self.assertEqual(self.client.get('/2024/13/').status_code, 404)
+        self.assertEqual(self.client.get('/2023/').status_code, 404)
+
+    def test_new_month_is_served_despite_cached_sidebar(self):
+        self.client.get('/2024/')
+        make_post(self.author, 'Апрель', publish=self.at(2024, 4, 1))
+        response = self.client.get('/2024/4/')
+        self.assertEqual(self.titles(response), ['Апрель'])
+
+    def test_unpublished_month_disappears(self):
+        for post in self.march:
+            post.delete()
+        self.assertEqual(self.client.get('/2024/3/').status_code, 404)
+        self.assertEqual(self.client.get('/2024/').status_code, 404)
@@ -0,0 +1,153 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from blog import prerender
+from blog.models import Comment, PostStatus, Tag
+
+from .utils import LOCAL_CACHE, make_post, reset_tag_index
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BuildStaticTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_tag_index(self)
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.author = author = User.objects.create(username='anna')
+        self.cats = Tag.objects.create(name='Кошки', slug='cats')
+        self.dogs = Tag.objects.create(name='Собаки', slug='dogs')
+        self.first = make_post(author, 'Первый', days_ago=40)
+        self.first.tags.add(self.cats)
+        self.second = make_post(author, 'Второй', days_ago=1)
+        self.second.tags.add(self.cats, self.dogs)
+
+    def build(self, *args):
+        output = {'stdout': StringIO(), 'stderr': StringIO()}
+        call_command('build_static', *args, output=str(self.root), workers=1, **output)
+        return json.loads((self.root / prerender.MANIFEST_NAME).read_text())
+
+    def exists(self, url):
+        return (self.root / prerender.url_to_file(url)).exists()
+
+    def test_full_build(self):
+        manifest = self.build()
+        self.assertEqual(set(manifest['posts']), {str(self.first.pk), str(self.second.pk)})
+        for url in (
+            '/',
+            '/posts/',
+            '/posts/?tag=cats',
+            '/posts/?tag=dogs',
+            self.first.get_absolute_url(),
+            self.second.get_absolute_url(),
+            f'/{self.second.publish.year}/',
+            '/authors/',
+            '/authors/anna/',
+        ):
+            self.assertTrue(self.exists(url), url)
+
+    def test_incremental_build_deletes_stale_pages(self):
+        self.build()
+        old_url = self.second.get_absolute_url()
+        self.second.status = PostStatus.DRAFT
+        self.second.save()
+
+        with mock.patch.object(prerender, 'render_path', wraps=prerender.render_path) as render:
+            manifest = self.build()
+        rendered = {call.args[0] for call in render.call_args_list}
+        self.assertNotIn(self.first.get_absolute_url(), rendered)
+        self.assertIn('/posts/?tag=cats', rendered)
+        self.assertEqual(set(manifest['posts']), {str(self.first.pk)})
+        self.assertFalse(self.exists(old_url))
+        self.assertFalse(self.exists('/posts/?tag=dogs'))
+        self.assertTrue(self.exists('/posts/?tag=cats'))
+
+    def test_failed_page_keeps_manifest(self):
+        manifest = self.build()
+        self.first.title = 'Первый, исправленный'
+        self.first.save()
+        broken = self.first.get_absolute_url()
+
+        def render_path(url):
+            return (500, b'') if url == broken else original(url)
+
+        original = prerender.render_path
+        with mock.patch.object(prerender, 'render_path', render_path):
+            with self.assertRaises(CommandError):
+                self.build()
+        self.assertEqual(
+            json.loads((self.root / prerender.MANIFEST_NAME).read_text()), manifest
+        )
+        # Следующая сборка повторяет страницу.
+        self.assertNotEqual(self.build(), manifest)
+
+    @override_settings(BLOG_POSTS_PER_PAGE=1)
+    def test_paginated_and_pair_pages(self):
+        self.build()
+        for url in (
+            '/posts/?page=2',
+            '/posts/?tag=cats&page=2',
+            '/posts/?tag=cats&tag=dogs',
+            '/posts/?tag=dogs&tag=cats',
+        ):
+            self.assertTrue(self.exists(url), url)
+        self.assertFalse(self.exists('/posts/?page=3'))
+        page = (self.root / prerender.url_to_file('/posts/?tag=cats&page=2')).read_text()
+        self.assertIn(self.first.title, page)
+        self.assertNotIn(self.second.title, page)
+
+    @override_settings(BLOG_POSTS_PER_PAGE=1)
+    def test_incremental_build_shifts_pages(self):
+        self.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.tags.remove(self.cats)
+
+        with mock.patch.object(prerender, 'render_path', wraps=prerender.render_path) as render:
+            self.build()
+        rendered = {call.args[0] for call in render.call_args_list}
+        self.assertIn('/posts/?tag=cats', rendered)
+        self.assertIn(self.second.get_absolute_url(), rendered)
+        # В каталоге порядок не изменился: вторая страница не пересобирается.
+        self.assertNotIn('/posts/?page=2', rendered)
+        # У тега осталась одна страница, но файл первой страницы на месте.
+        self.assertFalse(self.exists('/posts/?tag=cats&page=2'))
+        self.assertFalse(self.exists('/posts/?tag=cats&tag=dogs'))
+        self.assertTrue(self.exists('/posts/?tag=cats'))
+        page = (self.root / prerender.url_to_file('/posts/?tag=cats')).read_text()
+        self.assertIn(self.first.title, page)
+
+    def rendered_by_build(self):
+        with mock.patch.object(prerender, 'render_path', wraps=prerender.render_path) as render:
+            self.build()
+        return {call.args[0] for call in render.call_args_list}
+
+    def test_author_stats_change_rebuilds_author_pages(self):
+        self.build()
+        draft = make_post(self.author, 'Черновик', status=PostStatus.DRAFT)
+        Comment.objects.create(post=draft, name='Ира', email='ira@example.com', body='!')
+        self.assertEqual(self.rendered_by_build(), {'/authors/', '/authors/anna/'})
+        self.assertIn(
+            'Комментариев читателей: 1',
+            (self.root / prerender.url_to_file('/authors/anna/')).read_text(),
+        )
+
+    def test_author_pages_follow_posts(self):
+        self.build()
+        boris = User.objects.create(username='boris')
+        self.first.author = boris
+        self.first.save()
+        rendered = self.rendered_by_build()
+        self.assertLessEqual({'/authors/', '/authors/anna/', '/authors/boris/'}, rendered)
+
+        self.first.status = PostStatus.DRAFT
+        self.first.save()
+        self.assertIn('/authors/', self.rendered_by_build())
+        self.assertFalse(self.exists('/authors/boris/'))
+        self.assertTrue(self.exists('/authors/anna/'))
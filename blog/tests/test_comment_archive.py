@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog import comment_archive
+from blog.models import ArchivedComment, Comment, Post, Tag
+
+from .utils import LOCAL_CACHE, make_post
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CommentArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username='anna')
+        self.tag = Tag.objects.create(name='Кошки', slug='cats')
+        self.old = make_post(author, 'Старый пост', days_ago=800)
+        self.new = make_post(author, 'Новый пост', days_ago=1)
+        for post in (self.old, self.new):
+            post.tags.add(self.tag)
+        self.moment = timezone.now() - timedelta(days=700)
+        for number in range(5):
+            Comment.objects.create(post=self.old, name='Ира', email='ira@example.com', body=str(number))
+        Comment.objects.create(post=self.new, name='Ира', email='ira@example.com', body='!')
+        Comment.objects.filter(post=self.old).update(created=self.moment, updated=self.moment)
+
+    def archive(self):
+        self.assertEqual(comment_archive.archive(batch_size=2), (5, True))
+        self.assertEqual(ArchivedComment.objects.count(), 5)
+
+    def counts(self, queryset):
+        return dict(queryset.values_list('title', 'comment_count'))
+
+    def test_counts_include_archived_comments(self):
+        before = self.counts(Post.objects.with_comment_counts())
+        self.archive()
+        self.assertEqual(self.counts(Post.objects.with_comment_counts()), before)
+        self.assertEqual(before, {'Старый пост': 5, 'Новый пост': 1})
+        self.assertEqual(comment_archive.active_total(self.old), 5)
+        self.assertEqual(
+            list(Post.objects.editors_choice().values_list('title', flat=True)), ['Старый пост']
+        )
+
+    def test_related_posts_order_by_all_comments(self):
+        self.archive()
+        response = self.client.get(self.new.get_absolute_url())
+        related = response.context['related_posts']
+        self.assertEqual([(post.title, post.comment_count) for post in related], [('Старый пост', 5)])
+
+    def test_comment_pages_with_equal_created(self):
+        Comment.objects.update(created=self.moment)
+        # Часть комментариев поста в архиве: курсор общий для обеих таблиц.
+        comment_archive.archive(batch_size=2, max_batches=1)
+        seen, cursor = [], None
+        while True:
+            items, cursor = comment_archive.comments_page(self.old, cursor, 2)
+            seen += [comment.pk for comment in items]
+            if cursor is None:
+                break
+        self.assertEqual(
+            seen,
+            list(
+                Comment.objects.filter(post=self.old).order_by('-pk').values_list('pk', flat=True)
+            )
+            + list(ArchivedComment.objects.order_by('-pk').values_list('pk', flat=True)),
+        )
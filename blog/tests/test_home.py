@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import metrics
+from blog.models import Comment, Tag
+
+from .utils import LOCAL_CACHE, make_post
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class StreamedHomeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username='anna')
+        tag = Tag.objects.create(name='Выбор редакции', slug='featured')
+        for number in range(3):
+            post = make_post(author, f'Пост {number}', days_ago=number)
+            post.tags.add(tag)
+            Comment.objects.create(post=post, name='Ира', email='ira@example.com', body='Да')
+
+    def get(self, stream):
+        with override_settings(BLOG_STREAM_HOME=stream):
+            return self.client.get('/')
+
+    def test_stream_matches_render(self):
+        streamed = self.get(True)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed['Content-Type'], 'text/html; charset=utf-8')
+        body = b''.join(streamed.streaming_content)
+        rendered = self.get(False)
+        self.assertFalse(rendered.streaming)
+        self.assertEqual(body.decode(), rendered.content.decode())
+        self.assertIn('Пост 2', body.decode())
+
+    def test_metrics_recorded_when_body_is_sent(self):
+        self.enterContext(mock.patch.object(metrics, 'registry', metrics.Registry()))
+        key = (
+            'blog_request_duration_seconds',
+            metrics.labels(view='blog:home', status='2xx'),
+        )
+        response = self.get(True)
+        self.assertNotIn(key, metrics.registry.histograms)
+        b''.join(response.streaming_content)
+        self.assertEqual(metrics.registry.histograms[key][-1], 1)
+        queries = metrics.registry.histograms[
+            ('blog_db_queries_per_request', metrics.labels(view='blog:home'))
+        ]
+        # Запросы виджетов выполняются при отдаче тела и тоже учитываются.
+        self.assertGreater(queries[-2], 0)
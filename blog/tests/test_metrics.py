@@ -0,0 +1,86 @@
+import re
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import metrics
+
+from .utils import LOCAL_CACHE, make_post
+
+METRICS = {
+    'ENABLED': True,
+    'DIR': None,
+    'FLUSH_INTERVAL': 1.0,
+    'TOKEN': 's3cret',
+    'ALLOWED_IPS': ('10.0.0.5',),
+}
+
+
+@override_settings(CACHES=LOCAL_CACHE, BLOG_METRICS=METRICS)
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(metrics, 'registry', metrics.Registry()))
+        make_post(User.objects.create(username='anna'), 'Пост')
+
+    def scrape(self, **headers):
+        return self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}, **headers)
+
+    def test_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        wrong = self.client.get('/metrics', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(wrong.status_code, 403)
+        basic = self.client.get('/metrics', headers={'Authorization': 'Basic s3cret'})
+        self.assertEqual(basic.status_code, 403)
+        self.assertEqual(self.scrape().status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(BLOG_METRICS={**METRICS, 'TOKEN': None})
+    def test_without_token_only_allowed_ips(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    def test_text_format(self):
+        self.client.get('/posts/')
+        self.client.get('/posts/')
+        response = self.scrape()
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = response.content.decode()
+        for name, (kind, _, _) in metrics.METRICS.items():
+            self.assertIn(f'# TYPE {name} {kind}\n', text)
+
+        prefix = 'blog_request_duration_seconds_bucket{status="2xx",view="blog:post_list",le='
+        buckets = [
+            (bound, int(value))
+            for bound, value in re.findall(re.escape(prefix) + r'"([^"]+)"\} (\d+)', text)
+        ]
+        self.assertEqual(len(buckets), len(metrics.SECONDS) + 1)
+        self.assertEqual(buckets[-1], ('+Inf', 2))
+        counts = [value for _, value in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertIn(
+            'blog_request_duration_seconds_count{status="2xx",view="blog:post_list"} 2\n', text
+        )
+        self.assertRegex(text, r'blog_db_queries_per_request_count\{view="blog:post_list"\} 2\n')
+        self.assertRegex(text, r'blog_template_render_seconds_count\{template="blog/post/list.html"\} 2\n')
+
+    def test_label_escaping(self):
+        metrics.inc('blog_cache_requests_total', cache='a"b\\c\nd', result='hit')
+        self.assertIn(
+            'blog_cache_requests_total{cache="a\\"b\\\\c\\nd",result="hit"} 1\n',
+            metrics.render_text(),
+        )
+
+    def test_shared_directory_sums_workers(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(BLOG_METRICS={**METRICS, 'DIR': directory}):
+            metrics.inc('blog_cache_requests_total', cache='feed', result='hit')
+            metrics.flush(force=True)
+            # Снимок другого воркера.
+            with mock.patch('os.getpid', return_value=1):
+                metrics.flush(force=True)
+            text = metrics.render_text()
+        self.assertIn('blog_cache_requests_total{cache="feed",result="hit"} 2\n', text)
@@ -0,0 +1,79 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blog import profiling
+
+from .utils import LOCAL_CACHE, make_post
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(
+            override_settings(
+                BLOG_PROFILING={
+                    'ENABLED': True,
+                    'HEADER': 'HTTP_X_BLOG_PROFILE',
+                    'QUERY_PARAM': '_profile',
+                    'SAMPLE_RATE': 0.0,
+                    'DIR': directory,
+                    'KEEP': 2,
+                }
+            )
+        )
+        self.staff = User.objects.create(username='admin', is_staff=True)
+        make_post(self.staff, 'Пост')
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/posts/', headers={'X-Blog-Profile': '1'})
+        profile_id = response['X-Blog-Profile-Id']
+        meta = profiling.load_meta(profile_id)
+        self.assertEqual(meta['view'], 'blog:post_list')
+        self.assertEqual(meta['trigger'], 'header')
+        self.assertEqual(meta['status'], 200)
+        self.assertGreater(meta['sql']['count'], 0)
+        self.assertGreater(meta['template_ms'], 0)
+        self.assertTrue(profiling.load_stats(profile_id).stats)
+
+        response = self.client.get('/', {'_profile': '1'})
+        self.assertEqual(profiling.load_meta(response['X-Blog-Profile-Id'])['trigger'], 'param')
+
+    def test_other_users_are_not_profiled(self):
+        response = self.client.get('/posts/', headers={'X-Blog-Profile': '1'})
+        self.assertNotIn('X-Blog-Profile-Id', response)
+        self.client.force_login(User.objects.create(username='reader'))
+        response = self.client.get('/posts/', {'_profile': '1'})
+        self.assertNotIn('X-Blog-Profile-Id', response)
+        self.assertEqual(profiling.load_profiles(), [])
+
+    def test_overlapping_request_is_served_unprofiled(self):
+        self.client.force_login(self.staff)
+        with profiling._active:
+            response = self.client.get('/posts/', headers={'X-Blog-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Blog-Profile-Id', response)
+
+    def test_retention_and_command(self):
+        self.client.force_login(self.staff)
+        ids = [
+            self.client.get('/posts/', headers={'X-Blog-Profile': '1'})['X-Blog-Profile-Id']
+            for _ in range(3)
+        ]
+        kept = [meta['id'] for meta in profiling.load_profiles()]
+        self.assertEqual(len(kept), 2)
+        self.assertLessEqual(set(kept), set(ids))
+
+        out = StringIO()
+        call_command('blog_profiles', 'list', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        out = StringIO()
+        call_command('blog_profiles', 'diff', *kept, stdout=out)
+        self.assertIn('post_list', out.getvalue())
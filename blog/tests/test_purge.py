@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog import authors, comment_archive, commenters, date_archive, purge
+from blog.models import (
+    ArchivedComment,
+    ArchiveMonth,
+    AuthorStats,
+    Comment,
+    CommenterStats,
+    Post,
+    Tag,
+)
+
+from .utils import LOCAL_CACHE, make_post, reset_tag_index
+
+
+def derived_state():
+    return [
+        sorted(model.objects.values_list(*fields))
+        for model, fields in (
+            (CommenterStats, ('email', 'name', 'comments_total', 'recent_comment')),
+            (AuthorStats, ('author_id', 'published_posts', 'active_comments', 'latest_publish')),
+            (ArchiveMonth, ('year', 'month', 'posts_total')),
+        )
+    ]
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class PurgeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_tag_index(self)
+        self.anna = User.objects.create(username='anna')
+        self.tag = Tag.objects.create(name='Кошки', slug='cats')
+        self.old = make_post(self.anna, 'Старый пост', days_ago=800)
+        self.new = make_post(self.anna, 'Новый пост', days_ago=1)
+        for post in (self.old, self.new):
+            post.tags.add(self.tag)
+        for email in ('ira@example.com', 'ira@example.com', 'oleg@example.com'):
+            Comment.objects.create(post=self.old, name='Ира', email=email, body='!')
+        Comment.objects.create(post=self.new, name='Ира', email='IRA@example.com', body='?')
+        comment_archive.archive(now=timezone.now() + timedelta(days=800))
+        Comment.objects.create(post=self.old, name='Ира', email='ira@example.com', body='Ещё')
+
+    def assertMatchesRebuild(self):
+        incremental = derived_state()
+        commenters.rebuild()
+        authors.rebuild()
+        date_archive.rebuild()
+        self.assertEqual(incremental, derived_state())
+
+    def test_purge_post(self):
+        self.assertEqual(ArchivedComment.objects.filter(post=self.old).count(), 3)
+        self.assertEqual(purge.purge_post(self.old, batch_size=2), 4)
+        self.assertFalse(Post.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.old.pk).exists())
+        self.assertFalse(ArchivedComment.objects.filter(post_id=self.old.pk).exists())
+        self.assertMatchesRebuild()
+        self.assertEqual(
+            list(CommenterStats.objects.values_list('email', 'comments_total')),
+            [('ira@example.com', 1)],
+        )
+
+    def test_purge_post_command(self):
+        out = StringIO()
+        call_command('purge_post', self.old.pk, stdout=out)
+        self.assertIn('4 комментариев', out.getvalue())
+        self.assertMatchesRebuild()
+        with self.assertRaises(CommandError):
+            call_command('purge_post', self.old.pk, stdout=out)
+
+    def check_purge_all(self, truncate):
+        response = self.client.get('/search/', {'q': 'пост'})
+        self.assertEqual(len(response.context['results']), 2)
+        purge.purge_all(truncate=truncate, batch_size=2)
+        for model in purge.blog_models():
+            self.assertFalse(model._base_manager.exists(), model)
+        self.assertMatchesRebuild()
+        response = self.client.get('/search/', {'q': 'пост'})
+        self.assertEqual(len(response.context['results']), 0)
+        self.assertEqual(self.client.get('/posts/', {'tag': 'cats'}).status_code, 404)
+
+    def test_purge_all_in_chunks(self):
+        self.check_purge_all(truncate=False)
+
+    def test_purge_all_truncate(self):
+        self.check_purge_all(truncate=True)
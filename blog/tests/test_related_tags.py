@@ -0,0 +1,108 @@
+import math
+import unittest
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blog import related_tags
+from blog.models import PostStatus, RelatedTag, Tag
+
+from .utils import LOCAL_CACHE, make_post, reset_tag_index
+
+
+@unittest.skipUnless(related_tags.available(), 'нужны numpy и scipy')
+@override_settings(CACHES=LOCAL_CACHE)
+class RelatedTagsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_tag_index(self)
+        self.author = User.objects.create(username='anna')
+        self.tags = {slug: Tag.objects.create(name=slug, slug=slug) for slug in 'abcd'}
+        self.posts = []
+        for slugs in ('ab', 'ab', 'abc', 'ac', 'ac', 'bd', 'd'):
+            self.add_post(slugs)
+
+    def add_post(self, slugs, status=PostStatus.PUBLISHED):
+        post = make_post(self.author, f'Пост {slugs}', status=status)
+        post.tags.add(*(self.tags[slug] for slug in slugs))
+        self.posts.append(post)
+        return post
+
+    def links(self):
+        return {
+            (link.tag.slug, link.related.slug): (round(link.score, 9), link.rank)
+            for link in RelatedTag.objects.select_related('tag', 'related')
+        }
+
+    def naive(self):
+        """Косинус, посчитанный в лоб по опубликованным постам."""
+
+        tag_sets = [
+            {tag.slug for tag in post.tags.all()}
+            for post in self.posts
+            if post.status == PostStatus.PUBLISHED
+        ]
+        counts = {slug: sum(slug in tags for tags in tag_sets) for slug in self.tags}
+        links = {}
+        for slug in self.tags:
+            scored = []
+            for other in self.tags:
+                shared = sum(slug in tags and other in tags for tags in tag_sets)
+                if other != slug and shared >= 2:
+                    scored.append((-shared / math.sqrt(counts[slug] * counts[other]), other))
+            for rank, (score, other) in enumerate(sorted(scored)):
+                links[(slug, other)] = (round(-score, 9), rank)
+        return links
+
+    def test_rebuild_matches_naive_cosine(self):
+        self.assertEqual(related_tags.rebuild(), 4)
+        self.assertEqual(self.links(), self.naive())
+        self.assertEqual(
+            [tag.slug for tag in related_tags.related_for(self.tags['a'])], ['c', 'b']
+        )
+        self.assertFalse(Tag.objects.filter(related_stale=True).exists())
+
+    @override_settings(BLOG_RELATED_TAGS={'METRIC': 'pmi', 'TOP_K': 1, 'MIN_COOCCURRENCE': 2})
+    def test_pmi_and_top_k(self):
+        related_tags.rebuild()
+        links = self.links()
+        self.assertEqual({rank for _, rank in links.values()}, {0})
+        # a и b: 3 общих поста из 7, по 5 и 4 поста у каждого.
+        self.assertAlmostEqual(links[('b', 'a')][0], math.log(3 * 7 / (5 * 4)), places=6)
+
+    def test_incremental_refresh(self):
+        related_tags.rebuild()
+        self.add_post('bd')
+        draft = self.add_post('cd', status=PostStatus.DRAFT)
+        self.assertEqual(
+            set(Tag.objects.filter(related_stale=True).values_list('slug', flat=True)),
+            {'b', 'd'},
+        )
+        self.assertEqual(related_tags.refresh_stale(), (2, 3))
+        stale_rows = {key: value for key, value in self.naive().items() if key[0] in 'bd'}
+        self.assertEqual(
+            {key: value for key, value in self.links().items() if key[0] in 'bd'}, stale_rows
+        )
+        self.assertEqual(related_tags.refresh_stale(), (0, 0))
+
+        draft.status = PostStatus.PUBLISHED
+        draft.save()
+        self.tags['a'].posts.remove(self.posts[0])
+        self.assertEqual(
+            set(Tag.objects.filter(related_stale=True).values_list('slug', flat=True)),
+            {'a', 'b', 'c', 'd'},
+        )
+        related_tags.refresh_stale()
+        self.assertEqual(self.links(), self.naive())
+
+    def test_tag_page_and_command(self):
+        out = StringIO()
+        call_command('build_related_tags', stdout=out)
+        self.assertIn('4 связей', out.getvalue())
+        response = self.client.get('/posts/', {'tag': 'a'})
+        self.assertEqual(
+            [tag.slug for tag in response.context['related_tags']], ['c', 'b']
+        )
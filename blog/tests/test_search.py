@@ -0,0 +1,133 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from blog import search, throttling
+from blog.models import Tag
+
+from .utils import LOCAL_CACHE, make_post
+
+THROTTLE = {
+    'STORE': 'blog.throttling.MemoryTokenBucketStore',
+    'OPTIONS': {},
+    'IP_HEADER': None,
+    'PROXY_HOPS': 1,
+    'RATES': {'search': {'ip': '3/m', 'session': '20/m'}},
+}
+
+
+class ClientIpTests(TestCase):
+    def request(self, forwarded):
+        return RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded)
+
+    def test_header_ignored_by_default(self):
+        with self.settings(BLOG_THROTTLE=THROTTLE):
+            self.assertEqual(throttling.client_ip(self.request('1.2.3.4')), '10.0.0.1')
+
+    def test_takes_address_added_by_trusted_proxy(self):
+        config = dict(THROTTLE, IP_HEADER='HTTP_X_FORWARDED_FOR')
+        with self.settings(BLOG_THROTTLE=config):
+            self.assertEqual(throttling.client_ip(self.request('6.6.6.6, 1.2.3.4')), '1.2.3.4')
+        with self.settings(BLOG_THROTTLE=dict(config, PROXY_HOPS=2)):
+            request = self.request('6.6.6.6, 1.2.3.4, 172.16.0.2')
+            self.assertEqual(throttling.client_ip(request), '1.2.3.4')
+            # Адресов меньше, чем прокси: заголовку не доверяем.
+            self.assertEqual(throttling.client_ip(self.request('1.2.3.4')), '10.0.0.1')
+
+
+class MemoryStoreTests(TestCase):
+    def test_refill_and_wait(self):
+        store = throttling.MemoryTokenBucketStore()
+        capacity, rate = throttling.parse_rate('2/m')
+        self.assertEqual((capacity, rate), (2, 2 / 60))
+        self.assertEqual(store.consume('k', capacity, rate), 0)
+        self.assertEqual(store.consume('k', capacity, rate), 0)
+        self.assertAlmostEqual(store.consume('k', capacity, rate), 30, delta=0.1)
+
+    def test_evicts_least_recently_used(self):
+        store = throttling.MemoryTokenBucketStore(max_entries=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.consume(key, 5, 1)
+        self.assertEqual(list(store._buckets), ['a', 'c'])
+
+
+@override_settings(CACHES=LOCAL_CACHE, BLOG_THROTTLE=THROTTLE)
+class SearchThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttling._store = None
+        self.addCleanup(setattr, throttling, '_store', None)
+
+    def test_returns_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get('/search/', {'q': 'кошки'}).status_code, 200)
+        response = self.client.get('/search/', {'q': 'кошки'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+        # Другой адрес — своё ведро.
+        other = self.client.get('/search/', {'q': 'кошки'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.status_code, 200)
+
+    @override_settings(BLOG_THROTTLE=dict(THROTTLE, IP_HEADER='HTTP_X_FORWARDED_FOR'))
+    def test_forged_forwarded_for_does_not_bypass(self):
+        statuses = [
+            self.client.get(
+                '/search/', {'q': 'кошки'}, HTTP_X_FORWARDED_FOR=f'10.1.0.{number}, 5.5.5.5'
+            ).status_code
+            for number in range(5)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CaseInsensitiveSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = make_post(User.objects.create(username='anna'), 'Кошки и собаки')
+
+    def test_cyrillic(self):
+        self.assertEqual(search.search_post_ids('КОШКИ'), [self.post.pk])
+        self.assertEqual(search.search_post_ids('кошки'), [self.post.pk])
+        self.assertEqual(search.stats()['hits'], 1)
+        self.assertEqual(search.search_post_ids('СОБАК'), [self.post.pk])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='anna')
+        self.post = make_post(self.author, 'Кошки и собаки')
+
+    def test_new_post_invalidates(self):
+        self.assertEqual(search.search_post_ids('попугаи'), [])
+        parrot = make_post(self.author, 'Попугаи')
+        self.assertEqual(search.search_post_ids('попугаи'), [parrot.pk])
+
+    def test_edit_invalidates(self):
+        self.assertEqual(search.search_post_ids('кошки'), [self.post.pk])
+        self.post.title = 'Собаки'
+        self.post.save()
+        self.assertEqual(search.search_post_ids('кошки'), [])
+
+    def test_unrelated_edit_keeps_cache(self):
+        other = make_post(self.author, 'Рыбки')
+        search.search_post_ids('кошки')
+        other.body = 'Аквариум'
+        other.save()
+        self.assertEqual(search.stats()['cached_terms'], 1)
+
+    def test_delete_invalidates(self):
+        search.search_post_ids('кошки')
+        self.post.delete()
+        self.assertEqual(search.search_post_ids('кошки'), [])
+
+    def test_tag_changes_invalidate(self):
+        tag = Tag.objects.create(name='Питомцы', slug='pets')
+        self.assertEqual(search.search_post_ids('питомцы'), [])
+        self.post.tags.add(tag)
+        self.assertEqual(search.search_post_ids('питомцы'), [self.post.pk])
+        self.assertEqual(search.search_post_ids('зверьё'), [])
+        tag.name = 'Зверьё'
+        tag.save()
+        self.assertEqual(search.search_post_ids('зверьё'), [self.post.pk])
@@ -0,0 +1,67 @@
+import gzip
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from blog import static_views
+
+
+class StaticServeTests(SimpleTestCase):
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(STATIC_ROOT=root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        static_views.hashed_names.cache_clear()
+        self.addCleanup(static_views.hashed_names.cache_clear)
+        self.root = Path(root)
+        self.hashed = staticfiles_storage.stored_name('blog/css/base.css')
+
+    def get(self, path, **headers):
+        request = RequestFactory().get(f'/static/{path}', headers=headers)
+        response = static_views.serve(request, path)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertNotEqual(self.hashed, 'blog/css/base.css')
+        for name in ('blog/css/base.css', self.hashed):
+            original = (self.root / name).read_bytes()
+            self.assertEqual(gzip.decompress((self.root / f'{name}.gz').read_bytes()), original)
+
+    def test_encoding_follows_accept_encoding(self):
+        plain, body = self.get(self.hashed)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(body, (self.root / self.hashed).read_bytes())
+        self.assertEqual(plain['Content-Type'], 'text/css')
+
+        packed, body = self.get(self.hashed, accept_encoding='br;q=1.0, gzip;q=0.8')
+        self.assertEqual(packed['Content-Encoding'], 'gzip')
+        self.assertEqual(packed['Content-Type'], 'text/css')
+        self.assertEqual(packed['Vary'], 'Accept-Encoding')
+        self.assertEqual(body, (self.root / f'{self.hashed}.gz').read_bytes())
+
+        # «gzipped» — не gzip.
+        response, _ = self.get(self.hashed, accept_encoding='gzipped')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_cache_control(self):
+        response, _ = self.get(self.hashed)
+        self.assertEqual(response['Cache-Control'], static_views.IMMUTABLE)
+        response, _ = self.get('blog/css/base.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_compressed_copies_are_not_served_directly(self):
+        for path in (f'{self.hashed}.gz', 'blog/css/base.css.gz', '../settings.py', 'missing.css'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+    def test_archive_keeps_its_own_encoding(self):
+        (self.root / 'dump.tar.gz').write_bytes(gzip.compress(b'data'))
+        response, _ = self.get('dump.tar.gz')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/x-tar')
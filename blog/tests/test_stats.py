@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog import authors, comment_archive, commenters, date_archive
+from blog.models import ArchiveMonth, AuthorStats, Comment, CommenterStats, Post, PostStatus
+
+from .utils import LOCAL_CACHE, make_post
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class DerivedStatsTests(TestCase):
+    """Таблицы, которые ведут сигналы, совпадают с полным пересчётом."""
+
+    def setUp(self):
+        cache.clear()
+        self.anna = User.objects.create(username='anna')
+        self.boris = User.objects.create(username='boris')
+        self.old = make_post(self.anna, 'Старый пост', days_ago=800)
+        self.new = make_post(self.boris, 'Новый пост', days_ago=1)
+        for post in (self.old, self.old, self.new):
+            Comment.objects.create(post=post, name='Ира', email='Ira@example.com', body='!')
+        Comment.objects.create(post=self.new, name='Олег', email='oleg@example.com', body='?')
+
+    def snapshot(self):
+        return (
+            sorted(
+                CommenterStats.objects.values_list(
+                    'email', 'name', 'comments_total', 'recent_comment'
+                )
+            ),
+            sorted(
+                AuthorStats.objects.values_list(
+                    'author_id', 'published_posts', 'active_comments', 'latest_publish'
+                )
+            ),
+            sorted(ArchiveMonth.objects.values_list('year', 'month', 'posts_total')),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        commenters.rebuild()
+        authors.rebuild()
+        date_archive.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_create(self):
+        make_post(self.anna, 'Черновик', status=PostStatus.DRAFT)
+        self.assertMatchesRebuild()
+
+    def test_hide_and_show_comment(self):
+        comment = Comment.objects.filter(email='oleg@example.com').get()
+        comment.active = False
+        comment.save()
+        self.assertMatchesRebuild()
+        comment.active = True
+        comment.save()
+        self.assertMatchesRebuild()
+
+    def test_change_comment_email(self):
+        comment = Comment.objects.filter(email='oleg@example.com').get()
+        comment.email = 'IRA@example.com'
+        comment.save()
+        self.assertMatchesRebuild()
+
+    def test_unpublish_and_redate(self):
+        self.new.status = PostStatus.DRAFT
+        self.new.save()
+        self.assertMatchesRebuild()
+        self.old.publish -= timedelta(days=40)
+        self.old.save()
+        self.assertMatchesRebuild()
+
+    def test_archive_then_delete(self):
+        moved, finished = comment_archive.archive(now=timezone.now() + timedelta(days=800))
+        self.assertEqual((moved, finished), (4, True))
+        self.assertMatchesRebuild()
+        self.old.delete()
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        Comment.objects.filter(email__iexact='ira@example.com').first().delete()
+        self.new.delete()
+        self.assertMatchesRebuild()
+
+    def test_refreshed_instance_is_not_counted_twice(self):
+        make_post(self.boris, 'Ещё один пост', publish=self.new.publish)
+        first = Post.objects.get(pk=self.new.pk)
+        second = Post.objects.get(pk=self.new.pk)
+        second.status = PostStatus.DRAFT
+        second.save()
+        first.refresh_from_db()
+        first.save()
+        self.assertMatchesRebuild()
+
+    def test_partial_refresh(self):
+        post = Post.objects.get(pk=self.new.pk)
+        Post.objects.filter(pk=post.pk).update(status=PostStatus.DRAFT)
+        authors.rebuild()
+        date_archive.rebuild()
+        post.refresh_from_db(fields=['status'])
+        post.status = PostStatus.PUBLISHED
+        post.save()
+        self.assertMatchesRebuild()
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+
+from blog import metrics
+from blog.models import Tag
+
+from .utils import LOCAL_CACHE, make_post
+
+
+def xml_cache_hits():
+    key = ('blog_cache_requests_total', metrics.labels(cache='xml', result='hit'))
+    return metrics.registry.counters.get(key, 0)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='anna')
+        self.post = make_post(self.author, 'Первый пост')
+
+    def test_not_modified(self):
+        response = self.client.get('/feed/rss/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Первый пост')
+        since = response['Last-Modified']
+        self.assertEqual(
+            self.client.get('/feed/rss/', HTTP_IF_MODIFIED_SINCE=since).status_code, 304
+        )
+        earlier = http_date((timezone.now() - timedelta(hours=1)).timestamp())
+        later = http_date((timezone.now() + timedelta(hours=1)).timestamp())
+        self.assertEqual(
+            self.client.get('/feed/atom/', HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200
+        )
+        self.assertEqual(
+            self.client.get('/feed/atom/', HTTP_IF_MODIFIED_SINCE=later).status_code, 304
+        )
+
+    def test_cache_refreshed_after_publish(self):
+        self.client.get('/feed/rss/')
+        hits = xml_cache_hits()
+        self.assertContains(self.client.get('/feed/rss/'), 'Первый пост')
+        self.assertEqual(xml_cache_hits(), hits + 1)
+        make_post(self.author, 'Второй пост')
+        self.assertContains(self.client.get('/feed/rss/'), 'Второй пост')
+
+    def test_query_string_does_not_split_cache(self):
+        self.client.get('/feed/rss/')
+        hits = xml_cache_hits()
+        for value in ('1', '2', '3'):
+            self.assertEqual(self.client.get('/feed/rss/', {'x': value}).status_code, 200)
+        self.assertEqual(xml_cache_hits(), hits + 3)
+
+    def test_author_rename(self):
+        self.client.get('/feed/atom/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Анна'
+            self.author.save()
+        self.assertContains(self.client.get('/feed/atom/'), 'Анна')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(username='anna')
+        moment = timezone.now() - timedelta(days=3)
+        # Одинаковые даты проверяют курсор на границе страниц.
+        self.posts = [make_post(author, f'Пост {number}', publish=moment) for number in range(3)]
+        self.posts += [make_post(author, f'Пост {number}', days_ago=number) for number in (3, 4)]
+
+    def test_tag_rename_refreshes_sitemap(self):
+        tag = Tag.objects.create(name='Кошки', slug='cats')
+        self.posts[0].tags.add(tag)
+        self.assertContains(self.client.get('/sitemap-tags.xml'), '?tag=cats')
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.slug = 'felines'
+            tag.save()
+        response = self.client.get('/sitemap-tags.xml')
+        self.assertContains(response, '?tag=felines')
+        self.assertNotContains(response, '?tag=cats')
+
+    @override_settings(BLOG_SYNDICATION={'FEED_ITEMS': 20, 'SITEMAP_LIMIT': 2, 'CACHE_TTL': 60})
+    def test_post_pages_cover_every_post_once(self):
+        index = self.client.get('/sitemap.xml')
+        self.assertContains(index, 'sitemap-posts.xml?p=3')
+        self.assertNotContains(index, 'sitemap-posts.xml?p=4')
+        seen = []
+        for page in (1, 2, 3):
+            content = self.client.get('/sitemap-posts.xml', {'p': page}).content.decode()
+            seen += [post.pk for post in self.posts if post.get_absolute_url() + '<' in content]
+        self.assertCountEqual(seen, [post.pk for post in self.posts])
+        self.assertEqual(self.client.get('/sitemap-posts.xml', {'p': 4}).status_code, 404)
+        since = self.client.get('/sitemap-posts.xml', {'p': 2})['Last-Modified']
+        response = self.client.get('/sitemap-posts.xml', {'p': 2}, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import tag_index
+from blog.models import PostStatus, Tag
+
+from .utils import LOCAL_CACHE, make_post, reset_tag_index
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class TagIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_tag_index(self)
+        # Перестройки копятся, чтобы тест видел индекс до их запуска.
+        self.spawned = []
+        patcher = mock.patch.object(tag_index, '_spawn', self.spawned.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author = User.objects.create(username='anna')
+        self.tags = [Tag.objects.create(name=name, slug=name) for name in ('a', 'b', 'c')]
+        self.first = make_post(self.author, 'Первый', days_ago=2)
+        self.first.tags.add(*self.tags[:2])
+
+    def listing(self, index):
+        return [index.page(index.filter({tag.pk}), 0, 100) for tag in self.tags]
+
+    def assertMatchesRebuild(self, index=None):
+        index = index or tag_index.get_tag_index()
+        self.assertEqual(self.listing(index), self.listing(tag_index.build_tag_index()))
+
+    def run_spawned(self):
+        while self.spawned:
+            self.spawned.pop()()
+
+    def other_process(self):
+        """Состояние модуля, как у воркера, построившего индекс раньше."""
+
+        tag_index.get_tag_index()
+        return tag_index._index, tag_index._version
+
+    def switch_to(self, state):
+        tag_index._index, tag_index._version = state
+
+    def test_incremental_changes(self):
+        tag_index.get_tag_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            second = make_post(self.author, 'Второй')
+            second.tags.add(self.tags[2])
+            self.first.tags.remove(self.tags[0])
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = PostStatus.DRAFT
+            second.save()
+            self.tags[1].delete()
+        self.tags.pop(1)
+        self.run_spawned()
+        self.assertMatchesRebuild()
+
+    def test_other_process_replays_change_log(self):
+        other = self.other_process()
+        with self.captureOnCommitCallbacks(execute=True):
+            second = make_post(self.author, 'Второй')
+            second.tags.add(self.tags[0], self.tags[2])
+            self.tags[2].posts.add(self.first)
+            self.first.tags.remove(self.tags[1])
+        self.switch_to(other)
+        with mock.patch.object(tag_index, 'build_tag_index', side_effect=AssertionError):
+            index = tag_index.get_tag_index()
+        self.assertEqual(self.spawned, [])
+        self.assertMatchesRebuild(index)
+
+    def test_missing_log_rebuilds_in_background(self):
+        other = self.other_process()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_post(self.author, 'Второй').tags.add(self.tags[2])
+        version = cache.get(tag_index.VERSION_KEY)
+        cache.delete(tag_index.LOG_KEY.format(version))
+        self.switch_to(other)
+        # Пока идёт перестройка, запросы получают прежний индекс.
+        self.assertIs(tag_index.get_tag_index(), other[0])
+        self.assertIs(tag_index.get_tag_index(), other[0])
+        self.assertEqual(len(self.spawned), 1)
+        self.run_spawned()
+        self.assertMatchesRebuild()
+        self.assertEqual(tag_index._version, version)
+
+    def test_backdated_publish(self):
+        tag_index.get_tag_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_post(self.author, 'Задним числом', days_ago=5).tags.add(self.tags[0])
+        self.assertEqual(len(self.spawned), 0)
+        stale = tag_index.get_tag_index()
+        self.assertEqual(len(self.spawned), 1)
+        self.assertEqual(stale.page(stale.filter({self.tags[0].pk}), 0, 10), [self.first.pk])
+        self.run_spawned()
+        self.assertMatchesRebuild()
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blog import trending
+from blog.models import Comment, Post
+
+from .utils import make_post
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        author = User.objects.create(username='anna')
+        self.hot = make_post(author, 'Горячий пост')
+        self.calm = make_post(author, 'Спокойный пост')
+        self.comments = [
+            Comment.objects.create(post=self.hot, name='Ира', email='ira@example.com', body='!')
+            for _ in range(3)
+        ]
+        Comment.objects.create(post=self.calm, name='Олег', email='oleg@example.com', body='?')
+        trending.update_incremental()
+
+    def scores(self):
+        return dict(Post.objects.values_list('pk', 'trending_score'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.scores()
+        trending.rebuild()
+        rebuilt = self.scores()
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for pk, score in rebuilt.items():
+            if score is None:
+                self.assertIsNone(incremental[pk])
+            else:
+                self.assertAlmostEqual(incremental[pk], score)
+
+    def top(self):
+        return list(Post.objects.trending().values_list('pk', flat=True))
+
+    def test_new_comments(self):
+        self.assertEqual(self.top(), [self.hot.pk, self.calm.pk])
+        for _ in range(3):
+            Comment.objects.create(post=self.calm, name='Олег', email='oleg@example.com', body='?')
+        self.assertEqual(trending.update_incremental(), (3, 1))
+        self.assertEqual(self.top(), [self.calm.pk, self.hot.pk])
+        self.assertMatchesRebuild()
+
+    def test_hidden_comments_lower_score(self):
+        for comment in self.comments:
+            comment.active = False
+            comment.save()
+        self.assertTrue(Post.objects.get(pk=self.hot.pk).trending_stale)
+        trending.update_incremental()
+        self.assertEqual(self.top(), [self.calm.pk])
+        self.assertFalse(Post.objects.filter(trending_stale=True).exists())
+        self.assertMatchesRebuild()
+
+        self.comments[0].active = True
+        self.comments[0].save()
+        trending.update_incremental()
+        self.assertMatchesRebuild()
+
+    def test_deleted_and_moved_comments(self):
+        self.comments[0].delete()
+        self.comments[1].post = self.calm
+        self.comments[1].save()
+        # Новый комментарий помеченного поста не учитывается дважды.
+        Comment.objects.create(post=self.hot, name='Ира', email='ira@example.com', body='!')
+        trending.update_incremental()
+        self.assertMatchesRebuild()
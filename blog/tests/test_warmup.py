@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import prerender, warmup
+
+from .utils import LOCAL_CACHE, make_post, reset_tag_index
+
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['.example.com'])
+class WarmUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_tag_index(self)
+        self.post = make_post(User.objects.create(username='anna'), 'Пост')
+
+    def test_all_steps_finish(self):
+        results = {key: result for key, _, result, _ in warmup.warm_up()}
+        self.assertEqual(list(results), [key for key, _, _ in warmup.STEPS])
+        self.assertEqual(
+            [(url, status) for url, status, _ in results['requests']],
+            [
+                ('/', 200),
+                ('/posts/', 200),
+                ('/authors/', 200),
+                ('/feed/rss/', 200),
+                (self.post.get_absolute_url(), 200),
+            ],
+        )
+
+    def test_feed_uses_allowed_host(self):
+        self.assertEqual(prerender.render_host(), 'example.com')
+        status, content = prerender.render_path('/feed/rss/')
+        self.assertEqual(status, 200)
+        self.assertIn(f'http://example.com{self.post.get_absolute_url()}', content.decode())
+        with override_settings(ALLOWED_HOSTS=['*']):
+            self.assertEqual(prerender.render_host(), 'localhost')
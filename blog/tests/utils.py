@@ -0,0 +1,38 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from blog import tag_index
+from blog.models import Post, PostStatus
+
+# Тесты не должны зависеть от файлового кеша из настроек и друг от друга.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_post(author, title, days_ago=0, status=PostStatus.PUBLISHED, **fields):
+    return Post.objects.create(
+        title=title,
+        slug=fields.pop('slug', f'post-{Post.objects.count() + 1}'),
+        author=author,
+        body=fields.pop('body', 'Текст'),
+        status=status,
+        publish=fields.pop('publish', timezone.now() - timedelta(days=days_ago)),
+        **fields,
+    )
+
+
+def reset_tag_index(testcase):
+    """Сбрасывает индекс тегов процесса перед тестом.
+
+    Индекс переживает тест, а журнал изменений в кеше — нет. Фоновая
+    перестройка выполняется сразу в потоке теста: другой поток не видит
+    незакоммиченных данных теста.
+    """
+
+    tag_index._index = tag_index._version = None
+    tag_index._rebuilding = False
+    testcase.addCleanup(setattr, tag_index, '_index', None)
+    patcher = mock.patch.object(tag_index, '_spawn', lambda target: tag_index._rebuild())
+    patcher.start()
+    testcase.addCleanup(patcher.stop)
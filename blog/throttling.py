@@ -0,0 +1,217 @@
+"""Ограничение частоты запросов к дорогим представлениям блога.
+
+Используется алгоритм token bucket: у каждого клиента (IP-адрес и сессия)
+есть «ведро» токенов, которое равномерно пополняется до заданной ёмкости.
+Состояние вёдер хранится в подключаемом хранилище — в памяти процесса или
+в общем SQLite-файле, который видят все воркеры на одной машине.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Разбирает строку вида ``'30/m'`` в пару (ёмкость, токенов в секунду)."""
+
+    count, _, period = rate.partition('/')
+    capacity = int(count)
+    seconds = PERIODS[period[:1].lower()] if period else 1
+    return capacity, capacity / seconds
+
+
+class TokenBucketStore:
+    """Базовый интерфейс хранилища вёдер."""
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        """Списывает ``cost`` токенов.
+
+        Возвращает 0, если запрос разрешён, иначе число секунд до момента,
+        когда в ведре накопится достаточно токенов.
+        """
+
+        raise NotImplementedError
+
+    @staticmethod
+    def _refill(tokens, updated, now, capacity, refill_rate):
+        return min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+
+
+class MemoryTokenBucketStore(TokenBucketStore):
+    """Вёдра в памяти процесса: быстро, но у каждого воркера свой счётчик.
+
+    Сверх ``max_entries`` вытесняются вёдра, к которым дольше всех не
+    обращались (LRU), — за O(1) на запрос.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = self._refill(tokens, updated, now, capacity, refill_rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteTokenBucketStore(TokenBucketStore):
+    """Вёдра в SQLite-файле, общем для всех воркеров на машине.
+
+    Списание выполняется в транзакции ``BEGIN IMMEDIATE``, поэтому два
+    процесса не могут одновременно потратить один и тот же токен.
+    """
+
+    def __init__(self, path=None, timeout=1.0, cleanup_every=1000):
+        self.path = Path(path or Path(settings.BASE_DIR) / 'var' / 'throttle.sqlite3')
+        self.timeout = timeout
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        conn = self._connection()
+        now = time.time()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+        except sqlite3.OperationalError:
+            # Файл занят дольше ``timeout``: пропускаем запрос, а не отвечаем 500.
+            return 0.0
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = capacity if row is None else self._refill(
+                row[0], row[1], now, capacity, refill_rate
+            )
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / refill_rate
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now),
+            )
+            self._calls += 1
+            if self._calls % self.cleanup_every == 0:
+                conn.execute(
+                    'DELETE FROM buckets WHERE updated < ?',
+                    (now - capacity / refill_rate,),
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = settings.BLOG_THROTTLE
+                _store = import_string(config['STORE'])(**config.get('OPTIONS', {}))
+    return _store
+
+
+def client_ip(request):
+    """Адрес клиента; за прокси — из ``IP_HEADER``.
+
+    Каждый прокси дописывает адрес в конец ``X-Forwarded-For``, а начало
+    заголовка присылает сам клиент. Поэтому берётся адрес, добавленный
+    ближайшим к клиенту доверенным прокси: ``PROXY_HOPS``-й с конца.
+    """
+
+    config = settings.BLOG_THROTTLE
+    header = config.get('IP_HEADER')
+    if header and request.META.get(header):
+        addresses = [value.strip() for value in request.META[header].split(',')]
+        hops = config.get('PROXY_HOPS', 1)
+        if 1 <= hops <= len(addresses) and addresses[-hops]:
+            return addresses[-hops]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def throttle(scope):
+    """Декоратор представления: ограничивает частоту запросов по IP и сессии.
+
+    Лимиты берутся из ``settings.BLOG_THROTTLE['RATES'][scope]``. Сессия
+    учитывается, только если она уже существует, — анонимным клиентам
+    ограничитель сессий не создаёт.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            rates = settings.BLOG_THROTTLE['RATES'].get(scope, {})
+            session = getattr(request, 'session', None)
+            identities = {
+                'ip': client_ip(request),
+                'session': session.session_key if session is not None else None,
+            }
+            store = get_store()
+            wait = 0.0
+            for kind, rate in rates.items():
+                identity = identities.get(kind)
+                if not identity:
+                    continue
+                capacity, refill_rate = parse_rate(rate)
+                wait = max(
+                    wait,
+                    store.consume(f'{scope}:{kind}:{identity}', capacity, refill_rate),
+                )
+            if wait:
+                response = HttpResponse(
+                    'Слишком много запросов. Повторите попытку позже.',
+                    status=429,
+                    content_type='text/plain; charset=utf-8',
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+            return view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
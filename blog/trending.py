@@ -0,0 +1,153 @@
+"""Рейтинг обсуждаемости постов с экспоненциальным затуханием.
+
+Вклад комментария, оставленного в момент ``t``, к моменту ``now`` равен
+``exp(-λ·(now - t))``, где ``λ = ln 2 / период полураспада``. Множитель
+``exp(-λ·now)`` одинаков для всех постов, поэтому для сортировки достаточно
+хранить ``log Σ exp(λ·(t - EPOCH))``: значение не нужно пересчитывать с
+течением времени, а новый комментарий просто добавляется к сумме. Хранение
+в логарифмической шкале исключает переполнение.
+
+Вычесть вклад из логарифма суммы нельзя без потери точности, поэтому при
+скрытии, повторной активации, переносе и удалении комментария сигналы
+помечают пост флагом ``Post.trending_stale``, а периодический запуск
+пересчитывает такие посты по их активным комментариям.
+"""
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Comment, JobCheckpoint, Post
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+CHECKPOINT = 'trending'
+
+
+def decay_rate():
+    return math.log(2) / (settings.BLOG_TRENDING['HALF_LIFE_HOURS'] * 3600)
+
+
+def comment_weight(created, rate=None):
+    """Логарифм вклада комментария, оставленного в ``created``."""
+
+    rate = rate or decay_rate()
+    return rate * (created - EPOCH).total_seconds()
+
+
+def log_add(a, b):
+    """Устойчивое ``log(exp(a) + exp(b))``; ``None`` означает пустую сумму."""
+
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _accumulate(rows):
+    rate = decay_rate()
+    scores = defaultdict(lambda: None)
+    for post_id, created in rows:
+        scores[post_id] = log_add(scores[post_id], comment_weight(created, rate))
+    return scores
+
+
+def _save_scores(scores, batch_size):
+    posts = [Post(pk=pk, trending_score=score) for pk, score in scores.items()]
+    # bulk_update не трогает auto_now-поле updated и не шлёт сигналы:
+    # рейтинг не должен влиять на ленты и статическую сборку.
+    Post.objects.bulk_update(posts, ['trending_score'], batch_size=batch_size)
+
+
+def mark_stale(post_ids):
+    Post.objects.filter(pk__in=list(post_ids), trending_stale=False).update(
+        trending_stale=True
+    )
+
+
+def _recompute(post_ids, last_pk, batch_size):
+    """Рейтинг постов по всем их активным комментариям; ``None`` — комментариев нет."""
+
+    scores = dict.fromkeys(post_ids)
+    for start in range(0, len(post_ids), batch_size):
+        rows = (
+            Comment.objects.filter(
+                post_id__in=post_ids[start:start + batch_size], active=True, pk__lte=last_pk
+            )
+            .order_by()
+            .values_list('post_id', 'created')
+        )
+        scores.update(_accumulate(rows))
+    return scores
+
+
+@transaction.atomic
+def update_incremental(batch_size=1000):
+    """Добавляет вклад активных комментариев, появившихся после прошлого запуска,
+    и пересчитывает посты с флагом ``trending_stale``.
+
+    Возвращает (число учтённых новых комментариев, число обновлённых постов).
+    """
+
+    checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+    # Граница фиксируется заранее: комментарии, добавленные во время
+    # выполнения, попадут в следующий запуск.
+    last_pk = Comment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    # Флаг снимается до чтения комментариев: пометка, сделанная во время
+    # пересчёта, останется до следующего запуска.
+    stale = list(Post.objects.filter(trending_stale=True).values_list('pk', flat=True))
+    Post.objects.filter(pk__in=stale).update(trending_stale=False)
+    scores = _recompute(stale, last_pk, batch_size)
+
+    # Новые комментарии помеченных постов уже учтены пересчётом.
+    new_comments = [
+        row
+        for row in Comment.objects.filter(
+            pk__gt=checkpoint.position, pk__lte=last_pk, active=True
+        )
+        .order_by()
+        .values_list('post_id', 'created')
+        if row[0] not in scores
+    ]
+    increments = _accumulate(new_comments)
+    current = dict(
+        Post.objects.filter(pk__in=list(increments)).values_list('pk', 'trending_score')
+    )
+    scores.update(
+        (pk, log_add(current[pk], delta))
+        for pk, delta in increments.items()
+        if pk in current
+    )
+    _save_scores(scores, batch_size)
+    checkpoint.position = max(checkpoint.position, last_pk)
+    checkpoint.save(update_fields=['position', 'updated'])
+    return len(new_comments), len(scores)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитывает рейтинг всех постов с нуля.
+
+    Нужен после изменений комментариев в обход сигналов (``update()``,
+    загрузка дампа); остальные изменения учитывает ``update_incremental``.
+    """
+
+    checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+    last_pk = Comment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    Post.objects.filter(trending_stale=True).update(trending_stale=False)
+    rows = (
+        Comment.objects.filter(active=True, pk__lte=last_pk)
+        .order_by()
+        .values_list('post_id', 'created')
+        .iterator(chunk_size=batch_size)
+    )
+    scores = _accumulate(rows)
+    Post.objects.exclude(trending_score=None).update(trending_score=None)
+    _save_scores(scores, batch_size)
+    checkpoint.position = last_pk
+    checkpoint.save(update_fields=['position', 'updated'])
+    return len(scores)
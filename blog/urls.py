@@ -1,6 +1,7 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
+from .caching import cached_xml
 
 app_name = 'blog'
 
@@ -8,6 +9,26 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('posts/', views.post_list, name='post_list'),
     path('search/', views.search_posts, name='search'),
+    path('authors/', views.author_list, name='author_list'),
+    path('authors/<str:username>/', views.author_detail, name='author_detail'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:pk>/', api.post, name='api_post'),
+    path('api/posts/<int:pk>/comments/', api.post_comments, name='api_post_comments'),
+    path('api/tags/', api.tags, name='api_tags'),
+    path('feed/rss/', cached_xml(feeds.LatestPostsFeed()), name='feed_rss'),
+    path('feed/atom/', cached_xml(feeds.LatestPostsAtomFeed()), name='feed_atom'),
+    path(
+        'feed/rss/<slug:tag_slug>/',
+        cached_xml(feeds.TagPostsFeed()),
+        name='tag_feed_rss',
+    ),
+    path(
+        'feed/atom/<slug:tag_slug>/',
+        cached_xml(feeds.TagPostsAtomFeed()),
+        name='tag_feed_atom',
+    ),
+    path('<int:year>/', views.archive_year, name='archive_year'),
+    path('<int:year>/<int:month>/', views.archive_month, name='archive_month'),
     path(
         '<int:year>/<int:month>/<int:day>/<slug:post>/',
         views.post_detail,
@@ -1,79 +1,234 @@
-from django.db.models import Count, Max
+import re
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
 
+from . import comment_archive, date_archive, related_tags
 from .forms import SearchForm
-from .models import Comment, Post, Tag
+from .models import AuthorStats, CommenterStats, Post, Tag
+from .pagination import keyset_page
+from .search import hydrate_posts, search_post_ids
+from .tag_index import Selection, get_tag_index
+from .throttling import throttle
+
+
+WIDGET_MARKER = re.compile(r'<!--blog:widget:(\w+)-->')
+
+
+def home_widgets():
+    """Виджеты главной: имя → (переменная контекста, ленивый queryset).
+
+    Шаблон виджета — ``blog/includes/home/<имя>.html``.
+    """
+
+    return {
+        'latest': (
+            'latest_posts',
+            Post.published.select_related('author')
+            .prefetch_related('tags')
+            .order_by('-publish')[:5],
+        ),
+        'trending': (
+            'trending_posts',
+            Post.objects.trending(days=30)
+            .with_comment_counts()
+            .select_related('author')
+            .prefetch_related('tags')[:5],
+        ),
+        'editors': (
+            'editors_choice',
+            Post.objects.editors_choice()
+            .select_related('author')
+            .prefetch_related('tags')
+            .order_by('-publish')[:5],
+        ),
+        'top_tags': (
+            'top_tags',
+            Tag.objects.with_post_counts()
+            .with_latest_publish()
+            .filter(published_posts__gt=0)
+            .order_by('-published_posts', '-latest_publish', 'name')[:10],
+        ),
+        'commenters': ('active_commenters', CommenterStats.objects.leaderboard()[:5]),
+    }
 
 
 def home(request):
     search_form = SearchForm()
+    widgets = home_widgets()
 
-    latest_posts = (
-        Post.published.select_related('author')
-        .prefetch_related('tags')
-        .order_by('-publish')[:5]
-    )
+    if settings.BLOG_STREAM_HOME:
+        return StreamingHttpResponse(
+            _stream_home(request, {'search_form': search_form}, widgets),
+            content_type='text/html; charset=utf-8',
+        )
 
-    trending_posts = (
-        Post.objects.trending(days=30, min_comments=1)
-        .select_related('author')
-        .prefetch_related('tags')
-        .order_by('-comment_count', '-publish')[:5]
-    )
+    context = {'search_form': search_form}
+    context.update(widgets.values())
+    return render(request, 'blog/home.html', context)
 
-    editors_choice = (
-        Post.objects.editors_choice()
-        .select_related('author')
-        .prefetch_related('tags')
-        .order_by('-publish')[:5]
-    )
 
-    top_tags = (
-        Tag.objects.with_post_counts()
-        .with_latest_publish()
-        .filter(published_posts__gt=0)
-        .order_by('-published_posts', '-latest_publish', 'name')[:10]
-    )
+def _stream_home(request, context, widgets):
+    """Отдаёт каркас страницы сразу, а виджеты — по мере выполнения их запросов."""
 
-    active_commenters = (
-        Comment.objects.filter(active=True)
-        .values('name', 'email')
-        .annotate(
-            comments_total=Count('id'),
-            recent_comment=Max('created'),
+    parts = WIDGET_MARKER.split(render_to_string('blog/home_stream.html', context, request))
+    yield parts[0]
+    for name, tail in zip(parts[1::2], parts[2::2]):
+        variable, queryset = widgets[name]
+        yield render_to_string(
+            f'blog/includes/home/{name}.html', {variable: queryset}, request
         )
-        .order_by('-comments_total', '-recent_comment')[:5]
-    )
+        yield tail
 
-    context = {
-        'search_form': search_form,
-        'latest_posts': latest_posts,
-        'trending_posts': trending_posts,
-        'editors_choice': editors_choice,
-        'top_tags': top_tags,
-        'active_commenters': active_commenters,
-    }
 
-    return render(request, 'blog/home.html', context)
+def post_list(request):
+    tag_slugs = list(dict.fromkeys(request.GET.getlist('tag')))
+    match = 'any' if request.GET.get('match') == 'any' else 'all'
+    per_page = settings.BLOG_POSTS_PER_PAGE
 
+    active_tags = []
+    facets = []
+    if tag_slugs:
+        active_tags = list(Tag.objects.filter(slug__in=tag_slugs))
+        if len(active_tags) != len(tag_slugs):
+            raise Http404('Тег не найден')
+        active_ids = {tag.id for tag in active_tags}
+        index = get_tag_index()
+        matched = index.filter(active_ids, match)
+        page = Paginator(Selection(index, matched), per_page).get_page(request.GET.get('page'))
+        page.object_list = hydrate_posts(page.object_list)
 
-def post_list(request):
-    tag_slug = request.GET.get('tag')
-    posts = Post.published.select_related('author').prefetch_related('tags')
+        counts = index.selection_facets(active_ids, match)[: settings.BLOG_TAG_FACETS]
+        facet_tags = Tag.objects.in_bulk([tag_id for tag_id, _ in counts])
+        facets = [
+            {
+                'tag': facet_tags[tag_id],
+                'count': count,
+                'query': _tag_query(tag_slugs + [facet_tags[tag_id].slug], match),
+            }
+            for tag_id, count in counts
+            if tag_id in facet_tags
+        ]
+    else:
+        posts = (
+            Post.published.select_related('author')
+            .prefetch_related('tags')
+            .order_by('-publish', '-id')
+        )
+        page = Paginator(posts, per_page).get_page(request.GET.get('page'))
 
-    active_tag = None
-    if tag_slug:
-        active_tag = get_object_or_404(Tag, slug=tag_slug)
-        posts = posts.filter(tags__slug=tag_slug)
+    for tag in active_tags:
+        tag.remove_query = _tag_query([slug for slug in tag_slugs if slug != tag.slug], match)
 
-    posts = posts.order_by('-publish')
     return render(
         request,
         'blog/post/list.html',
         {
+            'posts': page.object_list,
+            'page_obj': page,
+            'search_form': SearchForm(),
+            'active_tag': active_tags[0] if len(active_tags) == 1 else None,
+            'active_tags': active_tags,
+            'facets': facets,
+            'related_tags': (
+                related_tags.related_for(active_tags[0]) if len(active_tags) == 1 else []
+            ),
+            'match': match,
+            'tag_query': _tag_query(tag_slugs, match),
+            'other_match_query': _tag_query(tag_slugs, 'all' if match == 'any' else 'any'),
+            'archive_months': date_archive.sidebar(),
+        },
+    )
+
+
+def _tag_query(slugs, match):
+    params = [('tag', slug) for slug in slugs]
+    if len(slugs) > 1 and match == 'any':
+        params.append(('match', 'any'))
+    return urlencode(params)
+
+
+def archive_year(request, year):
+    return _archive(request, year)
+
+
+def archive_month(request, year, month):
+    if not 1 <= month <= 12:
+        raise Http404('Нет такого месяца')
+    return _archive(request, year, month)
+
+
+def _archive(request, year, month=None):
+    # Наличие периода проверяется по таблице, а не по закешированному
+    # сайдбару: кеш может ещё не знать о только что опубликованном посте.
+    year_months = date_archive.year_months(year)
+    period = [entry for entry in year_months if month is None or entry['month'] == month]
+    if not period:
+        raise Http404('За этот период публикаций нет')
+
+    start, end = date_archive.period_bounds(year, month)
+    posts = (
+        Post.published.filter(publish__gte=start, publish__lt=end)
+        .select_related('author')
+        .prefetch_related('tags')
+    )
+    posts, next_cursor = keyset_page(
+        posts, request.GET.get('before'), settings.BLOG_POSTS_PER_PAGE
+    )
+    return render(
+        request,
+        'blog/post/archive.html',
+        {
+            'posts': posts,
+            'next_cursor': next_cursor,
+            'year': year,
+            'month': month,
+            'period_date': period[0]['date'],
+            'period_total': sum(entry['count'] for entry in period),
+            'year_months': year_months,
+            'archive_months': date_archive.sidebar(),
+            'search_form': SearchForm(),
+        },
+    )
+
+
+def author_list(request):
+    stats = (
+        AuthorStats.objects.filter(published_posts__gt=0)
+        .select_related('author')
+        .order_by('-latest_publish')
+    )
+    return render(
+        request,
+        'blog/author/list.html',
+        {'author_stats': stats, 'search_form': SearchForm()},
+    )
+
+
+def author_detail(request, username):
+    stats = get_object_or_404(
+        AuthorStats.objects.select_related('author'),
+        author__username=username,
+        published_posts__gt=0,
+    )
+    # Выборка идёт по индексу (author, status, -publish).
+    posts = Post.published.filter(author_id=stats.author_id).prefetch_related('tags')
+    posts, next_cursor = keyset_page(
+        posts, request.GET.get('before'), settings.BLOG_POSTS_PER_PAGE
+    )
+    return render(
+        request,
+        'blog/author/detail.html',
+        {
+            'author': stats.author,
+            'stats': stats,
             'posts': posts,
+            'next_cursor': next_cursor,
             'search_form': SearchForm(),
-            'active_tag': active_tag,
         },
     )
 
@@ -87,10 +242,8 @@ def post_detail(request, year, month, day, post):
         slug=post,
     )
 
-    comments = (
-        post.comments.filter(active=True)
-        .select_related('post')
-        .order_by('-created')
+    comments, comments_cursor = comment_archive.comments_page(
+        post, request.GET.get('comments'), settings.BLOG_COMMENTS_PER_PAGE
     )
 
     related_posts = (
@@ -107,26 +260,24 @@ def post_detail(request, year, month, day, post):
         {
             'post': post,
             'comments': comments,
+            'comments_total': comment_archive.active_total(post),
+            'comments_cursor': comments_cursor,
             'related_posts': related_posts,
             'search_form': SearchForm(),
         },
     )
 
 
+@throttle('search')
 def search_posts(request):
     form = SearchForm(request.GET or None)
-    results = Post.objects.none()
+    results = []
     query = ''
 
     if form.is_valid():
         query = form.cleaned_data['q']
         if query:
-            results = (
-                Post.objects.for_search_term(query)
-                .select_related('author')
-                .prefetch_related('tags')
-                .order_by('-publish')
-            )
+            results = hydrate_posts(search_post_ids(query))
 
     context = {
         'form': form,
@@ -0,0 +1,113 @@
+"""Прогрев процесса перед первыми запросами.
+
+Компилирует шаблоны блога, заполняет URL-резолвер, открывает соединения с
+БД, строит индекс тегов и кеши виджетов и прогоняет короткий набор
+синтетических запросов (``BLOG_WARMUP['URLS']`` и страница последнего поста).
+Запускается командой ``warmup`` или при загрузке ``mysite/wsgi.py`` и
+``mysite/asgi.py``, если включён ``BLOG_WARMUP['ON_BOOT']``.
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def load_templates():
+    """Компилирует все шаблоны приложения ``blog`` (их держит cached.Loader)."""
+
+    root = Path(apps.get_app_config('blog').path) / 'templates'
+    names = [path.relative_to(root).as_posix() for path in root.rglob('*.html')]
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def load_urls():
+    resolver = get_resolver()
+    # reverse_dict заполняется лениво при первом reverse().
+    return len(resolver.reverse_dict)
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def prime_caches():
+    from . import date_archive, tag_index
+
+    index = tag_index.get_tag_index()
+    months = date_archive.sidebar()
+    return f'{len(index.post_ids)} постов в индексе, {len(months)} месяцев архива'
+
+
+def warmup_urls():
+    from .models import Post
+
+    urls = list(settings.BLOG_WARMUP['URLS'])
+    latest = Post.published.order_by('-publish').first()
+    if latest is not None:
+        urls.append(latest.get_absolute_url())
+    return urls
+
+
+def run_requests(urls):
+    """Рендерит страницы в обход сети; возвращает [(url, код, мс)]."""
+
+    from .prerender import render_path
+
+    results = []
+    for url in urls:
+        started = time.perf_counter()
+        status, _ = render_path(url)
+        results.append((url, status, (time.perf_counter() - started) * 1000))
+    return results
+
+
+STEPS = (
+    ('templates', 'Шаблоны', load_templates),
+    ('urls', 'URL-резолвер', load_urls),
+    ('connections', 'Соединения с БД', open_connections),
+    ('caches', 'Индекс тегов и кеши', prime_caches),
+    ('requests', 'Синтетические запросы', lambda: run_requests(warmup_urls())),
+)
+
+
+def warm_up():
+    """Выполняет все шаги; возвращает [(ключ, название, результат, мс)]."""
+
+    report = []
+    for key, label, step in STEPS:
+        started = time.perf_counter()
+        result = step()
+        report.append((key, label, result, (time.perf_counter() - started) * 1000))
+    return report
+
+
+def warm_up_on_boot():
+    """Прогрев из точки входа WSGI/ASGI; ошибки не мешают запуску воркера.
+
+    При ``gunicorn --preload`` модуль импортируется в мастер-процессе, поэтому
+    открытые соединения закрываются, чтобы не достаться воркерам после fork.
+    """
+
+    if not settings.BLOG_WARMUP['ON_BOOT']:
+        return
+    started = time.perf_counter()
+    try:
+        warm_up()
+    except Exception:
+        logger.exception('Прогрев воркера не удался')
+    finally:
+        if settings.BLOG_WARMUP['CLOSE_CONNECTIONS']:
+            connections.close_all()
+    logger.info('Прогрев воркера: %.0f мс', (time.perf_counter() - started) * 1000)
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_asgi_application()
+
+# Прогрев воркера (BLOG_WARMUP['ON_BOOT']); импорт после setup() выше.
+from blog.warmup import warm_up_on_boot  # noqa: E402
+
+warm_up_on_boot()
@@ -37,10 +37,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'blog.apps.BlogConfig',
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,13 +50,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендера для /metrics.
+        'BACKEND': 'blog.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -118,7 +122,152 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+STATIC_ROOT = BASE_DIR / 'var' / 'static'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Хешированные имена + .gz/.br рядом с файлами (см. blog/storage.py).
+    # При DEBUG = False перед запуском обязателен manage.py collectstatic.
+    'staticfiles': {
+        'BACKEND': 'blog.storage.PrecompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+CACHES = {
+    'default': {
+        # Кеш должен быть общим для всех воркеров и команд manage.py (проверка
+        # blog.E001): файловый — для одной машины; для нескольких — Redis или
+        # Memcached.
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'var' / 'cache',
+    }
+}
+
+
+# Blog: search and throttling
+
+BLOG_SEARCH = {
+    # Сколько секунд хранится список id для одинакового запроса. Изменения
+    # постов сбрасывают затронутые запросы сразу, TTL ограничивает остальное.
+    'TTL': 300,
+    'MAX_RESULTS': 200,
+    # Сколько разных запросов одновременно держится в кеше.
+    'MAX_TERMS': 1000,
+}
+
+BLOG_THROTTLE = {
+    # 'blog.throttling.SQLiteTokenBucketStore' делит лимиты между воркерами.
+    'STORE': 'blog.throttling.MemoryTokenBucketStore',
+    'OPTIONS': {},
+    # Заголовок с адресом клиента за прокси, например 'HTTP_X_FORWARDED_FOR'.
+    'IP_HEADER': None,
+    # Сколько доверенных прокси дописывают адрес в IP_HEADER: адрес клиента
+    # берётся PROXY_HOPS-м с конца (левые значения подделывает клиент).
+    'PROXY_HOPS': 1,
+    'RATES': {
+        'search': {'ip': '30/m', 'session': '20/m'},
+    },
+}
+
+BLOG_SYNDICATION = {
+    'FEED_ITEMS': 20,
+    # Постов в одном файле sitemap (протокол допускает до 50 000).
+    'SITEMAP_LIMIT': 5000,
+    # Готовый XML хранится, пока не изменятся посты, теги или имена авторов.
+    'CACHE_TTL': 86400,
+}
+
+BLOG_TRENDING = {
+    # Через сколько часов вклад комментария в рейтинг уменьшается вдвое.
+    'HALF_LIFE_HOURS': 48,
+}
+
+BLOG_POSTS_PER_PAGE = 20
+
+# Главная отдаётся потоком: шапка сразу, виджеты по мере готовности.
+BLOG_STREAM_HOME = True
+
+# Сколько тегов-фасетов показывать в каталоге при фильтрации.
+BLOG_TAG_FACETS = 20
+
+BLOG_PROFILING = {
+    'ENABLED': True,
+    # Профилирование по запросу доступно только сотрудникам (is_staff).
+    'HEADER': 'HTTP_X_BLOG_PROFILE',
+    'QUERY_PARAM': '_profile',
+    # Доля случайно профилируемых запросов всех пользователей (0.01 = 1%).
+    'SAMPLE_RATE': 0.0,
+    'DIR': BASE_DIR / 'var' / 'profiles',
+    'KEEP': 200,
+}
+
+BLOG_METRICS = {
+    'ENABLED': True,
+    # Общий каталог снимков для нескольких воркеров gunicorn (например,
+    # BASE_DIR / 'var' / 'metrics'); очищать при перезапуске. None — метрики
+    # только текущего процесса.
+    'DIR': None,
+    'FLUSH_INTERVAL': 1.0,
+    # Токен для /metrics: Prometheus передаёт его в заголовке
+    # Authorization: Bearer <токен> (authorization.credentials в scrape_config).
+    # None — доступ только по ALLOWED_IPS.
+    'TOKEN': None,
+    # Адреса, с которых /metrics доступен без токена. Не добавляйте сюда
+    # 127.0.0.1, если Django стоит за прокси на той же машине: тогда у всех
+    # запросов REMOTE_ADDR = 127.0.0.1.
+    'ALLOWED_IPS': (),
+}
+
+BLOG_STATIC = {
+    # Отдавать STATIC_ROOT самим Django при DEBUG = False (без nginx).
+    'SERVE': True,
+    'COMPRESS_EXTENSIONS': ('.css', '.js', '.svg', '.txt', '.xml', '.json', '.map'),
+    'COMPRESS_MIN_SIZE': 256,
+    # Кеширование файлов без хеша в имени, секунды.
+    'MAX_AGE': 3600,
+}
+
+BLOG_COMMENT_ARCHIVE = {
+    # Комментарии старше COMMENT_AGE_DAYS к постам старше POST_AGE_DAYS.
+    'COMMENT_AGE_DAYS': 365,
+    'POST_AGE_DAYS': 365,
+    # Скрытые комментарии, не менявшиеся столько дней.
+    'INACTIVE_RETENTION_DAYS': 30,
+}
+
+BLOG_COMMENTS_PER_PAGE = 50
+
+BLOG_RELATED_TAGS = {
+    # 'cosine' или 'pmi' (PMI сильнее поднимает редкие пары).
+    'METRIC': 'cosine',
+    'TOP_K': 10,
+    # Пары, встретившиеся реже, не считаются связанными.
+    'MIN_COOCCURRENCE': 2,
+}
+
+BLOG_WARMUP = {
+    # Прогревать воркер при импорте mysite/wsgi.py и mysite/asgi.py. Увеличивает
+    # время старта, но первые запросы не платят за шаблоны, соединения и кеши.
+    'ON_BOOT': False,
+    # Закрыть соединения с БД после прогрева (нужно при gunicorn --preload:
+    # соединения мастера нельзя разделять с воркерами после fork).
+    'CLOSE_CONNECTIONS': True,
+    # Страницы для синтетических запросов; к ним добавляется последний пост.
+    'URLS': ('/', '/posts/', '/authors/', '/feed/rss/'),
+    # Бюджеты для ``manage.py warmup --check``, миллисекунды.
+    'STARTUP_BUDGET_MS': 800,
+    'WARMUP_BUDGET_MS': 2000,
+}
+
+BLOG_API = {
+    'PER_PAGE': 20,
+    # Верхняя граница параметра ``limit``.
+    'MAX_PER_PAGE': 100,
+}
@@ -14,10 +14,38 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.contrib.sitemaps import views as sitemap_views
+from django.urls import include, path, re_path
+
+from blog.caching import cached_xml
+from blog.metrics import metrics_view
+from blog.sitemaps import sitemaps
+from blog.static_views import serve as serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path(
+        'sitemap.xml',
+        cached_xml(sitemap_views.index),
+        {'sitemaps': sitemaps, 'sitemap_url_name': 'sitemap-section'},
+        name='sitemap-index',
+    ),
+    path(
+        'sitemap-<section>.xml',
+        cached_xml(sitemap_views.sitemap),
+        {'sitemaps': sitemaps},
+        name='sitemap-section',
+    ),
     path('', include(('blog.urls', 'blog'), namespace='blog')),
 ]
+
+if settings.BLOG_STATIC['SERVE'] and not settings.DEBUG:
+    # В DEBUG статику отдаёт runserver из каталогов приложений.
+    urlpatterns.insert(
+        0, re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static)
+    )
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+# Прогрев воркера (BLOG_WARMUP['ON_BOOT']); импорт после setup() выше.
+from blog.warmup import warm_up_on_boot  # noqa: E402
+
+warm_up_on_boot()